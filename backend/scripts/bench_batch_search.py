@@ -0,0 +1,77 @@
+"""
+Benchmarks the per-query hybrid_search_rrf loop against hybrid_search_rrf_batch
+on a local Postgres + pgvector (see pg_bench.py for setup), subject-scoped with the
+given keyword channel as Phase 3 calls it.
+
+A local socket has almost no round-trip time, so the measured difference is server
+work only; the projection adds rtt_ms per call (Supabase REST from Cloud Run is tens
+of ms per request).
+
+Usage: DATABASE_URL=... python scripts/bench_batch_search.py [num_chunks] [num_queries] [batch_size] [rtt_ms] [keyword_mode]
+"""
+import os
+import sys
+import json
+
+sys.path.append(os.path.dirname(__file__))
+
+import pg_bench
+
+MATCH_COUNT = 50
+RRF_K = 60
+
+
+def run_loop(conn, queries, source_ids, keyword_mode):
+    rows = 0
+    with conn.cursor() as cur:
+        for q in queries:
+            cur.execute("""SELECT * FROM hybrid_search_rrf(%s, %s::halfvec(768), %s, %s,
+                           p_source_ids => %s::uuid[], p_keyword_mode => %s)""",
+                        (q["text"], pg_bench.vec_literal(q["embedding"]), MATCH_COUNT, RRF_K,
+                         source_ids, keyword_mode))
+            rows += len(cur.fetchall())
+    return rows
+
+
+def run_batched(conn, queries, batch_size, source_ids, keyword_mode):
+    rows = 0
+    with conn.cursor() as cur:
+        for i in range(0, len(queries), batch_size):
+            batch = queries[i:i + batch_size]
+            cur.execute("""SELECT * FROM hybrid_search_rrf_batch(%s, %s::jsonb, %s, %s,
+                           p_source_ids => %s::uuid[], p_keyword_mode => %s)""",
+                        ([q["text"] for q in batch],
+                         json.dumps([[round(v, 5) for v in q["embedding"]] for q in batch]),
+                         MATCH_COUNT, RRF_K, source_ids, keyword_mode))
+            rows += len(cur.fetchall())
+    return rows
+
+
+def main(num_chunks: int, num_queries: int, batch_size: int, rtt_ms: float, keyword_mode: str):
+    conn = pg_bench.connect()
+    corpus = pg_bench.generate_corpus(num_chunks)
+    queries = pg_bench.generate_queries(corpus, num_queries)
+    subject_id, source_id = pg_bench.seed_subject(conn, corpus)
+    source_ids = [source_id]
+    try:
+        run_loop(conn, queries[:5], source_ids, keyword_mode)  # warm caches
+        loop_rows, loop_ms = pg_bench.timed(run_loop, conn, queries, source_ids, keyword_mode)
+        batch_rows, batch_ms = pg_bench.timed(run_batched, conn, queries, batch_size, source_ids, keyword_mode)
+        calls = -(-len(queries) // batch_size)
+        print(f"{num_chunks} chunks, {len(queries)} queries, keyword '{keyword_mode}', projection at {rtt_ms:.0f} ms/call")
+        print(f"  loop   : {len(queries)} calls, {loop_ms:.0f} ms, {loop_rows} rows, "
+              f"~{loop_ms + len(queries) * rtt_ms:.0f} ms with RTT")
+        print(f"  batched: {calls} calls (batch {batch_size}), {batch_ms:.0f} ms, {batch_rows} rows, "
+              f"~{batch_ms + calls * rtt_ms:.0f} ms with RTT")
+    finally:
+        pg_bench.drop_subject(conn, subject_id)
+        conn.close()
+
+
+if __name__ == "__main__":
+    num_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+    rtt_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 30
+    keyword_mode = sys.argv[5] if len(sys.argv) > 5 else "fts"
+    main(num_chunks, num_queries, batch_size, rtt_ms, keyword_mode)
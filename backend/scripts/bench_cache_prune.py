@@ -0,0 +1,183 @@
+"""
+Cost of the size-bounding prune that runs after every persistent cache store, on a local
+Postgres (see pg_bench.py; embedding_cache.sql and retrieval_cache.sql applied). The
+previous prunes (OFFSET walk over the whole LRU index; for the retrieval cache also a
+stale-version check on every subject's rows) are recreated in pg_temp and timed next to
+the current ones: at the cap with nothing to evict (the common case), after a store pushed
+the table over the cap, and - for the retrieval cache - after the storing subject's sources
+changed.
+
+Usage: DATABASE_URL=... python scripts/bench_cache_prune.py [max_rows] [rows_per_store] [repeats] [subjects]
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(__file__))
+
+import pg_bench
+
+OLD_EMBEDDING_PRUNE = """
+CREATE FUNCTION pg_temp.old_prune_query_embedding_cache(p_max_rows INT)
+RETURNS INT LANGUAGE plpgsql AS $$
+DECLARE v_deleted INT;
+BEGIN
+  WITH doomed AS (
+    SELECT q.model_name, q.query_norm FROM query_embedding_cache q
+    ORDER BY q.last_used_at DESC OFFSET p_max_rows
+  )
+  DELETE FROM query_embedding_cache q USING doomed d
+  WHERE q.model_name = d.model_name AND q.query_norm = d.query_norm;
+  GET DIAGNOSTICS v_deleted = ROW_COUNT;
+  RETURN v_deleted;
+END;
+$$;
+"""
+
+OLD_RETRIEVAL_PRUNE = """
+CREATE FUNCTION pg_temp.old_prune_retrieval_cache(p_max_rows INT)
+RETURNS INT LANGUAGE plpgsql AS $$
+DECLARE v_stale INT; v_evicted INT;
+BEGIN
+  DELETE FROM retrieval_cache c
+  WHERE c.source_version < subject_source_version(c.subject_id);
+  GET DIAGNOSTICS v_stale = ROW_COUNT;
+  WITH doomed AS (
+    SELECT c.subject_id, c.cache_key FROM retrieval_cache c
+    ORDER BY c.last_used_at DESC OFFSET p_max_rows
+  )
+  DELETE FROM retrieval_cache c USING doomed d
+  WHERE c.subject_id = d.subject_id AND c.cache_key = d.cache_key;
+  GET DIAGNOSTICS v_evicted = ROW_COUNT;
+  RETURN v_stale + v_evicted;
+END;
+$$;
+"""
+
+MODEL = "bench-prune-model"
+
+
+def store(cur, start, count):
+    # Same row shape as EmbeddingCache._store_persistent (768 floats per query)
+    cur.execute("""
+        INSERT INTO query_embedding_cache (model_name, query_norm, embedding, last_used_at)
+        SELECT %s, 'query ' || i, array_fill((i %% 97)::real / 97, ARRAY[768]),
+               now() - make_interval(secs => %s - i)
+        FROM generate_series(%s, %s) i""", (MODEL, start + count, start, start + count - 1))
+
+
+def settle(conn):
+    # The prune reads the live-tuple statistic; make sure this backend's counts are flushed
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_stat_force_next_flush()")
+    conn.commit()
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_sleep(0.05)")
+    conn.commit()
+
+
+def store_results(cur, subject_id, start, count, version):
+    # RetrievalCache.store row shape; results kept short (they live in TOAST either way)
+    cur.execute("""
+        INSERT INTO retrieval_cache (subject_id, cache_key, query_norm, source_version, results, last_used_at)
+        SELECT %s, md5('key ' || i), 'query ' || i, %s,
+               jsonb_build_array(jsonb_build_object('chunk_id', gen_random_uuid(), 'rrf_score', 0.5)),
+               now() - make_interval(secs => %s - i)
+        FROM generate_series(%s, %s) i""", (subject_id, version, start + count, start, start + count - 1))
+
+
+def prune(cur, function, args):
+    placeholders = ", ".join(["%s"] * len(args))
+    cur.execute(f"SELECT {function}({placeholders})", args)
+    return cur.fetchone()[0]
+
+
+def timed_prune(conn, function, args):
+    with conn.cursor() as cur:
+        deleted, ms = pg_bench.timed(prune, cur, function, args)
+    conn.rollback()  # keep the table at the same size for the next measurement
+    return deleted, ms
+
+
+def compare(conn, label, old, new, repeats):
+    for name, (function, args) in (("before", old), ("after ", new)):
+        runs = [timed_prune(conn, function, args) for _ in range(repeats)]
+        print(f"  [{name}] {label:<34}: {min(ms for _, ms in runs):8.1f} ms, deleted {runs[0][0]}")
+
+
+def bench_embedding_cache(conn, max_rows: int, rows_per_store: int, repeats: int):
+    with conn.cursor() as cur:
+        cur.execute(OLD_EMBEDDING_PRUNE)
+        cur.execute("DELETE FROM query_embedding_cache WHERE model_name = %s", (MODEL,))
+        store(cur, 0, max_rows)
+    conn.commit()
+    try:
+        settle(conn)
+        print(f"query_embedding_cache: {max_rows} rows (cap {max_rows}), {rows_per_store} new rows per store, "
+              f"best of {repeats}")
+        for label, extra in (("at the cap, nothing to evict", 0), (f"{rows_per_store} rows over the cap", rows_per_store)):
+            if extra:
+                with conn.cursor() as cur:
+                    store(cur, max_rows, extra)
+                conn.commit()
+                settle(conn)
+            compare(conn, label, ("pg_temp.old_prune_query_embedding_cache", (max_rows,)),
+                    ("prune_query_embedding_cache", (max_rows,)), repeats)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM query_embedding_cache WHERE model_name = %s", (MODEL,))
+        conn.commit()
+
+
+def bench_retrieval_cache(conn, max_rows: int, rows_per_store: int, repeats: int, subjects: int):
+    per_subject = max_rows // subjects
+    max_rows = per_subject * subjects
+    subject_ids = []
+    with conn.cursor() as cur:
+        cur.execute(OLD_RETRIEVAL_PRUNE)
+        for i in range(subjects):
+            cur.execute("INSERT INTO subjects (user_id, name) VALUES (gen_random_uuid(), %s) RETURNING subject_id",
+                        (f"bench prune {i}",))
+            subject_id = cur.fetchone()[0]
+            subject_ids.append(subject_id)
+            cur.execute("SELECT bump_subject_source_version(%s)", (subject_id,))
+            store_results(cur, subject_id, i * per_subject, per_subject, cur.fetchone()[0])
+    conn.commit()
+    try:
+        settle(conn)
+        storing = subject_ids[0]
+        print(f"retrieval_cache: {max_rows} rows over {subjects} subjects (cap {max_rows}), "
+              f"{rows_per_store} new rows per store, best of {repeats}")
+        old = ("pg_temp.old_prune_retrieval_cache", (max_rows,))
+        new = ("prune_retrieval_cache", (storing, max_rows))
+        compare(conn, "at the cap, nothing to evict", old, new, repeats)
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT subject_source_version(%s)", (storing,))
+            store_results(cur, storing, max_rows, rows_per_store, cur.fetchone()[0])
+        conn.commit()
+        settle(conn)
+        compare(conn, f"{rows_per_store} rows over the cap", old, new, repeats)
+
+        # The storing subject's sources changed: its older entries are stale
+        with conn.cursor() as cur:
+            cur.execute("SELECT bump_subject_source_version(%s)", (storing,))
+        conn.commit()
+        compare(conn, f"{per_subject + rows_per_store} stale rows of the subject", old, new, repeats)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM subjects WHERE subject_id = ANY(%s::uuid[])", ([str(s) for s in subject_ids],))
+        conn.commit()
+
+
+def main(max_rows: int, rows_per_store: int, repeats: int, subjects: int):
+    conn = pg_bench.connect()
+    try:
+        bench_embedding_cache(conn, max_rows, rows_per_store, repeats)
+        bench_retrieval_cache(conn, max_rows, rows_per_store, repeats, subjects)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [200000, 300, 5, 200][len(args):]))
@@ -0,0 +1,69 @@
+"""
+Measures per-chunk client setup overhead (before/after the shared client registry)
+against a local stub transport. No GCP access needed.
+
+Each stub "handshake" (client construction, auth refresh, model load) sleeps for
+stub_env.latency_ms["handshake"] to stand in for the TLS/auth round trip it costs in Cloud Run.
+
+Usage: python scripts/bench_client_pool.py [num_chunks] [threads]
+"""
+import os
+import sys
+import time
+import concurrent.futures
+from datetime import timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+from stub_env import calls
+
+HANDSHAKE_MS = stub_env.latency_ms["handshake"]
+
+
+# --- Workloads ------------------------------------------------------------
+def legacy_chunk_setup():
+    """What process_chunk_internal paid per chunk before the registry."""
+    import google.auth
+    import vertexai
+    from google.cloud import storage
+    from vertexai.generative_models import GenerativeModel
+
+    vertexai.init(project="stub", location="us-central1")
+    client = storage.Client(project="stub")            # _slice_audio
+    credentials, _ = google.auth.default()
+    credentials.refresh(None)
+    client.bucket("b").blob("a.m4a").generate_signed_url()
+    storage.Client(project="stub")                     # _delete_gcs_file
+    GenerativeModel("gemini")                          # _call_gemini_extraction
+
+
+def pooled_chunk_setup():
+    from src.shared import clients
+    clients.init_vertexai("us-central1")
+    blob = clients.get_storage_client().bucket("b").blob("a.m4a")
+    clients.generate_signed_url(blob, timedelta(minutes=15))
+    clients.get_storage_client()
+    clients.get_generative_model("gemini", "us-central1")
+
+
+def bench(label, fn, num_chunks, threads):
+    calls.clear()
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: fn(), range(num_chunks)))
+    elapsed = time.perf_counter() - start
+    total = sum(calls.values())
+    print(f"[{label}] {num_chunks} chunks / {threads} threads: "
+          f"{total} handshakes ({total / num_chunks:.2f} per chunk), "
+          f"wall {elapsed:.2f}s, handshake time {total * HANDSHAKE_MS / num_chunks:.1f} ms/chunk")
+    for kind, n in sorted(calls.items()):
+        print(f"    {kind}: {n}")
+
+
+if __name__ == "__main__":
+    num_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    stub_env.install()
+    bench("before", legacy_chunk_setup, num_chunks, threads)
+    bench("after ", pooled_chunk_setup, num_chunks, threads)
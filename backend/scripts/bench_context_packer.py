@@ -0,0 +1,94 @@
+"""
+Phase 4 context assembly: the previous concatenation loop (every chunk, dict order, no
+limit) versus ContextPacker (phase4/context_packer.py) with CONTEXT_TOKEN_BUDGET, as the
+number of sessions in one report grows. Reports assembly time, estimated prompt tokens,
+and how many signals keep at least one reference block.
+
+Usage: python scripts/bench_context_packer.py [budget_tokens]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+stub_env.install()
+
+from src.phase4.context_packer import ContextPacker, estimate_tokens
+
+SIGNALS_PER_SESSION = 40
+CHUNKS_PER_SIGNAL = 6 # after evidence pruning
+SESSIONS = [1, 4, 16, 48]
+
+
+def legacy_assemble(meta, signals, chunks_map):
+    context = f"## Exam Session Info\n"
+    context += f"- Subject: {meta.get('subject_name')}\n"
+    context += f"- Exam Window: {meta.get('exam_window')}\n"
+    context += f"- Audio URL: {meta.get('gcs_audio_url')}\n\n"
+    context += "## Audio Signals Timeline\n"
+    for s in signals:
+        line = f"[#SIGNAL id={s['signal_id']} t={s['chunk_index']}:{s['t0_sec']:.1f}-{s['t1_sec']:.1f} type={s['signal_type']}] {s['content']}"
+        context += line + "\n"
+    context += "\n"
+    context += "## Textbook Reference Blocks\n"
+    for chunk_id, chunk in chunks_map.items():
+        header = f"[[CHUNK id={chunk_id} page={chunk.get('page_start')}-{chunk.get('page_end')} anchor={chunk.get('anchor_path')}]]"
+        body = chunk.get("content_text", "").strip()
+        context += f"{header}\n{body}\n\n"
+    return context
+
+
+def build(num_sessions, rng):
+    textbook = [{"chunk_id": f"c{i}", "source_id": f"src{i % 2}", "page_start": i // 3, "page_end": i // 3,
+                 "anchor_path": ["Ch", str(i // 60)], "content_text": "회로 해석 KCL 노드 전압 " * rng.randint(40, 70)}
+                for i in range(6000)]
+    signals, candidates, links, chunks_map = [], [], [], {}
+    for s in range(num_sessions):
+        session_id = f"s{s}"
+        for j in range(SIGNALS_PER_SESSION):
+            signal_id = f"{session_id}-sig{j}"
+            signals.append({"signal_id": signal_id, "chunk_index": j // 4, "t0_sec": 12.5 * j, "t1_sec": 12.5 * j + 8,
+                            "signal_type": rng.choice(["hint", "likely", "trap"]),
+                            "content": "교수님: 이 부분 시험에 나옵니다, 노드 해석 꼭 보세요."})
+            query_text = f"{signal_id} query"
+            links.append({"session_id": session_id, "signal_id": signal_id, "query_text": query_text})
+            topic = rng.randrange(len(textbook) - 40)
+            for rank in range(CHUNKS_PER_SIGNAL):
+                chunk = textbook[topic + rng.randrange(40)]
+                chunks_map[chunk["chunk_id"]] = chunk
+                candidates.append({"session_id": session_id, "query_text": query_text,
+                                   "chunk_id": chunk["chunk_id"], "rrf_score": 1 / (61 + rank)})
+    return signals, candidates, links, chunks_map
+
+
+def main(budget):
+    rng = random.Random(0)
+    meta = {"subject_name": "회로이론", "exam_window": "midterm"}
+    print(f"budget ~{budget} tokens, {SIGNALS_PER_SESSION} signals/session, {CHUNKS_PER_SIGNAL} chunks/signal")
+    for num_sessions in SESSIONS:
+        signals, candidates, links, chunks_map = build(num_sessions, rng)
+
+        started = time.perf_counter()
+        legacy = legacy_assemble(meta, signals, chunks_map)
+        legacy_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        context, breakdown = ContextPacker(budget).pack(meta, signals, candidates, links, chunks_map)
+        packed_ms = (time.perf_counter() - started) * 1000
+
+        included = set(re.findall(r"\[\[CHUNK id=(\S+) ", context))
+        referenced = len({c["query_text"] for c in candidates if c["chunk_id"] in included})
+        print(f"  {num_sessions:2d} sessions, {len(chunks_map):5d} chunks: legacy ~{estimate_tokens(legacy):7d} tokens "
+              f"{legacy_ms:6.1f} ms | packed ~{breakdown['total']:6d} tokens {packed_ms:6.1f} ms "
+              f"(signals {breakdown['signals']}, refs {breakdown['references']}, "
+              f"{breakdown['chunks_included']} in / {breakdown['chunks_dropped']} dropped), "
+              f"signals with a reference {referenced}/{len(signals)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
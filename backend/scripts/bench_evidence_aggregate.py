@@ -0,0 +1,85 @@
+"""
+Phase 4 evidence loading (candidates, signal links and chunk text, plus embeddings when
+evidence pruning is on) through the aggregate_evidence RPC (phase4/evidence_aggregate.sql)
+versus the row-by-row REST reads it replaces, against the local stub transport.
+
+The stub implements aggregate_evidence in Python over the same tables. Reported per mode:
+requests, response bytes, rows shipped, net latency (wall minus the stub's own Python
+work, timed in a zero-latency run) and whether both paths hand the same chunks and
+per-signal relevance to the packer. Transfer time is charged per request, or with
+"shared" through one link, so concurrent pages don't get extra bandwidth.
+
+Usage: python scripts/bench_evidence_aggregate.py [num_sessions] [db_latency_ms] [ms_per_mib] [shared]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+from bench_paged_fetch import seed
+
+
+def main(num_sessions, db_latency, ms_per_mib, shared_link):
+    rng = random.Random(7)
+    db = stub_env.install()
+    db.project = True
+    db.max_rows = 1000
+    stub_env.shared_link = shared_link
+
+    from src.shared.config import Config
+    from src.phase4.reasoning_pipeline import ReasoningPipeline
+    from src.phase4.evidence_pruning import signal_relevance
+
+    subject_id, session_ids, _ = seed(db, num_sessions, rng)
+    print(f"{num_sessions} sessions: {len(db.tables['signals'])} signals, "
+          f"{len(db.tables['retrieval_results'])} retrieval rows, {len(db.tables['signal_queries'])} signal links; "
+          f"{db_latency:.0f} ms/request, {ms_per_mib:.0f} ms/MiB {'over one shared link' if shared_link else 'per request'}")
+
+    for pruning in (False, True):
+        Config.EVIDENCE_PRUNING_ENABLED = pruning
+        outputs = {}
+        for label, aggregate in (("before", False), ("after ", True)):
+            pipeline = ReasoningPipeline(session_ids, subject_id)
+            signals = pipeline._fetch_signals_aggregated()
+
+            def load():
+                pipeline._aggregate_available = aggregate
+                candidates, links, chunk_rows = pipeline._fetch_evidence(session_ids, signals)
+                return candidates, links, pipeline._load_chunks(candidates, links, chunk_rows)
+
+            stub_env.latency_ms["db"], stub_env.latency_ms["db_per_mib"] = 0, 0
+            start = time.perf_counter()
+            load()
+            cpu = time.perf_counter() - start
+
+            stub_env.latency_ms["db"], stub_env.latency_ms["db_per_mib"] = db_latency, ms_per_mib
+            stub_env.calls.clear()
+            stub_env.bytes_out.clear()
+            stub_env.rows_out.clear()
+            start = time.perf_counter()
+            candidates, links, chunks_map = load()
+            wall = time.perf_counter() - start
+
+            relevance = signal_relevance(candidates, links)
+            outputs[label] = (set(chunks_map), relevance)
+            requests = {k: v for k, v in stub_env.calls.items() if k.startswith(("select.", "rpc."))}
+            print(f"  [{label}] pruning {'on ' if pruning else 'off'}: {sum(requests.values()):>3} requests, "
+                  f"{sum(stub_env.bytes_out.values()) / 2**20:5.2f} MiB, {sum(stub_env.rows_out.values()):>5} rows, "
+                  f"net {max(wall - cpu, 0) * 1000:5.0f} ms (wall {wall * 1000:5.0f}, stub CPU {cpu * 1000:4.0f}), "
+                  f"{len(chunks_map)} chunks for {len(relevance)} signals  {dict(requests)}")
+
+        same_chunks = outputs["before"][0] == outputs["after "][0]
+        same_relevance = outputs["before"][1] == outputs["after "][1]
+        print(f"  same chunks: {same_chunks}, same per-signal relevance: {same_relevance}")
+
+
+if __name__ == "__main__":
+    num_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    db_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    ms_per_mib = float(sys.argv[3]) if len(sys.argv) > 3 else 100
+    shared_link = len(sys.argv) > 4 and sys.argv[4] == "shared"
+    main(num_sessions, db_latency, ms_per_mib, shared_link)
@@ -0,0 +1,139 @@
+"""
+Phase 4 end to end against the stub transport: one long-context reasoning call versus
+hierarchical map-reduce (partial calls per group of sessions, REASONING_CONCURRENCY at a
+time, then one merge call), as the number of sessions in the report grows. Lectures move
+through the textbook week by week, with some revisits of earlier topics.
+
+The model is simulated (stub_env.latency_ms): base + per 1k prompt tokens + per 1k output
+tokens. Also runs the hierarchical mode with one partial call failing.
+
+Usage: python scripts/bench_hierarchical_reasoning.py [base_ms] [ms_per_prompt_ktoken] [ms_per_output_ktoken]
+"""
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+
+SIGNALS_PER_SESSION = 40
+TOPICS_PER_WEEK = 4
+REVISIT_RATIO = 0.2
+CHUNKS_PER_TOPIC = 10
+PARTITION_SIGNALS = 120 # 3 sessions per partial call
+SESSIONS = [6, 12, 24, 48]
+
+
+def seed(db, num_sessions, rng):
+    subject_id = str(uuid.uuid4())
+    num_topics = num_sessions * TOPICS_PER_WEEK
+    chunks = []
+    for i in range(num_topics * CHUNKS_PER_TOPIC):
+        vec = [0.0] * 768
+        vec[i % 768], vec[(i // CHUNKS_PER_TOPIC) % 768] = 1.0, 3.0
+        chunks.append({"chunk_id": str(uuid.uuid4()), "source_id": "src", "page_start": i // 4, "page_end": i // 4,
+                       "anchor_path": None, "content_text": f"topic {i // CHUNKS_PER_TOPIC} " + "노드 해석 KCL 전압 " * 60,
+                       "embedding": vec, "token_count": 250})
+    db.tables.update({"subjects": [{"subject_id": subject_id, "name": "회로이론"}], "sessions": [], "signals": [],
+                      "retrieval_results": [], "signal_queries": [], "chunks": chunks, "session_reports": []})
+
+    session_ids = [str(uuid.uuid4()) for _ in range(num_sessions)]
+    for week, sid in enumerate(session_ids):
+        db.tables["sessions"].append({"session_id": sid, "subject_id": subject_id})
+        searched = set()
+        for j in range(SIGNALS_PER_SESSION):
+            if week and rng.random() < REVISIT_RATIO:
+                topic = rng.randrange(week * TOPICS_PER_WEEK)
+            else:
+                topic = week * TOPICS_PER_WEEK + rng.randrange(TOPICS_PER_WEEK)
+            signal_id = str(uuid.uuid4())
+            db.tables["signals"].append({"signal_id": signal_id, "session_id": sid, "chunk_index": j // 4,
+                                         "t0_sec": 10.0 * j, "t1_sec": 10.0 * j + 6, "signal_type": "likely",
+                                         "content": f"topic {topic}: 시험에 나옵니다"})
+            query_text = f"topic {topic} q"
+            db.tables["signal_queries"].append({"session_id": sid, "signal_id": signal_id, "query_text": query_text})
+            if query_text not in searched:
+                searched.add(query_text)
+                db.tables["retrieval_results"].extend({
+                    "session_id": sid, "query_text": query_text, "rrf_score": 1 / (61 + rank),
+                    "chunk_id": chunks[topic * CHUNKS_PER_TOPIC + rank]["chunk_id"]} for rank in range(CHUNKS_PER_TOPIC))
+    return subject_id, session_ids
+
+
+def make_handler(failing_signal=None):
+    from src.phase4.map_reduce import MERGE_SYSTEM_PROMPT, REPORT_KEYS
+
+    def handler(system, contents):
+        if system == MERGE_SYSTEM_PROMPT:
+            # Same-titled items merge into one group
+            groups = {}
+            for item in json.loads(contents):
+                group = groups.setdefault(item["title"], {**item, "merged_from": []})
+                group["merged_from"].append(item["id"])
+            return json.dumps({k: [{f: g[f] for f in ("title", "why", "confidence", "merged_from")}
+                                   for g in groups.values() if g["category"] == k] for k in REPORT_KEYS},
+                              ensure_ascii=False)
+        if failing_signal and failing_signal in contents:
+            raise RuntimeError("simulated 503")
+        items = {}
+        for signal_id, topic in re.findall(r"\[#SIGNAL id=(\S+) .*?\] topic (\d+):", contents):
+            chunk = re.search(rf"\[\[CHUNK id=(\S+) [^\n]*\]\]\ntopic {topic} ", contents)
+            item = items.setdefault(topic, {"title": f"주제 {topic}", "why": "교수님이 강조한 부분, 교재 근거 있음",
+                                            "confidence": 0.8, "audio_refs": [], "citations": []})
+            item["audio_refs"].append({"signal_id": signal_id})
+            if chunk and not item["citations"]:
+                item["citations"].append({"chunk_id": chunk.group(1), "reason": "정의와 예제"})
+        return json.dumps({"professor_mentioned": [], "likely": list(items.values()), "trap_warnings": []},
+                          ensure_ascii=False)
+    return handler
+
+
+def main(base_ms, prompt_ms, output_ms):
+    db = stub_env.install()
+    stub_env.latency_ms.update(handshake=0, db=0, genai_base=base_ms,
+                               genai_per_ktoken=prompt_ms, genai_out_per_ktoken=output_ms)
+
+    from src.shared.config import Config
+    from src.phase4.map_reduce import MERGE_SYSTEM_PROMPT
+    from src.phase4.reasoning_pipeline import ReasoningPipeline
+    logging.getLogger().setLevel(logging.WARNING)
+    Config.REASONING_PARTITION_SIGNALS = PARTITION_SIGNALS
+    Config.REPORT_CACHE_ENABLED = False # every run here must reach the model
+
+    rng = random.Random(0)
+    print(f"simulated model: {base_ms} ms + {prompt_ms} ms/1k prompt tokens + {output_ms} ms/1k output tokens; "
+          f"{SIGNALS_PER_SESSION} signals/session, partitions <= {PARTITION_SIGNALS} signals, "
+          f"{Config.REASONING_CONCURRENCY} concurrent")
+    for num_sessions in SESSIONS:
+        subject_id, session_ids = seed(db, num_sessions, rng)
+        runs = [("single", None), ("hierarchical", None), ("hierarchical", db.tables["signals"][0]["signal_id"])]
+        for mode, failing in runs:
+            Config.REASONING_MODE = mode
+            stub_env.genai_handler = make_handler(failing)
+            stub_env.genai_calls.clear()
+            started = time.perf_counter()
+            ReasoningPipeline(session_ids, subject_id).run()
+            elapsed = time.perf_counter() - started
+
+            partial = [c for c in stub_env.genai_calls if c["system"] != MERGE_SYSTEM_PROMPT]
+            merge = [c for c in stub_env.genai_calls if c["system"] == MERGE_SYSTEM_PROMPT]
+            report = db.tables["session_reports"][-1]["report_json"]
+            refs = sum(len(i["audio_refs"]) for v in report.values() for i in v)
+            label = mode + (", 1 part fails" if failing else "")
+            print(f"  {num_sessions:2d} sessions {label:26s}: {elapsed:5.1f}s total | "
+                  f"{len(partial):2d} reasoning calls, largest prompt ~{max(c['prompt_tokens'] for c in partial):6d} tok, "
+                  f"slowest {max(c['seconds'] for c in partial):4.1f}s"
+                  + (f" | merge ~{merge[0]['prompt_tokens']:5d} tok {merge[0]['seconds']:4.1f}s" if merge else "")
+                  + f" | {refs}/{num_sessions * SIGNALS_PER_SESSION} signals in report")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [500, 40, 1500][len(args):]))
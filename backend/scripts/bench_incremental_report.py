@@ -0,0 +1,81 @@
+"""
+Weekly report refreshes over a growing semester against the stub transport: every week the
+report is regenerated for all sessions so far, from scratch versus as a delta over the stored
+report state (phase4/report_state.py). Reports model calls, prompt tokens and simulated time
+per refresh. Same synthetic lectures and model stub as bench_hierarchical_reasoning.py.
+
+Usage: python scripts/bench_incremental_report.py [weeks] [base_ms] [ms_per_prompt_ktoken] [ms_per_output_ktoken]
+"""
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+from bench_hierarchical_reasoning import seed, make_handler
+
+
+def make_delta_aware_handler():
+    from src.phase4.report_state import DELTA_SYSTEM_PROMPT
+    from src.phase4.map_reduce import REPORT_KEYS
+    reason = make_handler()
+
+    def handler(system, contents):
+        if system != DELTA_SYSTEM_PROMPT:
+            return reason(system, contents)
+        items_json, new_context = contents.split("\n\n", 1)
+        existing = {i["title"]: i for i in json.loads(items_json.split("\n", 1)[1])}
+        fresh = json.loads(reason(None, new_context))
+        out = {k: [] for k in REPORT_KEYS}
+        for key in REPORT_KEYS:
+            for item in fresh[key]:
+                match = existing.get(item["title"])
+                out[match["category"] if match else key].append({**item, "merged_from": [match["id"]] if match else []})
+        return json.dumps(out, ensure_ascii=False)
+    return handler
+
+
+def main(weeks, base_ms, prompt_ms, output_ms):
+    db = stub_env.install()
+    stub_env.latency_ms.update(handshake=0, db=0, genai_base=base_ms,
+                               genai_per_ktoken=prompt_ms, genai_out_per_ktoken=output_ms)
+    db.rpc_handlers["prune_report_states"] = lambda params: 0
+
+    from src.shared.config import Config
+    from src.phase4.reasoning_pipeline import ReasoningPipeline
+    logging.getLogger().setLevel(logging.WARNING)
+    stub_env.genai_handler = make_delta_aware_handler()
+    Config.REPORT_CACHE_ENABLED = False # every run here must reach the model
+
+    subject_id, session_ids = seed(db, weeks, random.Random(0))
+    print(f"{weeks} weekly refreshes, simulated model {base_ms} ms + {prompt_ms} ms/1k prompt + "
+          f"{output_ms} ms/1k output tokens, partitions <= {Config.REASONING_PARTITION_SIGNALS} signals")
+    totals = {False: [0, 0.0], True: [0, 0.0]}
+    for week in range(1, weeks + 1):
+        line = []
+        for incremental in (False, True):
+            Config.REPORT_INCREMENTAL = incremental # off: no state is read or written
+            stub_env.genai_calls.clear()
+            started = time.perf_counter()
+            ReasoningPipeline(session_ids[:week], subject_id).run()
+            elapsed = time.perf_counter() - started
+            tokens = sum(c["prompt_tokens"] for c in stub_env.genai_calls)
+            report = db.tables["session_reports"][-1]["report_json"]
+            refs = len({r["signal_id"] for v in report.values() for i in v for r in i["audio_refs"]})
+            totals[incremental][0] += tokens
+            totals[incremental][1] += elapsed
+            line.append(f"{len(stub_env.genai_calls):2d} calls ~{tokens:6d} tok {elapsed:4.1f}s {refs:4d} signals")
+        print(f"  week {week:2d}: from scratch {line[0]} | incremental {line[1]}")
+    print(f"  semester: from scratch ~{totals[False][0]} prompt tokens {totals[False][1]:.0f}s, "
+          f"incremental ~{totals[True][0]} tokens {totals[True][1]:.0f}s "
+          f"({1 - totals[True][0] / totals[False][0]:.0%} fewer tokens)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [16, 100, 8, 300][len(args):]))
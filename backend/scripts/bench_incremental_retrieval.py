@@ -0,0 +1,73 @@
+"""
+Re-runs Phase 3 on the same session against the stub transport and counts embedding
+texts, search RPCs and stored rows per run: full run, no-op rerun, a rerun after
+new signals arrive and a few signals' queries are edited, then a rerun after a new
+textbook is ingested for the subject (every signal is searched again).
+
+Usage: python scripts/bench_incremental_retrieval.py [num_signals]
+"""
+import os
+import sys
+import uuid
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+
+
+def main(num_signals: int):
+    db = stub_env.install()
+    stub_env.latency_ms.update(handshake=0, db=0)
+
+    def stub_rows(query):
+        return [{"chunk_id": f"{query}-c{i}", "rank_vector": i + 1, "rank_keyword": None,
+                 "score_vector": 0.9, "score_keyword": None, "rrf_score": 1 / (61 + i)} for i in range(10)]
+
+    db.rpc_handlers["hybrid_search_rrf_batch"] = lambda params: [
+        dict(row, query_index=i) for i, q in enumerate(params["p_query_texts"]) for row in stub_rows(q)]
+
+    def prune_orphan_retrieval_results(params):
+        linked = {l["query_text"] for l in db.tables.get("signal_queries", [])}
+        before = db.tables.get("retrieval_results", [])
+        db.tables["retrieval_results"] = [r for r in before if r["query_text"] in linked]
+        return len(before) - len(db.tables["retrieval_results"])
+
+    db.rpc_handlers["prune_orphan_retrieval_results"] = prune_orphan_retrieval_results
+    subject_id = db.seed_subject("s1")
+    versions = {subject_id: 1}
+    db.rpc_handlers["subject_source_version"] = lambda params: versions.get(params["p_subject_id"], 0)
+
+    from src.phase3.retrieval_pipeline import RetrievalPipeline
+
+    def add_signals(n, offset):
+        db.table("signals").insert([
+            {"signal_id": str(uuid.uuid4()), "session_id": "s1",
+             "search_queries": [f"question {offset + i} part a", f"question {offset + i} part b"]}
+            for i in range(n)]).execute()
+
+    def run(label):
+        stub_env.calls.clear()
+        RetrievalPipeline("s1").run()
+        print(f"  {label:28s}: {stub_env.calls['embedding.texts']:4d} texts embedded, "
+              f"{stub_env.calls['rpc.hybrid_search_rrf_batch']:2d} search RPCs, "
+              f"{len(db.tables.get('retrieval_results', [])):5d} results, "
+              f"{len(db.tables.get('signal_queries', [])):4d} links")
+
+    add_signals(num_signals, 0)
+    print(f"session with {num_signals} signals")
+    run("first run")
+    run("rerun (nothing changed)")
+    add_signals(10, 10_000)
+    for s in db.tables["signals"][:5]:
+        s["search_queries"] = [q + " revised" for q in s["search_queries"]]
+    run("rerun (+10 new, 5 edited)")
+    run("rerun (nothing changed)")
+    db.tables["sources"].append({"source_id": str(uuid.uuid4()), "subject_id": subject_id, "active": True})
+    versions[subject_id] += 1
+    run("rerun (textbook ingested)")
+    run("rerun (nothing changed)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [100][len(args):]))
@@ -0,0 +1,87 @@
+"""
+Compares Phase 4 progress logging before and after the buffered JobLogWriter,
+against the local stub transport.
+
+"before" replays the old ReasoningPipeline._log: every message rewrites the whole
+sessions.logs array of every session synchronously. "after" uses JobLogWriter,
+which buffers entries and appends only the new ones through append_job_logs.
+Reported: DB requests, request payload bytes and time the caller spent blocked
+in log calls (work between messages is simulated with a short sleep).
+
+Usage: python scripts/bench_job_log.py [num_messages] [num_sessions] [db_latency_ms]
+"""
+import os
+import sys
+import json
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+
+
+def main(num_messages: int, num_sessions: int, db_latency: float):
+    db = stub_env.install()
+    stub_env.latency_ms["db"] = db_latency
+
+    from src.shared.job_log import JobLogWriter
+
+    session_ids = [f"s{i}" for i in range(num_sessions)]
+    payload_bytes = [0]
+
+    def append_job_logs(params):
+        payload_bytes[0] += len(json.dumps(params))
+        entries = params["p_entries"]
+        for row in db.tables["sessions"]:
+            if row["session_id"] in params["p_session_ids"]:
+                logs = entries if params["p_reset"] else row.get("logs", []) + entries
+                row["logs"] = logs[-params["p_tail"]:]
+        db.tables.setdefault("job_logs", []).extend(
+            {"session_id": sid, "phase": params["p_phase"], **e} for sid in params["p_session_ids"] for e in entries)
+        return len(entries)
+
+    db.rpc_handlers["append_job_logs"] = append_job_logs
+
+    def legacy_logger():
+        buffer = []
+
+        def log(message):
+            buffer.append({"ts": datetime.now().isoformat(), "msg": message})
+            payload_bytes[0] += len(json.dumps({"logs": buffer}))
+            db.table("sessions").update({"logs": list(buffer)}).in_("session_id", session_ids).execute()
+        return log
+
+    for label in ("before", "after "):
+        db.tables.clear()
+        db.tables["sessions"] = [{"session_id": sid, "logs": []} for sid in session_ids]
+        stub_env.calls.clear()
+        payload_bytes[0] = 0
+        writer = JobLogWriter(session_ids, phase="4", reset=True, flush_interval_sec=0.5) if label == "after " else None
+        log = writer.log if writer else legacy_logger()
+        if writer:
+            writer.start()
+
+        blocked = 0.0
+        start = time.perf_counter()
+        for i in range(num_messages):
+            t = time.perf_counter()
+            log(f"Progress message {i}: fetched {i * 37} rows for {num_sessions} sessions")
+            blocked += time.perf_counter() - t
+            time.sleep(0.02)
+        if writer:
+            writer.close()
+        elapsed = time.perf_counter() - start
+
+        requests = sum(stub_env.calls.values())
+        shown = len(db.tables["sessions"][0]["logs"])
+        print(f"[{label}] {num_messages} messages x {num_sessions} sessions in {elapsed:.2f}s: "
+              f"{requests} requests, {payload_bytes[0] / 1024:.1f} KiB sent, "
+              f"{blocked * 1000:.0f} ms blocked in log calls, {shown} entries in sessions.logs")
+
+
+if __name__ == "__main__":
+    num_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    num_sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    db_latency = float(sys.argv[3]) if len(sys.argv) > 3 else 30
+    main(num_messages, num_sessions, db_latency)
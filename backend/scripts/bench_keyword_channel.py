@@ -0,0 +1,76 @@
+"""
+Compares the keyword channel modes of hybrid_keyword_channel ('trgm', 'word', 'fts')
+on a local Postgres (see pg_bench.py): latency, how often a query gets any keyword
+hits, and how many of the returned chunks are on the query's topic.
+
+Chunk text gets Korean particles glued to terms ("노드 해석을", "시정수는") the way
+lecture textbooks read, while queries use the bare terms.
+
+Usage: DATABASE_URL=... python scripts/bench_keyword_channel.py [num_chunks] [num_queries]
+"""
+import os
+import sys
+import random
+
+sys.path.append(os.path.dirname(__file__))
+
+import pg_bench
+
+MODES = ["trgm", "word", "fts"]
+LIMIT = 50
+PARTICLES = ["", "", "을", "를", "은", "는", "의", "에서", "으로"]
+
+
+def add_particles(corpus, seed=5):
+    rng = random.Random(seed)
+    for c in corpus:
+        text = c["content_text"]
+        for term in c["terms"]:
+            parts = text.split(term)
+            text = parts[0] + "".join(term + rng.choice(PARTICLES) + p for p in parts[1:])
+        c["content_text"] = text
+
+
+def keyword_search(conn, text, source_ids, mode):
+    with conn.cursor() as cur:
+        cur.execute("SELECT chunk_id FROM hybrid_keyword_channel(%s, %s, %s::uuid[], %s)",
+                    (text, LIMIT, source_ids, mode))
+        return [str(r[0]) for r in cur.fetchall()]
+
+
+def main(num_chunks: int, num_queries: int):
+    corpus = pg_bench.generate_corpus(num_chunks)
+    add_particles(corpus)
+    queries = pg_bench.generate_queries(corpus, num_queries)
+    topic_of = {c["chunk_id"]: c["topic"] for c in corpus}
+
+    conn = pg_bench.connect()
+    subject_id, source_id = pg_bench.seed_subject(conn, corpus)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE chunks")
+        print(f"{num_chunks} chunks, {len(queries)} queries, keyword top-{LIMIT}")
+        for scope_label, scope in (("scoped", [source_id]), ("global", None)):
+            for mode in MODES:
+                keyword_search(conn, queries[0]["text"], scope, mode)  # warm up
+                latencies, non_empty, on_topic, returned, found = [], 0, 0, 0, 0
+                for q in queries:
+                    ids, ms = pg_bench.timed(keyword_search, conn, q["text"], scope, mode)
+                    latencies.append(ms)
+                    non_empty += bool(ids)
+                    returned += len(ids)
+                    on_topic += sum(topic_of.get(i) == topic_of[q["relevant"]] for i in ids)
+                    found += q["relevant"] in ids
+                print(f"  {scope_label} {mode:4s}: p50 {pg_bench.percentile(latencies, 50):7.1f} ms  "
+                      f"p95 {pg_bench.percentile(latencies, 95):7.1f} ms  "
+                      f"non-empty {non_empty / len(queries):.2f}  "
+                      f"on-topic precision {on_topic / max(1, returned):.2f}  "
+                      f"target recall@{LIMIT} {found / len(queries):.2f}")
+    finally:
+        pg_bench.drop_subject(conn, subject_id)
+        conn.close()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [5000, 200][len(args):]))
@@ -0,0 +1,117 @@
+"""
+Benchmarks the in-process LocalSearchIndex (phase3/local_search.py) against the
+hybrid_search_rrf_batch RPC path on a synthetic corpus (see pg_bench.py).
+
+The local engine always runs. The RPC path runs only when DATABASE_URL points at a
+local Postgres with the phase SQL applied. It is called subject-scoped (p_source_ids),
+as Phase 3 does, and the bench then also reports the local engine's cold start (the
+chunk load LocalSearchIndex.load runs, plus the build) and how many of the RPC's top-k
+chunks the local engine returns for the same query. Both use the given keyword channel
+('fts' by default, as Phase 3; the local engine also supports 'trgm').
+
+Usage: [DATABASE_URL=...] python scripts/bench_local_search.py [num_chunks] [num_queries] [batch_size] [keyword_mode]
+"""
+import os
+import sys
+import json
+import time
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+stub_env.install()  # LocalSearchIndex imports the Supabase client module; nothing is called
+
+import pg_bench
+from src.phase3.local_search import LocalSearchIndex
+
+MATCH_COUNT = 50
+RRF_K = 60
+
+
+def run_local(index, queries, batch_size, keyword_mode):
+    results = []
+    for i in range(0, len(queries), batch_size):
+        batch = queries[i:i + batch_size]
+        rows = index.search_batch([q["text"] for q in batch], [q["embedding"] for q in batch], MATCH_COUNT, RRF_K,
+                                  keyword_mode)
+        grouped = [[] for _ in batch]
+        for row in rows:
+            grouped[row["query_index"]].append(row["chunk_id"])
+        results.extend(grouped)
+    return results
+
+
+def run_rpc(conn, queries, batch_size, source_ids, keyword_mode):
+    results = []
+    with conn.cursor() as cur:
+        for i in range(0, len(queries), batch_size):
+            batch = queries[i:i + batch_size]
+            cur.execute("""SELECT query_index, chunk_id
+                           FROM hybrid_search_rrf_batch(%s, %s::jsonb, %s, %s, p_source_ids => %s::uuid[],
+                                                        p_keyword_mode => %s)""",
+                        ([q["text"] for q in batch],
+                         json.dumps([[round(v, 5) for v in q["embedding"]] for q in batch]),
+                         MATCH_COUNT, RRF_K, source_ids, keyword_mode))
+            grouped = [[] for _ in batch]
+            for query_index, chunk_id in cur.fetchall():
+                grouped[query_index].append(str(chunk_id))
+            results.extend(grouped)
+    return results
+
+
+def load_from_db(conn, source_ids):
+    # Same query as LocalSearchIndex.load's pooled path
+    with conn.cursor() as cur:
+        cur.execute("""SELECT chunk_id::text, content_text, page_start, page_end, anchor_path, embedding::text
+                       FROM chunks WHERE source_id = ANY(%s::uuid[])""", (source_ids,))
+        columns = [d[0] for d in cur.description]
+        chunks = [dict(zip(columns, row)) for row in cur.fetchall()]
+    return LocalSearchIndex(chunks)
+
+
+def recall(results, queries):
+    return sum(q["relevant"] in set(r) for r, q in zip(results, queries)) / len(queries)
+
+
+def main(num_chunks: int, num_queries: int, batch_size: int, keyword_mode: str):
+    started = time.perf_counter()
+    corpus = pg_bench.generate_corpus(num_chunks)
+    queries = pg_bench.generate_queries(corpus, num_queries)
+    print(f"{num_chunks} chunks, {len(queries)} queries, keyword '{keyword_mode}' "
+          f"(corpus generated in {time.perf_counter() - started:.1f}s)")
+
+    index, build_ms = pg_bench.timed(LocalSearchIndex, corpus)
+    print(f"  local build: {build_ms:.0f} ms, {index.embeddings.nbytes / 2**20:.1f} MiB float16")
+    run_local(index, queries[:batch_size], batch_size, keyword_mode)  # warm up
+    local, local_ms = pg_bench.timed(run_local, index, queries, batch_size, keyword_mode)
+    print(f"  local  : {local_ms:7.0f} ms total, {local_ms / len(queries):6.2f} ms/query, "
+          f"recall@{MATCH_COUNT} {recall(local, queries):.2f}")
+
+    if not os.getenv("DATABASE_URL"):
+        print("  rpc    : skipped (DATABASE_URL not set)")
+        return
+
+    conn = pg_bench.connect()
+    subject_id, source_id = pg_bench.seed_subject(conn, corpus)
+    source_ids = [source_id]
+    try:
+        _, load_ms = pg_bench.timed(load_from_db, conn, source_ids)
+        print(f"  local cold start from Postgres (load + build): {load_ms:.0f} ms")
+        run_rpc(conn, queries[:batch_size], batch_size, source_ids, keyword_mode)  # warm caches
+        remote, rpc_ms = pg_bench.timed(run_rpc, conn, queries, batch_size, source_ids, keyword_mode)
+        overlap = sum(len(set(l) & set(r)) / max(1, len(r)) for l, r in zip(local, remote)) / len(queries)
+        print(f"  rpc    : {rpc_ms:7.0f} ms total, {rpc_ms / len(queries):6.2f} ms/query, "
+              f"recall@{MATCH_COUNT} {recall(remote, queries):.2f}")
+        print(f"  local/rpc top-{MATCH_COUNT} overlap {overlap:.3f}")
+    finally:
+        pg_bench.drop_subject(conn, subject_id)
+        conn.close()
+
+
+if __name__ == "__main__":
+    num_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+    keyword_mode = sys.argv[4] if len(sys.argv) > 4 else "fts"
+    main(num_chunks, num_queries, batch_size, keyword_mode)
@@ -0,0 +1,128 @@
+"""
+Phase 4 REST fetches before and after the paged, projected fetch layer
+(shared/paged_fetch.py), against the local stub transport.
+
+"before" replays the old queries: select("*") of signals, one unpaged select of
+retrieval_results, and select("*") of chunks with every id in one in_() filter.
+"after" calls the ReasoningPipeline fetchers. The stub enforces PostgREST's
+max-rows (1000) so truncated results show up as missing rows, and charges
+DB latency per request plus transfer time per MiB of response. The stub's own
+Python filtering and sorting is timed in a zero-latency run and subtracted (net).
+
+Usage: python scripts/bench_paged_fetch.py [num_sessions] [db_latency_ms] [ms_per_mib]
+"""
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+
+SIGNALS_PER_SESSION = 40
+QUERIES_PER_SIGNAL = 3
+RESULTS_PER_QUERY = 10
+TEXTBOOK_CHUNKS = 6000
+CHUNK_COUNTS = [200, 600, 2000]
+
+
+def seed(db, num_sessions, rng):
+    subject_id = str(uuid.uuid4())
+    session_ids = [str(uuid.uuid4()) for _ in range(num_sessions)]
+    db.tables["subjects"] = [{"subject_id": subject_id, "name": "회로이론"}]
+    db.tables["sessions"] = [{"session_id": sid, "subject_id": subject_id} for sid in session_ids]
+    chunk_ids = [str(uuid.uuid4()) for _ in range(TEXTBOOK_CHUNKS)]
+    db.tables["chunks"] = [{
+        "chunk_id": cid, "source_id": "src-1", "page_start": i // 3, "page_end": i // 3,
+        "anchor_path": ["Ch", str(i // 60)], "token_count": 380, "chunk_type": "text",
+        "content_text": "회로 해석 KCL 노드 전압 " * rng.randint(40, 70),
+        "embedding": "[" + ",".join(f"{rng.uniform(-1, 1):.4f}" for _ in range(768)) + "]",
+    } for i, cid in enumerate(chunk_ids)]
+
+    signals, results, links = [], [], []
+    for sid in session_ids:
+        for j in range(SIGNALS_PER_SESSION):
+            signal_id = str(uuid.uuid4())
+            queries = [f"{sid[:8]}-{j} query {q}" for q in range(QUERIES_PER_SIGNAL)]
+            links.extend({"session_id": sid, "signal_id": signal_id, "query_text": q} for q in queries)
+            signals.append({
+                "signal_id": signal_id, "session_id": sid, "audio_chunk_id": str(uuid.uuid4()),
+                "chunk_index": j // 4, "signal_type": "hint", "t0_sec": 12.5 * j, "t1_sec": 12.5 * j + 8,
+                "content": "교수님: 이 부분 시험에 나옵니다, 노드 해석 꼭 보세요.", "search_queries": queries,
+                "created_at": "2025-01-01T00:00:00"
+            })
+            topic = rng.randrange(TEXTBOOK_CHUNKS - 40)
+            for q in queries:
+                for cid in rng.sample(chunk_ids[topic : topic + 40], RESULTS_PER_QUERY):
+                    results.append({"session_id": sid, "query_text": q, "chunk_id": cid, "rrf_score": rng.random()})
+    db.tables["signals"] = signals
+    db.tables["retrieval_results"] = results
+    db.tables["signal_queries"] = links
+    return subject_id, session_ids, chunk_ids
+
+
+def legacy_fetchers(supabase, session_ids):
+    return {
+        "signals": lambda: supabase.table("signals").select("*").in_("session_id", session_ids)
+            .order("chunk_index").order("t0_sec").execute().data,
+        "candidates": lambda: supabase.table("retrieval_results").select("session_id, query_text, chunk_id, rrf_score")
+            .in_("session_id", session_ids).execute().data,
+        "chunks": lambda ids: supabase.table("chunks").select("*").in_("chunk_id", ids).execute().data,
+    }
+
+
+def measure(fn, db_latency, ms_per_mib):
+    """(wall ms at the given latency, stub CPU ms at zero latency, requests, bytes, rows)."""
+    stub_env.latency_ms["db"], stub_env.latency_ms["db_per_mib"] = 0, 0
+    start = time.perf_counter()
+    fn()
+    cpu = time.perf_counter() - start
+    stub_env.latency_ms["db"], stub_env.latency_ms["db_per_mib"] = db_latency, ms_per_mib
+    stub_env.calls.clear()
+    stub_env.bytes_out.clear()
+    start = time.perf_counter()
+    rows = fn()
+    wall = time.perf_counter() - start
+    return wall * 1000, cpu * 1000, sum(stub_env.calls.values()), sum(stub_env.bytes_out.values()), len(rows)
+
+
+def main(num_sessions, db_latency, ms_per_mib):
+    rng = random.Random(7)
+    db = stub_env.install()
+    db.project = True
+    db.max_rows = 1000
+
+    from src.phase4.reasoning_pipeline import ReasoningPipeline
+
+    subject_id, session_ids, chunk_ids = seed(db, num_sessions, rng)
+    pipeline = ReasoningPipeline(session_ids, subject_id)
+    legacy = legacy_fetchers(db, session_ids)
+    print(f"{num_sessions} sessions: {len(db.tables['signals'])} signals, "
+          f"{len(db.tables['retrieval_results'])} retrieval rows; "
+          f"{db_latency:.0f} ms/request, {ms_per_mib:.0f} ms/MiB; net = wall - stub CPU")
+
+    cases = [
+        ("signals", len(db.tables["signals"]), legacy["signals"], pipeline._fetch_signals_aggregated),
+        ("candidates", len(db.tables["retrieval_results"]), legacy["candidates"], lambda: pipeline._fetch_evidence_candidates_aggregated(session_ids)),
+    ]
+    for n in CHUNK_COUNTS:
+        wanted = rng.sample(chunk_ids, n)
+        cases.append((f"{n} chunks", n, lambda w=wanted: legacy["chunks"](w), lambda w=wanted: pipeline._fetch_chunks(w)))
+        print(f"  id filter for {n} chunks: {len(','.join(wanted)) / 1024:.1f} KiB in one URL before, "
+              f"{len(','.join(wanted[:200])) / 1024:.1f} KiB per page after")
+
+    for name, expected, before, after in cases:
+        for label, fn in (("before", before), ("after ", after)):
+            wall, cpu, requests, size, rows = measure(fn, db_latency, ms_per_mib)
+            print(f"  [{label}] {name:<11} {rows:>5}/{expected:<5} rows, {requests:>3} requests, "
+                  f"{size / 1024:7.0f} KiB, net {max(wall - cpu, 0):5.0f} ms (wall {wall:5.0f}, stub CPU {cpu:4.0f})")
+
+
+if __name__ == "__main__":
+    num_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    db_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    ms_per_mib = float(sys.argv[3]) if len(sys.argv) > 3 else 100
+    main(num_sessions, db_latency, ms_per_mib)
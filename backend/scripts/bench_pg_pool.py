@@ -0,0 +1,76 @@
+"""
+Phase 3 search throughput over the pooled direct-Postgres layer (src/shared/pg.py)
+versus the REST path, on a local Postgres (see pg_bench.py). Both run the same scoped
+hybrid_search_rrf_batch batches:
+
+- REST: one batch at a time (RetrievalPipeline keeps REST search sequential), each call
+  paying rtt_ms of simulated PostgREST round trip (sleep, no CPU).
+- pooled: batches on 1, 2, 4 and 8 concurrent pool connections, each call paying
+  pool_rtt_ms (direct connection from the same region).
+
+Usage: DATABASE_URL=... python scripts/bench_pg_pool.py [num_chunks] [num_queries] [batch_size] [rtt_ms] [pool_rtt_ms] [keyword_mode]
+"""
+import os
+import sys
+import json
+import time
+import concurrent.futures
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+stub_env.install()  # only the Config import chain needs supabase/dotenv; Postgres is real
+
+import pg_bench
+from src.shared.pg import PgPool
+
+MATCH_COUNT = 50
+RRF_K = 60
+CONCURRENCY = [1, 2, 4, 8]
+
+
+def search_batch(pool, batch, source_ids, keyword_mode, rtt_ms):
+    time.sleep(rtt_ms / 1000)
+    return pool.query(
+        """SELECT query_index, chunk_id::text AS chunk_id
+           FROM hybrid_search_rrf_batch(%s, %s::jsonb, %s, %s, p_source_ids => %s::uuid[], p_keyword_mode => %s)""",
+        ([q["text"] for q in batch], json.dumps([[round(v, 5) for v in q["embedding"]] for q in batch]),
+         MATCH_COUNT, RRF_K, source_ids, keyword_mode))
+
+
+def run(pool, batches, source_ids, workers, keyword_mode, rtt_ms):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(len(rows) for rows in executor.map(
+            lambda b: search_batch(pool, b, source_ids, keyword_mode, rtt_ms), batches))
+
+
+def main(num_chunks: int, num_queries: int, batch_size: int, rtt_ms: float, pool_rtt_ms: float, keyword_mode: str):
+    conn = pg_bench.connect()
+    corpus = pg_bench.generate_corpus(num_chunks)
+    queries = pg_bench.generate_queries(corpus, num_queries)
+    subject_id, source_id = pg_bench.seed_subject(conn, corpus)
+    pool = PgPool(os.environ["DATABASE_URL"], 1, max(CONCURRENCY))
+    batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+    try:
+        print(f"{num_chunks} chunks, {len(queries)} queries in {len(batches)} batches of {batch_size}, "
+              f"keyword '{keyword_mode}', RTT {rtt_ms:.0f} ms REST / {pool_rtt_ms:.0f} ms pooled")
+        # Full pass without RTT first: warms the cache and gives the server-side floor
+        runs = [("server only, no RTT", 1, 0), ("REST (sequential)", 1, rtt_ms)]
+        runs += [(f"pooled, {workers} conns", workers, pool_rtt_ms) for workers in CONCURRENCY]
+        for label, workers, call_rtt_ms in runs:
+            rows, ms = pg_bench.timed(run, pool, batches, [source_id], workers, keyword_mode, call_rtt_ms)
+            print(f"  {label:<20}: {ms:7.0f} ms, {len(queries) / ms * 1000:6.1f} queries/s, {rows} rows")
+    finally:
+        pg_bench.drop_subject(conn, subject_id)
+        conn.close()
+
+
+if __name__ == "__main__":
+    num_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+    rtt_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 30
+    pool_rtt_ms = float(sys.argv[5]) if len(sys.argv) > 5 else 2
+    keyword_mode = sys.argv[6] if len(sys.argv) > 6 else "fts"
+    main(num_chunks, num_queries, batch_size, rtt_ms, pool_rtt_ms, keyword_mode)
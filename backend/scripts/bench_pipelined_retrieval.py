@@ -0,0 +1,89 @@
+"""
+Compares upload-to-evidence-ready time for sequential Phase 2 -> Phase 3 versus
+the pipelined per-chunk handoff, against the local stub transport.
+
+Gemini extraction, embedding and hybrid-search latencies are simulated with sleeps.
+
+Usage: python scripts/bench_pipelined_retrieval.py [num_chunks]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+
+EXTRACT_SEC = (2.0, 8.0)
+SEARCH_MS = 25
+
+
+def main(num_chunks: int):
+    db = stub_env.install()
+    stub_env.latency_ms.update(db=2, model=60)
+    db.rpc_handlers["apply_audio_chunk_status"] = lambda params: len(params["p_updates"])
+
+    def stub_rows():
+        return [{"chunk_id": f"c{i}", "rank_vector": i + 1, "rank_keyword": None,
+                 "score_vector": 0.9, "score_keyword": None, "rrf_score": 1 / (61 + i)} for i in range(5)]
+
+    def hybrid_search_rrf(params):
+        time.sleep(SEARCH_MS / 1000)
+        return stub_rows()
+
+    def hybrid_search_rrf_batch(params):
+        # one round trip plus a little server time per query
+        time.sleep(SEARCH_MS / 1000 + 0.003 * len(params["p_query_texts"]))
+        return [dict(row, query_index=i) for i in range(len(params["p_query_texts"])) for row in stub_rows()]
+
+    db.rpc_handlers["hybrid_search_rrf"] = hybrid_search_rrf
+    db.rpc_handlers["hybrid_search_rrf_batch"] = hybrid_search_rrf_batch
+
+    from src.phase2 import dispatcher, signal_extraction
+    from src.phase3.retrieval_pipeline import RetrievalPipeline, PipelinedRetrieval
+    from src.shared.status_writer import ChunkStatusWriter
+
+    rng = random.Random(7)
+    durations = [rng.uniform(*EXTRACT_SEC) for _ in range(num_chunks)]
+
+    signal_extraction._slice_audio = lambda uri, start, duration, chunk_id: stub_env.write_slice(chunk_id, f"{uri}@{start}")
+
+    def fake_extract(session_id, audio_chunk_id, gcs_uri, subject, exam_window):
+        idx = next(r["chunk_index"] for r in db.tables["audio_chunks"] if r["chunk_id"] == audio_chunk_id)
+        time.sleep(durations[idx])
+        return [{"signal_type": "hint", "content": f"signal {idx}-{j}", "t0_sec": j, "t1_sec": j + 1,
+                 "search_queries": [f"topic {idx} {j} a", f"topic {idx} {j} b", f"shared {j}"]}
+                for j in range(6)]
+
+    signal_extraction._call_gemini_extraction = fake_extract
+
+    for label, pipelined in (("sequential", False), ("pipelined ", True)):
+        db.tables.clear()
+        db.seed_subject("s1")
+        rows = [{"session_id": "s1", "chunk_index": i, "gcs_chunk_url": "gs://b/a.m4a",
+                 "start_offset_sec": i * 1800, "duration_sec": 1800, "status": "pending"}
+                for i in range(num_chunks)]
+        chunks = db.table("audio_chunks").insert(rows).execute().data
+
+        start = time.perf_counter()
+        retrieval = PipelinedRetrieval("s1") if pipelined else None
+        with ChunkStatusWriter(flush_interval_sec=0.5) as writer:
+            dispatcher.process_chunks_locally(chunks, "Circuits", "midterm", writer,
+                                              retrieval.submit if retrieval else None)
+        phase2_done = time.perf_counter() - start
+        if retrieval:
+            retrieval.finish()
+        else:
+            RetrievalPipeline("s1").run()
+        total = time.perf_counter() - start
+
+        print(f"[{label}] {num_chunks} chunks: phase 2 done at {phase2_done:.2f}s, "
+              f"evidence ready at {total:.2f}s (+{total - phase2_done:.2f}s after phase 2), "
+              f"{len(db.tables.get('retrieval_results', []))} results")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
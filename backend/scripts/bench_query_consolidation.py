@@ -0,0 +1,87 @@
+"""
+Measures how many hybrid searches query consolidation saves and what it costs in recall.
+
+Synthetic session: signals ask for topics, each topic phrased a few different ways
+(paraphrase = topic embedding + small noise). Search is an in-process exact cosine
+top-k over a synthetic corpus, standing in for the vector channel.
+
+Per signal, recall is |chunks(clustered) ∩ chunks(per-query)| / |chunks(per-query)|.
+
+Usage: python scripts/bench_query_consolidation.py [num_signals] [num_chunks]
+"""
+import os
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.phase3.query_consolidation import cluster_queries
+
+DIM = 768
+TOP_K = 50
+NUM_TOPICS = 40
+THRESHOLDS = [1.0, 0.97, 0.95, 0.93, 0.90]
+
+
+def unit(mat):
+    return mat / np.linalg.norm(mat, axis=-1, keepdims=True)
+
+
+def build(num_signals: int, num_chunks: int, rng):
+    centroids = unit(rng.normal(size=(NUM_TOPICS, DIM)))
+    corpus = unit(centroids[np.arange(num_chunks) % NUM_TOPICS] + rng.normal(scale=0.04, size=(num_chunks, DIM)))
+
+    # Each topic gets a few paraphrases; signals pick 3 queries from a couple of topics
+    paraphrases = {}
+    for t in range(NUM_TOPICS):
+        for p in range(4):
+            paraphrases[f"topic{t} v{p}"] = unit(centroids[t] + rng.normal(scale=0.008, size=DIM))
+
+    query_map = defaultdict(list)
+    for s in range(num_signals):
+        topics = rng.choice(NUM_TOPICS, size=2, replace=False)
+        for _ in range(3):
+            t = rng.choice(topics)
+            query_map[f"topic{t} v{rng.integers(4)}"].append(f"sig{s}")
+    embeddings = [paraphrases[q].tolist() for q in query_map]
+    return corpus, query_map, embeddings
+
+
+def search(corpus, embedding):
+    scores = corpus @ np.asarray(embedding)
+    return set(np.argpartition(-scores, TOP_K)[:TOP_K].tolist())
+
+
+def per_signal(query_map, results_by_query):
+    chunks = defaultdict(set)
+    for q, sids in query_map.items():
+        for sid in sids:
+            chunks[sid] |= results_by_query[q]
+    return chunks
+
+
+def main(num_signals: int, num_chunks: int):
+    rng = np.random.default_rng(0)
+    corpus, query_map, embeddings = build(num_signals, num_chunks, rng)
+    baseline = per_signal(query_map, {q: search(corpus, e) for q, e in zip(query_map, embeddings)})
+    print(f"{num_signals} signals, {len(query_map)} unique queries, {num_chunks} chunks, top-{TOP_K}")
+
+    for threshold in THRESHOLDS:
+        clusters = cluster_queries(query_map, embeddings, threshold)
+        results = {}
+        for c in clusters:
+            hits = search(corpus, c.embedding)
+            for m in c.members:
+                results[m] = hits
+        clustered = per_signal(query_map, results)
+        recalls = [len(clustered[s] & baseline[s]) / len(baseline[s]) for s in baseline]
+        print(f"  threshold {threshold:.2f}: {len(clusters):4d} searches "
+              f"(reduction {1 - len(clusters) / len(query_map):4.0%}), "
+              f"evidence recall mean {np.mean(recalls):.3f} min {np.min(recalls):.3f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [150, 5000][len(args):]))
@@ -0,0 +1,80 @@
+"""
+Repeated report jobs for the same sessions against the stub transport, with the Phase 4
+report cache (phase4/report_cache.py) on. Each step either re-triggers the job unchanged
+or changes one input first; reported per run: model calls, prompt tokens, time, and
+whether the cache hit shows up in sessions.logs. Same synthetic lectures and model stub as
+bench_hierarchical_reasoning.py.
+
+Usage: python scripts/bench_report_cache.py [num_sessions] [base_ms] [ms_per_prompt_ktoken] [ms_per_output_ktoken]
+"""
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+from bench_hierarchical_reasoning import seed, make_handler
+
+
+def main(num_sessions, base_ms, prompt_ms, output_ms):
+    db = stub_env.install()
+    stub_env.latency_ms.update(handshake=0, db=0, genai_base=base_ms,
+                               genai_per_ktoken=prompt_ms, genai_out_per_ktoken=output_ms)
+    db.rpc_handlers["prune_report_states"] = lambda params: 0
+
+    from src.shared.config import Config
+    from src.phase4.reasoning_pipeline import ReasoningPipeline
+    logging.getLogger().setLevel(logging.WARNING)
+    stub_env.genai_handler = make_handler()
+    Config.REPORT_CACHE_ENABLED = True
+
+    subject_id, session_ids = seed(db, num_sessions, random.Random(0))
+
+    def edit_signal():
+        db.tables["signals"][5]["content"] += " (수정됨)"
+
+    def new_retrieval_row():
+        # A newly ingested textbook chunk now ranks for one query
+        chunk = {**db.tables["chunks"][0], "chunk_id": str(uuid.uuid4())}
+        db.tables["chunks"].append(chunk)
+        db.tables["retrieval_results"].append({**db.tables["retrieval_results"][0], "chunk_id": chunk["chunk_id"]})
+
+    def switch_model():
+        Config.REASONING_MODEL_NAME += "-next"
+
+    steps = [
+        ("first job", None),
+        ("re-triggered, nothing changed", None),
+        ("re-triggered again", None),
+        ("one signal's content edited", edit_signal),
+        ("re-triggered", None),
+        ("Phase 3 found another chunk", new_retrieval_row),
+        ("reasoning model changed", switch_model),
+        ("re-triggered", None),
+    ]
+    print(f"{num_sessions} sessions, simulated model {base_ms} ms + {prompt_ms} ms/1k prompt + {output_ms} ms/1k output tokens")
+    totals = [0, 0.0]
+    for label, change in steps:
+        if change:
+            change()
+        stub_env.genai_calls.clear()
+        started = time.perf_counter()
+        ReasoningPipeline(session_ids, subject_id).run()
+        elapsed = time.perf_counter() - started
+        tokens = sum(c["prompt_tokens"] for c in stub_env.genai_calls)
+        logs = [e["msg"] for e in db.tables["sessions"][0].get("logs") or []]
+        hit = any(m.startswith("Report cache hit") for m in logs)
+        totals[0] += tokens
+        totals[1] += elapsed
+        print(f"  {label:32s}: {'HIT ' if hit else 'miss'} {len(stub_env.genai_calls):2d} calls ~{tokens:6d} tok {elapsed:5.2f}s")
+    print(f"  total: ~{totals[0]} prompt tokens, {totals[1]:.1f}s for {len(steps)} jobs")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [12, 100, 8, 300][len(args):]))
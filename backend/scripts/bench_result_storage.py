@@ -0,0 +1,64 @@
+"""
+Compares Phase 3 write volume and Phase 4 fetch size for the legacy signal x result
+fan-out (evidence_candidates) versus retrieval_results + signal_queries, using the
+stub transport.
+
+Signals share a pool of course queries the way real sessions do ("KCL", "테브난 등가" ...).
+
+Usage: python scripts/bench_result_storage.py [num_signals] [query_pool]
+"""
+import os
+import sys
+import json
+import random
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+
+FINAL_K = 50
+
+
+def main(num_signals: int, query_pool: int):
+    db = stub_env.install()
+    stub_env.latency_ms.update(handshake=0, db=0)
+    os.environ["QUERY_CLUSTER_THRESHOLD"] = "1.0"  # measure storage only, not query collapsing
+
+    def stub_rows(seed):
+        return [{"chunk_id": f"{seed}-c{i}", "rank_vector": i + 1, "rank_keyword": i + 1,
+                 "score_vector": 0.9, "score_keyword": 0.4, "rrf_score": 2 / (61 + i)} for i in range(FINAL_K)]
+
+    db.rpc_handlers["hybrid_search_rrf_batch"] = lambda params: [
+        dict(row, query_index=i) for i, q in enumerate(params["p_query_texts"]) for row in stub_rows(q)]
+    db.seed_subject("s1")
+
+    from src.phase3.retrieval_pipeline import RetrievalPipeline
+
+    rng = random.Random(3)
+    pool = [f"course topic {i}" for i in range(query_pool)]
+    signals = [{"signal_id": f"sig{i}", "search_queries": rng.sample(pool, 3)} for i in range(num_signals)]
+
+    pipeline = RetrievalPipeline("s1")
+    pipeline.retrieve_for_signals(signals)
+
+    results = db.tables.get("retrieval_results", [])
+    links = db.tables.get("signal_queries", [])
+    by_query = {}
+    for r in results:
+        by_query.setdefault(r["query_text"], []).append(r)
+    legacy = [dict(r, signal_id=l["signal_id"], query_used=r["query_text"])
+              for l in links for r in by_query.get(l["query_text"], [])]
+
+    def size(rows): return len(json.dumps(rows, ensure_ascii=False).encode())
+    fetch = [{k: r[k] for k in ("session_id", "query_text", "chunk_id", "rrf_score")} for r in results]
+
+    print(f"{num_signals} signals x 3 queries from a pool of {query_pool}, FINAL_K={FINAL_K}")
+    print(f"  legacy evidence_candidates : {len(legacy):6d} rows inserted, Phase 4 fetch {size(legacy) / 1024:8.1f} KiB")
+    print(f"  retrieval_results + links  : {len(results):6d} + {len(links)} rows inserted, "
+          f"Phase 4 fetch {size(fetch) / 1024:8.1f} KiB")
+    print(f"  fan-out factor             : {len(legacy) / max(1, len(results)):.1f}x")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [200, 60][len(args):]))
@@ -0,0 +1,120 @@
+"""
+One semester of weekly sessions for a subject against the stub transport: how many queries
+still reach hybrid search with the cross-session retrieval cache (phase3/retrieval_cache.py)
+versus without it. Each week's questions mostly revisit earlier topics; a second textbook
+is ingested mid-semester, which bumps the subject's source version (the sources trigger in
+retrieval_cache.sql, emulated here) so that week starts cold again.
+
+Usage: PYTHONHASHSEED=0 python scripts/bench_retrieval_cache.py [weeks] [signals_per_week]
+"""
+import os
+import random
+import sys
+import uuid
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+
+COURSE_TOPICS = 400
+REVISIT_RATIO = 0.7
+INGEST_WEEK = 8
+
+
+def course_vocabulary(rng):
+    syllables = ["ka", "ro", "mi", "te", "su", "na", "vo", "li", "pe", "da", "gu", "shi", "ze", "bo"]
+    word = lambda: "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+    return [f"{word()} {word()} {word()}" for _ in range(COURSE_TOPICS)]
+
+
+def main(weeks: int, signals_per_week: int):
+    db = stub_env.install()
+    stub_env.latency_ms.update(handshake=0, db=0)
+    searched = {"texts": 0}
+    versions = {}
+
+    def search(params):
+        searched["texts"] += len(params["p_query_texts"])
+        return [{"query_index": i, "chunk_id": f"{q}-c{j}", "rank_vector": j + 1, "rank_keyword": None,
+                 "score_vector": 0.9, "score_keyword": None, "rrf_score": 1 / (61 + j)}
+                for i, q in enumerate(params["p_query_texts"]) for j in range(10)]
+
+    def fetch_retrieval_cache(params):
+        keys = set(params["p_keys"])
+        return [{"cache_key": r["cache_key"], "results": r["results"]}
+                for r in db.tables.get("retrieval_cache", [])
+                if r["subject_id"] == params["p_subject_id"] and r["cache_key"] in keys
+                and r["source_version"] == params["p_version"]]
+
+    def prune_retrieval_cache(params):
+        rows = db.tables.get("retrieval_cache", [])
+        subject_id = params["p_subject_id"]
+        db.tables["retrieval_cache"] = [r for r in rows if r["subject_id"] != subject_id
+                                        or r["source_version"] >= versions.get(subject_id, 0)]
+        return len(rows) - len(db.tables["retrieval_cache"])
+
+    def prune_orphan_retrieval_results(params):
+        linked = {(l["session_id"], l["query_text"]) for l in db.tables.get("signal_queries", [])}
+        db.tables["retrieval_results"] = [r for r in db.tables.get("retrieval_results", [])
+                                          if (r["session_id"], r["query_text"]) in linked]
+        return 0
+
+    db.rpc_handlers.update({
+        "hybrid_search_rrf_batch": search,
+        "subject_source_version": lambda params: versions.get(params["p_subject_id"], 0),
+        "fetch_retrieval_cache": fetch_retrieval_cache,
+        "prune_retrieval_cache": prune_retrieval_cache,
+        "prune_orphan_retrieval_results": prune_orphan_retrieval_results,
+    })
+
+    from src.shared.config import Config
+    from src.phase3.retrieval_pipeline import RetrievalPipeline
+
+    rng = random.Random(0)
+    vocabulary = course_vocabulary(rng)
+    subject_id = db.seed_subject("week-1")
+    print(f"{weeks} weekly sessions, {signals_per_week} signals x 2 queries, "
+          f"{REVISIT_RATIO:.0%} revisiting earlier topics, new textbook before week {INGEST_WEEK}")
+
+    totals = {True: 0, False: 0}
+    covered = 0  # topics introduced so far
+    for week in range(1, weeks + 1):
+        session_id = f"week-{week}"
+        if week > 1:
+            db.tables["sessions"].append({"session_id": session_id, "subject_id": subject_id})
+        if week == INGEST_WEEK:
+            db.tables["sources"].append({"source_id": str(uuid.uuid4()), "subject_id": subject_id, "active": True})
+            versions[subject_id] = versions.get(subject_id, 0) + 1
+
+        queries = []
+        for _ in range(signals_per_week * 2):
+            if covered and rng.random() < REVISIT_RATIO:
+                queries.append(vocabulary[rng.randrange(covered)])
+            else:
+                queries.append(vocabulary[min(covered, COURSE_TOPICS - 1)])
+                covered = min(covered + 1, COURSE_TOPICS)
+        signals = [{"signal_id": str(uuid.uuid4()), "session_id": session_id, "search_queries": queries[i:i + 2]}
+                   for i in range(0, len(queries), 2)]
+        db.table("signals").insert(signals).execute()
+
+        line = []
+        for enabled in (False, True):
+            Config.RETRIEVAL_CACHE_ENABLED = enabled
+            db.tables["signal_retrieval_state"] = [r for r in db.tables.get("signal_retrieval_state", [])
+                                                   if r["session_id"] != session_id]
+            searched["texts"] = 0
+            RetrievalPipeline(session_id).run()
+            totals[enabled] += searched["texts"]
+            line.append(searched["texts"])
+        print(f"  week {week:2d}: {line[0]:3d} queries searched without cache, {line[1]:3d} with cache "
+              f"({1 - line[1] / line[0]:4.0%} hits)" + ("  <- new textbook" if week == INGEST_WEEK else ""))
+
+    print(f"  semester: {totals[False]} -> {totals[True]} searched queries "
+          f"({1 - totals[True] / totals[False]:.0%} served from cache), "
+          f"{len(db.tables.get('retrieval_cache', []))} cache rows")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [14, 60][len(args):]))
@@ -0,0 +1,165 @@
+"""
+Recall / latency sweep for hybrid_search_rrf on a local Postgres (see pg_bench.py).
+
+Seeds a generated textbook corpus with labeled query -> chunk ground truth, then runs
+every configuration of the grid and reports recall@10, recall@match_count, MRR,
+p50/p95 latency and rows returned. Results are written as JSON so a later run can be
+compared against them (--baseline).
+
+Grid keys (each a list; one-factor-at-a-time around "base" unless --full is given):
+    match_count, rrf_k, vector_k, keyword_k, semantic_weight, full_text_weight,
+    keyword_mode, ef_search, scoped
+
+Usage:
+    DATABASE_URL=... python scripts/bench_retrieval_sweep.py [--chunks 5000] [--queries 200]
+        [--grid grid.json] [--full] [--out retrieval_sweep.json] [--baseline previous.json]
+"""
+import os
+import sys
+import json
+import argparse
+import itertools
+from datetime import datetime
+
+sys.path.append(os.path.dirname(__file__))
+
+import pg_bench
+
+BASE = {
+    "match_count": 50,      # FINAL_K
+    "rrf_k": 60,            # RRF_C
+    "vector_k": None,       # VECTOR_K (None = match_count)
+    "keyword_k": None,      # KEYWORD_K (None = match_count)
+    "semantic_weight": 1.0,
+    "full_text_weight": 1.0,
+    "keyword_mode": "trgm",
+    "ef_search": 40,        # pgvector default; only the unscoped (HNSW) path uses it
+    "scoped": True,
+}
+
+GRID = {
+    "match_count": [20, 50, 100],
+    "rrf_k": [10, 60, 120],
+    "vector_k": [30, 100, 200],
+    "keyword_k": [10, 30, 100],
+    "semantic_weight": [0.5, 2.0],
+    "keyword_mode": ["trgm", "word", "fts"],
+    "ef_search": [40, 100, 200],
+    "scoped": [True, False],
+}
+
+
+def configurations(grid, full):
+    if full:
+        keys = list(grid)
+        for values in itertools.product(*(grid[k] for k in keys)):
+            yield dict(BASE, **dict(zip(keys, values)))
+        return
+    seen = set()
+    for key, values in grid.items():
+        for value in values:
+            config = dict(BASE, **{key: value})
+            fingerprint = json.dumps(config, sort_keys=True)
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                yield config
+
+
+def search(conn, query, config, source_ids):
+    with conn.cursor() as cur:
+        cur.execute("SET hnsw.ef_search = %s", (config["ef_search"],))
+        cur.execute("""
+            SELECT chunk_id FROM hybrid_search_rrf(
+              %s, %s::halfvec(768), %s, %s,
+              p_full_text_weight => %s, p_semantic_weight => %s,
+              p_source_ids => %s::uuid[], p_keyword_mode => %s,
+              p_vector_k => %s, p_keyword_k => %s)""",
+            (query["text"], pg_bench.vec_literal(query["embedding"]), config["match_count"], config["rrf_k"],
+             config["full_text_weight"], config["semantic_weight"],
+             source_ids if config["scoped"] else None, config["keyword_mode"],
+             config["vector_k"], config["keyword_k"]))
+        return [str(r[0]) for r in cur.fetchall()]
+
+
+def evaluate(conn, queries, config, source_ids):
+    latencies, rows, hits10, hits_k, reciprocal = [], 0, 0, 0, 0.0
+    search(conn, queries[0], config, source_ids)  # warm up
+    for q in queries:
+        ids, ms = pg_bench.timed(search, conn, q, config, source_ids)
+        latencies.append(ms)
+        rows += len(ids)
+        if q["relevant"] in ids:
+            rank = ids.index(q["relevant"]) + 1
+            hits_k += 1
+            hits10 += rank <= 10
+            reciprocal += 1 / rank
+    n = len(queries)
+    return {
+        "recall@10": round(hits10 / n, 4),
+        "recall@k": round(hits_k / n, 4),
+        "mrr": round(reciprocal / n, 4),
+        "p50_ms": round(pg_bench.percentile(latencies, 50), 2),
+        "p95_ms": round(pg_bench.percentile(latencies, 95), 2),
+        "rows_mean": round(rows / n, 1),
+    }
+
+
+def key_of(config):
+    return json.dumps(config, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hybrid_search_rrf parameter sweep")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--grid", help="JSON file with grid overrides")
+    parser.add_argument("--full", action="store_true", help="full cartesian product instead of one factor at a time")
+    parser.add_argument("--out", default="retrieval_sweep.json")
+    parser.add_argument("--baseline", help="previous --out file to compare against")
+    args = parser.parse_args()
+
+    grid = dict(GRID)
+    if args.grid:
+        with open(args.grid) as f:
+            grid.update(json.load(f))
+
+    corpus = pg_bench.generate_corpus(args.chunks)
+    queries = pg_bench.generate_queries(corpus, args.queries)
+    conn = pg_bench.connect()
+    subject_id, source_id = pg_bench.seed_subject(conn, corpus)
+    results = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE chunks")
+        for config in configurations(grid, args.full):
+            metrics = evaluate(conn, queries, config, [source_id])
+            results.append({"config": config, "metrics": metrics})
+            print(f"{key_of(config)}\n    {metrics}")
+    finally:
+        pg_bench.drop_subject(conn, subject_id)
+        conn.close()
+
+    with open(args.out, "w") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(),
+            "chunks": args.chunks,
+            "queries": args.queries,
+            "results": results,
+        }, f, indent=2)
+    print(f"Wrote {len(results)} configurations to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            previous = {key_of(r["config"]): r["metrics"] for r in json.load(f)["results"]}
+        print("\nDelta vs baseline (recall@k, mrr, p95_ms):")
+        for r in results:
+            old = previous.get(key_of(r["config"]))
+            if old is None:
+                continue
+            m = r["metrics"]
+            print(f"  {key_of(r['config'])}\n    recall@k {m['recall@k'] - old['recall@k']:+.3f}  "
+                  f"mrr {m['mrr'] - old['mrr']:+.3f}  p95 {m['p95_ms'] - old['p95_ms']:+.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
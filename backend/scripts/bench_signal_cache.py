@@ -0,0 +1,58 @@
+"""
+Simulates the same lecture recording being uploaded twice (two sessions) and
+reports Phase 2 signal cache hits and model time saved, using the stub transport.
+
+Usage: python scripts/bench_signal_cache.py [num_chunks]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+
+EXTRACT_SEC = 0.3
+
+
+def main(num_chunks: int):
+    db = stub_env.install()
+    db.rpc_handlers["apply_audio_chunk_status"] = lambda params: len(params["p_updates"])
+
+    from src.phase2 import dispatcher, signal_extraction
+    from src.phase2.signal_cache import SignalCache
+    from src.shared.status_writer import ChunkStatusWriter
+
+    # Slice bytes depend only on the source recording and offsets, not on the session
+    signal_extraction._slice_audio = lambda uri, start, duration, chunk_id: stub_env.write_slice(chunk_id, f"lecture-01@{start}")
+
+    def fake_extract(session_id, audio_chunk_id, gcs_uri, subject, exam_window):
+        time.sleep(EXTRACT_SEC)
+        return [{"signal_type": "likely", "content": "KCL", "search_queries": ["KCL"],
+                 "audio_chunk_id": audio_chunk_id, "t0_sec": 10, "t1_sec": 20}]
+
+    signal_extraction._call_gemini_extraction = fake_extract
+
+    for session_id in ("student-a", "student-b"):
+        rows = [{"session_id": session_id, "chunk_index": i, "gcs_chunk_url": f"gs://b/{session_id}.m4a",
+                 "start_offset_sec": i * 1800, "duration_sec": 1800, "status": "pending"}
+                for i in range(num_chunks)]
+        chunks = db.table("audio_chunks").insert(rows).execute().data
+        cache = SignalCache()
+        stub_env.calls.clear()
+        start = time.perf_counter()
+        with ChunkStatusWriter(flush_interval_sec=0.5) as writer:
+            dispatcher.process_chunks_locally(chunks, "Circuits", "midterm", writer, None, cache)
+        elapsed = time.perf_counter() - start
+
+        signals = [s for s in db.tables["signals"] if s["session_id"] == session_id]
+        chunk_ids = {c["chunk_id"] for c in chunks}
+        assert all(s["audio_chunk_id"] in chunk_ids for s in signals)
+        print(f"[{session_id}] {cache.summary()} wall {elapsed:.2f}s, "
+              f"{len(signals)} signals rebased, gcs uploads {stub_env.calls['gcs.upload']}")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 6)
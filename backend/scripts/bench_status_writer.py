@@ -0,0 +1,74 @@
+"""
+Counts DB requests per session for Phase 2 chunk status tracking, with and
+without the coalescing ChunkStatusWriter, against the local stub transport.
+
+ffmpeg slicing and Gemini extraction are replaced by sleeps so that chunks
+finish at staggered times, like a real 50-thread dispatcher run.
+
+Usage: python scripts/bench_status_writer.py [num_chunks] [flush_interval_sec]
+"""
+import os
+import sys
+import time
+import random
+from collections import Counter
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+
+
+def main(num_chunks: int, flush_interval: float):
+    db = stub_env.install()
+
+    def apply_audio_chunk_status(params):
+        by_id = {r["chunk_id"]: r for r in db.tables.get("audio_chunks", [])}
+        for u in params["p_updates"]:
+            by_id[u["chunk_id"]].update(status=u["status"], error_message=u["error_message"])
+        return len(params["p_updates"])
+
+    db.rpc_handlers["apply_audio_chunk_status"] = apply_audio_chunk_status
+
+    from src.phase2 import dispatcher, signal_extraction
+    from src.shared.status_writer import ChunkStatusWriter
+
+    def fake_slice(uri, start, duration, chunk_id):
+        time.sleep(random.uniform(0.05, 0.2))
+        return stub_env.write_slice(chunk_id, f"{uri}@{start}")
+
+    def fake_extract(session_id, audio_chunk_id, gcs_uri, subject, exam_window):
+        time.sleep(random.uniform(0.2, 1.0))
+        return [{"signal_type": "hint", "content": "stub", "search_queries": ["KCL"], "t0_sec": 1, "t1_sec": 2}]
+
+    signal_extraction._slice_audio = fake_slice
+    signal_extraction._call_gemini_extraction = fake_extract
+
+    def make_chunks():
+        rows = [{"session_id": "s1", "chunk_index": i, "gcs_chunk_url": "gs://b/a.m4a",
+                 "start_offset_sec": i * 1800, "duration_sec": 1800, "status": "pending"}
+                for i in range(num_chunks)]
+        return db.table("audio_chunks").insert(rows).execute().data
+
+    for label, use_writer in (("before", False), ("after ", True)):
+        db.tables.clear()
+        chunks = make_chunks()
+        stub_env.calls.clear()
+        start = time.perf_counter()
+        if use_writer:
+            with ChunkStatusWriter(flush_interval_sec=flush_interval) as writer:
+                dispatcher.process_chunks_locally(chunks, "Circuits", "midterm", writer)
+        else:
+            dispatcher.process_chunks_locally(chunks, "Circuits", "midterm")
+        elapsed = time.perf_counter() - start
+
+        status_calls = {k: v for k, v in stub_env.calls.items()
+                        if k in ("update.audio_chunks", "rpc.apply_audio_chunk_status")}
+        final = Counter(r["status"] for r in db.tables["audio_chunks"])
+        print(f"[{label}] {num_chunks} chunks in {elapsed:.2f}s: "
+              f"{sum(status_calls.values())} status requests {status_calls}, final states {dict(final)}")
+
+
+if __name__ == "__main__":
+    num_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    flush_interval = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    main(num_chunks, flush_interval)
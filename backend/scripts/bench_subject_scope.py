@@ -0,0 +1,77 @@
+"""
+Load test for subject-scoped hybrid search on a local Postgres + pgvector (see pg_bench.py).
+
+Keeps one subject at a fixed size and grows the rest of the platform's corpus
+(other subjects' textbooks) by 1x, 10x and 100x, reporting p50/p95 latency of
+hybrid_search_rrf with and without p_source_ids at each step, using the given keyword
+channel (Phase 3's default 'fts' unless overridden).
+
+Background sources are cloned server-side from one generated template so the
+100x step doesn't spend minutes generating vectors in Python.
+
+Usage: DATABASE_URL=... python scripts/bench_subject_scope.py [subject_chunks] [num_queries] [keyword_mode]
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(__file__))
+
+import pg_bench
+
+GROWTH = [1, 10, 100]
+MATCH_COUNT = 50
+
+
+def search(conn, query, source_ids, keyword_mode):
+    with conn.cursor() as cur:
+        cur.execute("""SELECT chunk_id FROM hybrid_search_rrf(%s, %s::halfvec(768), %s,
+                       p_source_ids => %s::uuid[], p_keyword_mode => %s)""",
+                    (query["text"], pg_bench.vec_literal(query["embedding"]), MATCH_COUNT, source_ids, keyword_mode))
+        return [r[0] for r in cur.fetchall()]
+
+
+def clone_sources(conn, template_source_id, subject_id, copies):
+    with conn.cursor() as cur:
+        for _ in range(copies):
+            cur.execute("""INSERT INTO sources (user_id, subject_id, kind, title, ingest_status)
+                           SELECT user_id, subject_id, kind, title, ingest_status FROM sources WHERE source_id = %s
+                           RETURNING source_id""", (template_source_id,))
+            new_source = cur.fetchone()[0]
+            cur.execute("""INSERT INTO chunks (source_id, content_text, embedding, page_start, page_end, anchor_path)
+                           SELECT %s, content_text, embedding, page_start, page_end, anchor_path
+                           FROM chunks WHERE source_id = %s""", (new_source, template_source_id))
+        cur.execute("ANALYZE chunks")
+    conn.commit()
+
+
+def main(subject_chunks: int, num_queries: int, keyword_mode: str):
+    conn = pg_bench.connect()
+    corpus = pg_bench.generate_corpus(subject_chunks, seed=0)
+    queries = pg_bench.generate_queries(corpus, num_queries)
+    subject_id, source_id = pg_bench.seed_subject(conn, corpus, "scoped subject")
+    bg_subject_id, bg_source_id = pg_bench.seed_subject(conn, pg_bench.generate_corpus(subject_chunks, seed=99), "platform")
+    background = 1
+    try:
+        for factor in GROWTH:
+            clone_sources(conn, bg_source_id, bg_subject_id, factor - background)
+            background = factor
+            for label, scope in (("scoped  ", [source_id]), ("unscoped", None)):
+                latencies, hits = [], 0
+                for q in queries:
+                    ids, ms = pg_bench.timed(search, conn, q, scope, keyword_mode)
+                    latencies.append(ms)
+                    hits += q["relevant"] in {str(i) for i in ids}
+                print(f"platform {subject_chunks * (factor + 1):>8} chunks | {label} | "
+                      f"p50 {pg_bench.percentile(latencies, 50):7.1f} ms  p95 {pg_bench.percentile(latencies, 95):7.1f} ms  "
+                      f"recall@{MATCH_COUNT} {hits / len(queries):.2f}")
+    finally:
+        pg_bench.drop_subject(conn, subject_id)
+        pg_bench.drop_subject(conn, bg_subject_id)
+        conn.close()
+
+
+if __name__ == "__main__":
+    subject_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    keyword_mode = sys.argv[3] if len(sys.argv) > 3 else "fts"
+    main(subject_chunks, num_queries, keyword_mode)
@@ -0,0 +1,130 @@
+"""
+Single-tier halfvec search versus the two-tier binary-quantized prefilter + halfvec
+rescoring ('binary' vector tier in hybrid_search_rpc.sql).
+
+In-process part (always runs): exact cosine top-k versus Hamming top-(4k) over
+sign bits rescored with cosine, on the pg_bench synthetic corpus. Reports bytes per
+vector and recall of the exact top-k.
+
+Postgres part (only with DATABASE_URL): sizes of the halfvec HNSW index, the btree that
+carries the stored bits (chunks_source_bq_idx) and, for reference, an HNSW over the bits
+(built and dropped here; the schema doesn't create it) next to the heap + TOAST the 'full'
+scan reads. Then p50/p95 latency, recall and shared buffer page accesses per query (hit +
+read; what the tier keeps hot in RAM) of hybrid_vector_channel with p_vector_tier 'full' vs 'binary', subject-scoped
+(p_source_ids) as Phase 3 calls it.
+
+Usage: [DATABASE_URL=...] python scripts/bench_tiered_search.py [num_chunks] [num_queries]
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+
+import pg_bench
+
+K = 50
+OVERSAMPLE = 4
+
+
+def simulate(corpus, queries):
+    mat = np.asarray([c["embedding"] for c in corpus], dtype=np.float16).astype(np.float32)
+    bits = np.packbits(mat > 0, axis=1)  # binary_quantize: 1 where the component is > 0
+    overlap_total, hits_full, hits_tier = 0.0, 0, 0
+    ids = [c["chunk_id"] for c in corpus]
+    for q in queries:
+        qv = np.asarray(q["embedding"], dtype=np.float32)
+        exact = np.argsort(-(mat @ qv))[:K]
+        qbits = np.packbits(qv > 0)
+        hamming = np.unpackbits(bits ^ qbits, axis=1).sum(axis=1)
+        shortlist = np.argsort(hamming, kind="stable")[:K * OVERSAMPLE]
+        tiered = shortlist[np.argsort(-(mat[shortlist] @ qv))][:K]
+        overlap_total += len(set(exact.tolist()) & set(tiered.tolist())) / K
+        hits_full += q["relevant"] in {ids[i] for i in exact}
+        hits_tier += q["relevant"] in {ids[i] for i in tiered}
+    n = len(queries)
+    print(f"  in-process: halfvec {mat.shape[1] * 2} B/vector, binary {bits.shape[1]} B/vector "
+          f"({mat.shape[1] * 2 // bits.shape[1]}x smaller)")
+    print(f"  in-process: tiered top-{K} overlap with exact {overlap_total / n:.3f}, "
+          f"target recall full {hits_full / n:.2f} vs tiered {hits_tier / n:.2f}")
+
+
+CHANNEL_SQL = "SELECT chunk_id FROM hybrid_vector_channel(%s::halfvec(768), %s, %s::uuid[], %s)"
+
+
+def channel(conn, query, tier, source_ids):
+    with conn.cursor() as cur:
+        cur.execute(CHANNEL_SQL, (pg_bench.vec_literal(query["embedding"]), K, source_ids, tier))
+        return [str(r[0]) for r in cur.fetchall()]
+
+
+def buffers(conn, query, tier, source_ids):
+    """Shared buffers (hit + read) one channel call touches, including the function's queries."""
+    with conn.cursor() as cur:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + CHANNEL_SQL,
+                    (pg_bench.vec_literal(query["embedding"]), K, source_ids, tier))
+        plan = cur.fetchone()[0][0]["Plan"]
+        return plan["Shared Hit Blocks"] + plan["Shared Read Blocks"]
+
+
+def index_sizes(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_size_pretty(pg_table_size('chunks'))")
+        print(f"  postgres: chunks heap + TOAST {cur.fetchone()[0]}")
+        for index in ("chunks_embedding_hnsw", "chunks_source_bq_idx"):
+            cur.execute("SELECT pg_size_pretty(pg_relation_size(%s::regclass))", (index,))
+            print(f"  postgres: {index} {cur.fetchone()[0]}")
+        cur.execute("CREATE INDEX bench_bq_hnsw ON chunks USING hnsw (embedding_bq bit_hamming_ops)")
+        cur.execute("SELECT pg_size_pretty(pg_relation_size('bench_bq_hnsw'))")
+        print(f"  postgres: (reference) HNSW over the bits {cur.fetchone()[0]}, not created by the schema")
+        cur.execute("DROP INDEX bench_bq_hnsw")
+
+
+def postgres(corpus, queries):
+    conn = pg_bench.connect()
+    subject_id, source_id = pg_bench.seed_subject(conn, corpus)
+    source_ids = [source_id]
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE chunks")  # visibility map for index-only scans, as autovacuum would
+        index_sizes(conn)
+        exact = {}
+        for tier in ("full", "binary"):
+            channel(conn, queries[0], tier, source_ids)  # warm up
+            latencies, hits, overlap = [], 0, 0.0
+            for q in queries:
+                ids, ms = pg_bench.timed(channel, conn, q, tier, source_ids)
+                latencies.append(ms)
+                hits += q["relevant"] in ids
+                if tier == "full":
+                    exact[q["relevant"]] = set(ids)
+                else:
+                    overlap += len(exact[q["relevant"]] & set(ids)) / K
+            pages = sum(buffers(conn, q, tier, source_ids) for q in queries[:20]) / min(20, len(queries))
+            line = (f"  postgres: scoped {tier:6s} p50 {pg_bench.percentile(latencies, 50):6.1f} ms  "
+                    f"p95 {pg_bench.percentile(latencies, 95):6.1f} ms  recall {hits / len(queries):.2f}  "
+                    f"page accesses/query {pages:6.0f}")
+            if tier == "binary":
+                line += f"  overlap with full {overlap / len(queries):.3f}"
+            print(line)
+    finally:
+        pg_bench.drop_subject(conn, subject_id)
+        conn.close()
+
+
+def main(num_chunks: int, num_queries: int):
+    corpus = pg_bench.generate_corpus(num_chunks)
+    queries = pg_bench.generate_queries(corpus, num_queries)
+    print(f"{num_chunks} chunks, {len(queries)} queries, top-{K}, oversample {OVERSAMPLE}x")
+    simulate(corpus, queries)
+    if os.getenv("DATABASE_URL"):
+        postgres(corpus, queries)
+    else:
+        print("  postgres: skipped (DATABASE_URL not set)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [10000, 200][len(args):]))
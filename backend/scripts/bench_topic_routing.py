@@ -0,0 +1,136 @@
+"""
+Flat exact vector search versus topic-routed search (phase1/topic_index.py k-means,
+nearest PROBES topics scanned) as a subject's textbooks grow.
+
+In-process (always runs): synthetic chapter/section-structured embeddings, NumPy
+scoring; reports index build time, per-query latency, fraction of chunks scanned and
+overlap of the routed top-k with the exact top-k.
+
+Postgres (only with DATABASE_URL): seeds the pg_bench corpus, writes its topic index
+and compares hybrid_vector_channel 'full' vs 'routed' on the scoped path.
+
+Usage: [DATABASE_URL=...] python scripts/bench_topic_routing.py [sizes, e.g. 2000,10000,50000] [num_queries]
+"""
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import stub_env
+stub_env.install()  # topic_index imports the Supabase client module; nothing is called
+
+import pg_bench
+from src.phase1.topic_index import spherical_kmeans, topic_count
+
+DIM = 768
+K = 50
+PROBES = 8  # v_topic_probes in hybrid_search_rpc.sql
+
+
+def unit(mat):
+    return mat / np.linalg.norm(mat, axis=-1, keepdims=True)
+
+
+def textbook(num_chunks, rng):
+    """Chapters of ~400 chunks, sections of ~40; chunk = section direction + noise."""
+    chapters = unit(rng.normal(size=(max(1, num_chunks // 400), DIM)))
+    sections = unit(np.repeat(chapters, 10, axis=0) + rng.normal(scale=0.05, size=(len(chapters) * 10, DIM)))
+    section_of = rng.integers(len(sections), size=num_chunks)
+    return unit(sections[section_of] + rng.normal(scale=0.035, size=(num_chunks, DIM))).astype(np.float32)
+
+
+def routed_topk(x, centroids, members, q):
+    topics = np.argsort(-(centroids @ q))[:PROBES]
+    rows = np.concatenate([members[t] for t in topics])
+    scores = x[rows] @ q
+    return rows[np.argsort(-scores)[:K]], len(rows)
+
+
+def simulate(sizes, num_queries):
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        x = textbook(n, rng)
+        queries = unit(x[rng.integers(n, size=num_queries)] + rng.normal(scale=0.02, size=(num_queries, DIM)))
+        started = time.perf_counter()
+        centroids, assignments = spherical_kmeans(x, topic_count(n))
+        build_s = time.perf_counter() - started
+        members = [np.flatnonzero(assignments == t) for t in range(len(centroids))]
+
+        flat_ms, routed_ms, overlap, scanned = 0.0, 0.0, 0.0, 0
+        for q in queries:
+            t0 = time.perf_counter()
+            exact = np.argsort(-(x @ q))[:K]
+            t1 = time.perf_counter()
+            routed, rows = routed_topk(x, centroids, members, q)
+            t2 = time.perf_counter()
+            flat_ms += (t1 - t0) * 1000
+            routed_ms += (t2 - t1) * 1000
+            overlap += len(set(exact.tolist()) & set(routed.tolist())) / K
+            scanned += rows
+        m = len(queries)
+        print(f"  {n:6d} chunks, {len(centroids):3d} topics (k-means {build_s:5.1f}s): "
+              f"flat {flat_ms / m:6.2f} ms/q, routed {routed_ms / m:6.2f} ms/q, "
+              f"scanned {scanned / m / n:5.1%}, top-{K} overlap {overlap / m:.3f}")
+
+
+def postgres(num_chunks, num_queries):
+    corpus = pg_bench.generate_corpus(num_chunks)
+    queries = pg_bench.generate_queries(corpus, num_queries)
+    centroids, assignments = spherical_kmeans(np.asarray([c["embedding"] for c in corpus]), topic_count(num_chunks))
+    conn = pg_bench.connect()
+    subject_id, source_id = pg_bench.seed_subject(conn, corpus)
+    try:
+        from psycopg2.extras import execute_values
+        topic_ids = [str(uuid.uuid4()) for _ in centroids]
+        with conn.cursor() as cur:
+            execute_values(cur, "INSERT INTO source_topics (topic_id, source_id, centroid, size) VALUES %s",
+                           [(topic_ids[t], source_id, pg_bench.vec_literal(centroids[t].tolist()),
+                             int((assignments == t).sum())) for t in range(len(centroids))],
+                           template="(%s, %s, %s::halfvec(768), %s)")
+            execute_values(cur, "INSERT INTO chunk_topics (chunk_id, topic_id) VALUES %s",
+                           [(c["chunk_id"], topic_ids[a]) for c, a in zip(corpus, assignments)])
+            cur.execute("ANALYZE chunks")
+        conn.commit()
+
+        def channel(q, tier):
+            with conn.cursor() as cur:
+                cur.execute("SELECT chunk_id FROM hybrid_vector_channel(%s::halfvec(768), %s, %s::uuid[], %s)",
+                            (pg_bench.vec_literal(q["embedding"]), K, [source_id], tier))
+                return {str(r[0]) for r in cur.fetchall()}
+
+        full = {}
+        for tier in ("full", "routed"):
+            channel(queries[0], tier)
+            latencies, overlap = [], 0.0
+            for q in queries:
+                ids, ms = pg_bench.timed(channel, q, tier)
+                latencies.append(ms)
+                if tier == "full":
+                    full[q["relevant"]] = ids
+                else:
+                    overlap += len(full[q["relevant"]] & ids) / K
+            print(f"  postgres {tier:6s}: p50 {pg_bench.percentile(latencies, 50):6.1f} ms  "
+                  f"p95 {pg_bench.percentile(latencies, 95):6.1f} ms"
+                  + (f"  top-{K} overlap {overlap / len(queries):.3f}" if tier == "routed" else ""))
+    finally:
+        pg_bench.drop_subject(conn, subject_id)
+        conn.close()
+
+
+def main(sizes, num_queries):
+    print(f"top-{K}, {PROBES} probes")
+    simulate(sizes, num_queries)
+    if os.getenv("DATABASE_URL"):
+        postgres(sizes[-1], num_queries)
+    else:
+        print("  postgres: skipped (DATABASE_URL not set)")
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [2000, 10000, 50000]
+    main(sizes, int(sys.argv[2]) if len(sys.argv) > 2 else 200)
@@ -0,0 +1,389 @@
+"""
+Local stub transport for the benchmark scripts.
+
+Installs lightweight stand-ins for google-cloud, vertexai, supabase and dotenv
+into sys.modules so pipeline code can be exercised offline. Every simulated
+network round trip is counted in `calls` and sleeps for `latency_ms`.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+import uuid
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+calls = Counter()
+# Response bytes and rows per request kind (JSON size / length of the returned data)
+bytes_out = Counter()
+rows_out = Counter()
+# db_per_mib transfer time: per request (False) or through one link shared by concurrent requests (True)
+shared_link = False
+_link_lock = threading.Lock()
+_calls_lock = threading.Lock()
+latency_ms = {"handshake": 40, "db": 5, "db_per_mib": 0, "model": 0, "genai_base": 0, "genai_per_ktoken": 0, "genai_out_per_ktoken": 0}
+# google-genai generate_content: handler(system_instruction, contents) -> response text;
+# each call is logged to genai_calls as {system, prompt_tokens, output_tokens, seconds}
+genai_handler = None
+genai_calls = []
+
+
+def record(kind: str, latency_key: str = "handshake"):
+    with _calls_lock:
+        calls[kind] += 1
+    delay = latency_ms.get(latency_key, 0)
+    if delay:
+        time.sleep(delay / 1000)
+
+
+# --- google-cloud / vertexai ----------------------------------------------
+class StubBlob:
+    def __init__(self, name): self.name = name
+    def generate_signed_url(self, **kwargs): return f"https://stub/{self.name}"
+    def upload_from_filename(self, path): record("gcs.upload", "db")
+    def download_to_filename(self, path): record("gcs.download", "db")
+    def delete(self): record("gcs.delete", "db")
+
+
+class StubBucket:
+    def __init__(self, name): self.name = name
+    def blob(self, name): return StubBlob(name)
+
+
+class StubStorageClient:
+    def __init__(self, project=None): record("storage.Client")
+    def bucket(self, name): return StubBucket(name)
+
+
+class StubCredentials:
+    service_account_email = "stub@example.iam.gserviceaccount.com"
+    def __init__(self): self.token, self.expiry = None, None
+    def refresh(self, request):
+        record("credentials.refresh")
+        self.token, self.expiry = "token", datetime.utcnow() + timedelta(hours=1)
+
+
+class StubGenerativeModel:
+    def __init__(self, name): record("GenerativeModel")
+
+
+class StubEmbedding:
+    def __init__(self, values): self.values = values
+
+
+class StubTextEmbeddingModel:
+    dim = 768
+
+    @classmethod
+    def from_pretrained(cls, name):
+        record("TextEmbeddingModel")
+        return cls()
+
+    def get_embeddings(self, texts):
+        record("embedding.batch", "model")
+        with _calls_lock:
+            calls["embedding.texts"] += len(texts)
+        return [StubEmbedding(embed_text(t, self.dim)) for t in texts]
+
+
+def embed_text(text: str, dim: int = 768):
+    """Deterministic pseudo-embedding: hashed character trigrams, L2-normalised."""
+    vec = [0.0] * dim
+    padded = f"  {text.lower()}  "
+    for i in range(len(padded) - 2):
+        vec[hash(padded[i:i + 3]) % dim] += 1.0
+    norm = sum(v * v for v in vec) ** 0.5 or 1.0
+    return [v / norm for v in vec]
+
+
+class StubGenAIModels:
+    def generate_content(self, model, contents, config=None):
+        # Latency model: base + prompt tokens (prefill/thinking) + output tokens (decoding), ~4 chars/token
+        started = time.perf_counter()
+        record("genai.generate", "genai_base")
+        system = getattr(config, "system_instruction", None)
+        text = genai_handler(system, contents) if genai_handler else "{}"
+        delay = (latency_ms["genai_per_ktoken"] * len(contents) + latency_ms["genai_out_per_ktoken"] * len(text)) / 4000
+        if delay:
+            time.sleep(delay / 1000)
+        with _calls_lock:
+            genai_calls.append({"system": system, "prompt_tokens": len(contents) // 4,
+                                "output_tokens": len(text) // 4, "seconds": time.perf_counter() - started})
+        return types.SimpleNamespace(text=text, candidates=[types.SimpleNamespace(
+            content=types.SimpleNamespace(parts=[types.SimpleNamespace(thought=None)]))])
+
+
+class StubGenAIClient:
+    def __init__(self, **kwargs):
+        record("genai.Client")
+        self.models = StubGenAIModels()
+
+
+def write_slice(chunk_id: str, content: str) -> str:
+    """Stands in for an ffmpeg slice: writes `content` to the local temp path."""
+    path = os.path.join(tempfile.gettempdir(), f"stub-{chunk_id}.m4a")
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+# --- supabase -------------------------------------------------------------
+class StubResponse:
+    def __init__(self, data, count=None): self.data, self.count = data, count
+
+
+class StubQuery:
+    def __init__(self, db, table, rpc_params=None):
+        self.db, self.table, self.op, self.payload = db, table, "select", None
+        self.rpc_params = rpc_params
+        self.filters = []
+        self.single_row = False
+        self.conflict_cols = None
+        self.columns = None
+        self.orders = []
+        self.row_range = None
+        self.count_mode = None
+
+    def _set(self, op, payload=None):
+        self.op, self.payload = op, payload
+        return self
+
+    def select(self, columns="*", *a, count=None, **k):
+        self.count_mode = count
+        if columns != "*":
+            self.columns = [c.strip() for c in columns.split(",")]
+        return self._set("select")
+    def insert(self, rows, **k): return self._set("insert", rows)
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False, **k):
+        self.conflict_cols = on_conflict.split(",") if on_conflict else None
+        self.ignore_duplicates = ignore_duplicates
+        return self._set("upsert", rows)
+    def update(self, values): return self._set("update", values)
+    def delete(self): return self._set("delete")
+
+    def eq(self, col, val):
+        self.filters.append((col, lambda v, val=val: v == val))
+        return self
+
+    def in_(self, col, vals):
+        vals = set(vals)
+        self.filters.append((col, lambda v, vals=vals: v in vals))
+        return self
+
+    def order(self, col, desc=False, **k):
+        self.orders.append((col, desc))
+        return self
+
+    def range(self, start, end):
+        self.row_range = (start, end)
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def __getattr__(self, name):
+        # order/limit/range/single etc. are accepted and ignored
+        return lambda *a, **k: self
+
+    def _match(self, row):
+        return all(pred(row.get(col)) for col, pred in self.filters)
+
+    def execute(self):
+        kind = f"rpc.{self.table}" if self.rpc_params is not None else f"{self.op}.{self.table}"
+        record(kind, "db")
+        if self.rpc_params is not None:
+            handler = self.db.rpc_handlers.get(self.table)
+            data = handler(self.rpc_params) if handler else None
+            if self.db.project:
+                self._charge_bytes(kind, data)
+            return StubResponse(data)
+
+        rows = self.db.tables.setdefault(self.table, [])
+        with self.db.lock:
+            if self.op in ("insert", "upsert"):
+                new_rows = self.payload if isinstance(self.payload, list) else [self.payload]
+                out = []
+                for r in new_rows:
+                    r = dict(r)
+                    if self.conflict_cols:
+                        key = [r.get(c) for c in self.conflict_cols]
+                        existing = next((e for e in rows if [e.get(c) for c in self.conflict_cols] == key), None)
+                        if existing is not None:
+                            if not self.ignore_duplicates:
+                                existing.update(r)
+                            continue
+                    r.setdefault(self.db.pk.get(self.table, "id"), str(uuid.uuid4()))
+                    r.setdefault("created_at", datetime.utcnow().isoformat())
+                    rows.append(r)
+                    out.append(r)
+                return StubResponse(out)
+            matched = [r for r in rows if self._match(r)]
+            if self.op == "update":
+                for r in matched:
+                    r.update(self.payload)
+            elif self.op == "delete":
+                self.db.tables[self.table] = [r for r in rows if not self._match(r)]
+            if self.single_row:
+                return StubResponse(dict(matched[0]) if matched else None)
+        total = len(matched) if self.count_mode else None
+        if self.orders and not any(desc for _, desc in self.orders):
+            matched.sort(key=lambda r: tuple((r.get(c) is None, r.get(c)) for c, _ in self.orders))
+        else:
+            for col, desc in reversed(self.orders):
+                matched.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+        if self.row_range:
+            matched = matched[self.row_range[0] : self.row_range[1] + 1]
+        if self.db.max_rows and self.op == "select":
+            matched = matched[:self.db.max_rows]
+        if self.columns and self.db.project:
+            out = [{c: r.get(c) for c in self.columns} for r in matched]
+        else:
+            out = [dict(r) for r in matched]
+        if self.db.project:
+            self._charge_bytes(kind, out)
+        return StubResponse(out, total)
+
+    def _charge_bytes(self, kind, data):
+        size = len(json.dumps(data, default=str, ensure_ascii=False).encode())
+        with _calls_lock:
+            bytes_out[kind] += size
+            rows_out[kind] += len(data) if isinstance(data, list) else 1
+        if latency_ms["db_per_mib"]:
+            delay = latency_ms["db_per_mib"] * size / 2**20 / 1000
+            if shared_link:
+                # One link: concurrent responses queue for the bandwidth
+                with _link_lock:
+                    time.sleep(delay)
+            else:
+                time.sleep(delay)
+
+
+class StubSupabase:
+    pk = {
+        "audio_chunks": "chunk_id",
+        "signals": "signal_id",
+        "sessions": "session_id",
+        "chunks": "chunk_id",
+        "evidence_candidates": "candidate_id",
+        "sources": "source_id",
+        "subjects": "subject_id",
+        "report_states": "report_state_id",
+    }
+
+    def __init__(self):
+        self.tables = {}
+        # Server-side functions with a stub implementation over the tables
+        self.rpc_handlers = {"aggregate_evidence": self._aggregate_evidence,
+                             "evidence_fingerprint": self._evidence_fingerprint,
+                             "session_evidence_fingerprints": self._session_evidence_fingerprints,
+                             "append_job_logs": self._append_job_logs}
+        # Honour select() column lists and count response bytes (off by default for older benches)
+        self.project = False
+        # PostgREST max-rows: selects return at most this many rows (None = unlimited)
+        self.max_rows = None
+        self.lock = threading.Lock()
+
+    def seed_subject(self, session_id: str, num_sources: int = 1) -> str:
+        """Creates a subject with active sources and a session pointing at it."""
+        subject_id = str(uuid.uuid4())
+        self.tables.setdefault("sessions", []).append({"session_id": session_id, "subject_id": subject_id})
+        self.tables.setdefault("sources", []).extend(
+            {"source_id": str(uuid.uuid4()), "subject_id": subject_id, "active": True} for _ in range(num_sources))
+        return subject_id
+
+    def _aggregate_evidence(self, params):
+        """phase4/evidence_aggregate.sql over the stub tables."""
+        sessions = set(params["p_session_ids"])
+        chunks = {c["chunk_id"]: c for c in self.tables.get("chunks", [])}
+        links = {}
+        for l in self.tables.get("signal_queries", []):
+            if l["session_id"] in sessions:
+                links.setdefault((l["session_id"], l["query_text"]), []).append(l["signal_id"])
+        out = {}
+        for r in self.tables.get("retrieval_results", []):
+            if r["session_id"] not in sessions or r["chunk_id"] not in chunks:
+                continue
+            score = r.get("rrf_score")
+            row = out.get(r["chunk_id"])
+            if row is None:
+                c = chunks[r["chunk_id"]]
+                row = out[r["chunk_id"]] = {
+                    **{f: c.get(f) for f in ("chunk_id", "source_id", "page_start", "page_end", "anchor_path", "token_count")},
+                    "content_text": c.get("content_text") if params.get("p_with_text", True) else None,
+                    "embedding": c.get("embedding") if params.get("p_with_embedding") else None,
+                    "best_score": score, "session_scores": {}, "signal_scores": {},
+                }
+            row["best_score"] = max(row["best_score"], score)
+            row["session_scores"][r["session_id"]] = max(row["session_scores"].get(r["session_id"], score), score)
+            for signal_id in links.get((r["session_id"], r["query_text"]), []):
+                row["signal_scores"][signal_id] = max(row["signal_scores"].get(signal_id, score), score)
+        return list(out.values())
+
+    def _append_job_logs(self, params):
+        """shared/job_logs.sql over the stub tables."""
+        entries = params["p_entries"]
+        with self.lock:
+            for row in self.tables.get("sessions", []):
+                if row["session_id"] in params["p_session_ids"]:
+                    logs = list(entries) if params.get("p_reset") else (row.get("logs") or []) + entries
+                    row["logs"] = logs[-params.get("p_tail", 200):]
+            self.tables.setdefault("job_logs", []).extend(
+                {"session_id": sid, "phase": params["p_phase"], **e} for sid in params["p_session_ids"] for e in entries)
+        return len(entries)
+
+    def _evidence_fingerprint(self, params):
+        """phase4/report_cache.sql over the stub tables."""
+        sessions = set(params["p_session_ids"])
+        ids = sorted({r["chunk_id"] for r in self.tables.get("retrieval_results", []) if r["session_id"] in sessions})
+        return hashlib.md5(",".join(ids).encode()).hexdigest()
+
+    def _session_evidence_fingerprints(self, params):
+        """phase4/report_state.sql over the stub tables."""
+        sessions = set(params["p_session_ids"])
+        ids = {}
+        for r in self.tables.get("retrieval_results", []):
+            if r["session_id"] in sessions:
+                ids.setdefault(r["session_id"], set()).add(r["chunk_id"])
+        return {sid: hashlib.md5(",".join(sorted(c)).encode()).hexdigest() for sid, c in ids.items()}
+
+    def table(self, name): return StubQuery(self, name)
+    def rpc(self, name, params): return StubQuery(self, name, rpc_params=params)
+
+
+def install(supabase: StubSupabase = None) -> StubSupabase:
+    supabase = supabase or StubSupabase()
+
+    def module(name, **attrs):
+        m = types.ModuleType(name)
+        m.__dict__.update(attrs)
+        sys.modules[name] = m
+        return m
+
+    module("dotenv", load_dotenv=lambda *a, **k: None)
+    module("supabase", create_client=lambda url, key: supabase, Client=StubSupabase)
+    module("tenacity",
+           retry=lambda *a, **k: (lambda fn: fn),
+           stop_after_attempt=lambda *a: None,
+           wait_exponential=lambda **k: None)
+    google = module("google")
+    google.auth = module("google.auth", default=lambda: (record("auth.default") or StubCredentials(), "stub"))
+    google.auth.transport = module("google.auth.transport")
+    google.auth.transport.requests = module("google.auth.transport.requests", Request=lambda: None)
+    google.cloud = module("google.cloud")
+    google.cloud.storage = module("google.cloud.storage", Client=StubStorageClient, Blob=StubBlob)
+    google.genai = module("google.genai", Client=StubGenAIClient)
+    google.genai.types = module("google.genai.types",
+                                GenerateContentConfig=lambda **k: types.SimpleNamespace(**k))
+    module("vertexai", init=lambda **k: record("vertexai.init"))
+    module("vertexai.generative_models", GenerativeModel=StubGenerativeModel,
+           Part=types.SimpleNamespace(from_uri=lambda **k: None, from_data=lambda **k: None))
+    module("vertexai.language_models", TextEmbeddingModel=StubTextEmbeddingModel)
+
+    os.environ.setdefault("SUPABASE_URL", "http://stub")
+    os.environ.setdefault("SUPABASE_KEY", "stub")
+    return supabase
@@ -6,6 +6,7 @@ from src.phase1 import ingest_pipeline
 from src.phase2 import signal_extraction, dispatcher
 from src.phase3 import retrieval_pipeline
 from src.phase4 import reasoning_pipeline
+from src.shared.pg import set_pool_phase
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,6 +25,7 @@ def main():
     
     # Allow passing job payload via environment variable
     job_payload = args.job_payload or os.environ.get("JOB_PAYLOAD")
+    set_pool_phase(args.phase)
     
     try:
         if args.phase == "1":
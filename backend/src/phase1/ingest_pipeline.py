@@ -3,9 +3,7 @@ import json
 import os
 import sys
 import fitz  # PyMuPDF
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
-from vertexai.language_models import TextEmbeddingModel
+from vertexai.generative_models import Part
 from tenacity import retry, stop_after_attempt, wait_exponential
 from typing import List, Dict, Any, Optional
 import uuid
@@ -15,6 +13,9 @@ import json_repair  # Import json_repair
 from src.shared.config import Config
 from src.shared.db import get_supabase_client
 from src.shared.storage import StorageClient
+from src.shared.clients import init_vertexai, get_generative_model, get_embedding_model
+from src.shared.pg import get_pg_pool, vector_literal
+from src.phase1.topic_index import TopicIndexBuilder
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +28,7 @@ class IngestPipeline:
         self.supabase = get_supabase_client()
         
         # Init Vertex AI
-        vertexai.init(project=Config.GCP_PROJECT, location=Config.VERTEX_LOCATION)
+        init_vertexai(Config.VERTEX_LOCATION)
         
     def run(self):
         try:
@@ -71,6 +72,13 @@ class IngestPipeline:
             
             # Step 6: DB Insert
             self._save_chunks(chunks_with_embeddings)
+
+            # Step 7: Topic index for Phase 3 query routing (best effort: search works without it)
+            if Config.TOPIC_INDEX_ENABLED:
+                try:
+                    TopicIndexBuilder(self.source_id).build(chunks_with_embeddings)
+                except Exception as e:
+                    logger.warning(f"Topic index build failed for source {self.source_id}: {e}")
             
             # Mark Succeeded
             # Explicitly log the data being sent
@@ -220,7 +228,7 @@ class IngestPipeline:
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
     def _call_gemini_ocr(self, pdf_bytes: bytes, start_page_offset: int, expected_count: int) -> List[Dict]:
         logger.info(f"Thread started for batch starting at page {start_page_offset} requesting {expected_count} pages.")
-        model = GenerativeModel(Config.GEMINI_MODEL_NAME)
+        model = get_generative_model(Config.GEMINI_MODEL_NAME, Config.VERTEX_LOCATION)
         
         # Prompt as per documentation
         prompt = f"""
@@ -328,7 +336,7 @@ class IngestPipeline:
 
     def _embed_chunks(self, chunks: List[Dict]) -> List[Dict]:
         logger.info("Step 5: Embedding...")
-        model = TextEmbeddingModel.from_pretrained(Config.EMBEDDING_MODEL_NAME)
+        model = get_embedding_model(Config.EMBEDDING_MODEL_NAME, Config.VERTEX_LOCATION)
         
         batch_size = Config.EMBED_BATCH_SIZE
         
@@ -350,6 +358,18 @@ class IngestPipeline:
 
     def _save_chunks(self, chunks: List[Dict]):
         logger.info(f"Step 6: Saving {len(chunks)} chunks to Supabase...")
+        # Ids assigned here so the topic index can reference chunks without re-reading them
+        for c in chunks:
+            c.setdefault("chunk_id", str(uuid.uuid4()))
+
+        pool = get_pg_pool()
+        if pool is not None:
+            try:
+                rows = [dict(c, embedding=vector_literal(c["embedding"])) if c.get("embedding") else c for c in chunks]
+                pool.insert_rows("chunks", rows, casts={"embedding": "halfvec(768)"})
+                return
+            except Exception as e:
+                logger.warning(f"Direct chunk insert failed, using REST: {e}")
         
         # Bulk insert in batches of 100 ? Supabase-py handles lists.
         # But for huge lists, batching is safer.
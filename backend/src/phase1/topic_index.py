@@ -0,0 +1,120 @@
+import logging
+import math
+import uuid
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.shared.db import get_supabase_client
+from src.shared.pg import get_pg_pool, vector_literal
+
+logger = logging.getLogger(__name__)
+
+MAX_TOPICS = 256
+KMEANS_ITERATIONS = 20
+
+
+def topic_count(num_chunks: int) -> int:
+    """~sqrt(n) topics: a 2,000-chunk textbook gets ~45 (roughly a section each)."""
+    return max(1, min(MAX_TOPICS, round(math.sqrt(num_chunks))))
+
+
+def spherical_kmeans(embeddings: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS,
+                     seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    k-means on L2-normalized vectors with cosine similarity (k-means++ init).
+    Returns (centroids [k, d] normalized, assignments [n]).
+    """
+    rng = np.random.default_rng(seed)
+    x = embeddings.astype(np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    x = x / np.where(norms == 0, 1, norms)
+    n = len(x)
+    k = min(k, n)
+
+    # k-means++ seeding on cosine distance
+    centroids = np.empty((k, x.shape[1]), dtype=np.float32)
+    centroids[0] = x[rng.integers(n)]
+    closest = 1 - x @ centroids[0]
+    for i in range(1, k):
+        weights = np.clip(closest, 0, None) ** 2
+        total = weights.sum()
+        pick = rng.choice(n, p=weights / total) if total > 0 else rng.integers(n)
+        centroids[i] = x[pick]
+        closest = np.minimum(closest, 1 - x @ centroids[i])
+
+    assignments = None
+    for _ in range(iterations):
+        new_assignments = np.argmax(x @ centroids.T, axis=1)
+        if assignments is not None and np.array_equal(new_assignments, assignments):
+            break
+        assignments = new_assignments
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, x)
+        counts = np.bincount(assignments, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters with the points farthest from their centroid
+            fit = np.einsum("ij,ij->i", x, centroids[assignments])
+            sums[empty] = x[np.argsort(fit)[:empty.sum()]]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms == 0, 1, norms)
+
+    return centroids, assignments
+
+
+class TopicIndexBuilder:
+    """
+    Coarse topic index for one source, built at the end of Phase 1.
+    Centroids go to source_topics, chunk -> topic assignments to chunk_topics
+    (phase1/topic_index.sql). Phase 3's 'routed' vector tier searches only the
+    chunks of the topics nearest to each query.
+    """
+
+    def __init__(self, source_id: str):
+        self.source_id = source_id
+        self.supabase = get_supabase_client()
+
+    def build(self, chunks: List[Dict]) -> int:
+        """chunks need chunk_id and embedding. Returns the number of topics written."""
+        chunks = [c for c in chunks if c.get("embedding")]
+        if not chunks:
+            return 0
+        k = topic_count(len(chunks))
+        centroids, assignments = spherical_kmeans(np.asarray([c["embedding"] for c in chunks]), k)
+
+        topic_ids = [str(uuid.uuid4()) for _ in range(len(centroids))]
+        sizes = np.bincount(assignments, minlength=len(centroids))
+        topics = [{
+            "topic_id": topic_ids[i],
+            "source_id": self.source_id,
+            "centroid": vector_literal(centroids[i]),
+            "size": int(sizes[i])
+        } for i in range(len(centroids)) if sizes[i] > 0]
+        members = [{
+            "chunk_id": c["chunk_id"],
+            "topic_id": topic_ids[assignments[j]]
+        } for j, c in enumerate(chunks)]
+
+        self._save(topics, members)
+        logger.info(f"Topic index: {len(chunks)} chunks -> {len(topics)} topics for source {self.source_id}")
+        return len(topics)
+
+    def _save(self, topics: List[Dict], members: List[Dict]):
+        # Rebuilds replace the source's previous index (chunk_topics cascades from source_topics)
+        pool = get_pg_pool()
+        if pool is not None:
+            try:
+                pool.query("DELETE FROM source_topics WHERE source_id = %s", (self.source_id,))
+                pool.insert_rows("source_topics", topics, casts={"centroid": "halfvec(768)"})
+                pool.insert_rows("chunk_topics", members)
+                return
+            except Exception as e:
+                logger.warning(f"Direct topic index insert failed, using REST: {e}")
+
+        self.supabase.table("source_topics").delete().eq("source_id", self.source_id).execute()
+        batch_size = 500
+        for i in range(0, len(topics), batch_size):
+            self.supabase.table("source_topics").insert(topics[i : i+batch_size]).execute()
+        for i in range(0, len(members), batch_size):
+            self.supabase.table("chunk_topics").insert(members[i : i+batch_size]).execute()
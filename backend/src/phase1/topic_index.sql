@@ -0,0 +1,23 @@
+-- Coarse-to-fine topic index (built at the end of Phase 1, see phase1/topic_index.py)
+-- Each source's chunk embeddings are clustered with spherical k-means (~sqrt(n) topics).
+-- Phase 3's 'routed' vector tier (phase3/hybrid_search_rpc.sql) ranks the topic centroids
+-- first and only scans the chunks of the nearest few topics (IVF-style pruning).
+
+CREATE TABLE IF NOT EXISTS source_topics (
+  topic_id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  source_id uuid NOT NULL REFERENCES sources(source_id) ON DELETE CASCADE,
+
+  centroid halfvec(768) NOT NULL,
+  size int NOT NULL,
+
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS source_topics_source_idx ON source_topics(source_id);
+
+CREATE TABLE IF NOT EXISTS chunk_topics (
+  chunk_id uuid PRIMARY KEY REFERENCES chunks(chunk_id) ON DELETE CASCADE,
+  topic_id uuid NOT NULL REFERENCES source_topics(topic_id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS chunk_topics_topic_idx ON chunk_topics(topic_id);
@@ -0,0 +1,67 @@
+-- Bulk chunk status writer + per-session progress counters
+-- ChunkStatusWriter(shared/status_writer.py)가 모아둔 상태 변경을 한 번의 RPC로 반영한다.
+-- patch_status.sql 적용 이후 실행
+
+-- UI는 audio_chunks를 다시 조회하지 않고 sessions 한 행(progress)만 읽는다.
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS progress jsonb NOT NULL
+  DEFAULT '{"total": 0, "pending": 0, "processing": 0, "completed": 0, "failed": 0}';
+
+CREATE OR REPLACE FUNCTION refresh_session_progress(p_session_ids UUID[])
+RETURNS void
+LANGUAGE sql
+AS $$
+  UPDATE sessions s
+  SET progress = p.progress
+  FROM (
+    SELECT
+      ac.session_id,
+      jsonb_build_object(
+        'total', count(*),
+        'pending', count(*) FILTER (WHERE ac.status = 'pending'),
+        'processing', count(*) FILTER (WHERE ac.status = 'processing'),
+        'completed', count(*) FILTER (WHERE ac.status = 'completed'),
+        'failed', count(*) FILTER (WHERE ac.status = 'failed')
+      ) AS progress
+    FROM audio_chunks ac
+    WHERE ac.session_id = ANY(p_session_ids)
+    GROUP BY ac.session_id
+  ) p
+  WHERE s.session_id = p.session_id
+    AND s.progress IS DISTINCT FROM p.progress; -- skip no-op writes (and realtime events)
+$$;
+
+-- p_updates: [{"chunk_id": "...", "status": "completed", "error_message": null}, ...]
+CREATE OR REPLACE FUNCTION apply_audio_chunk_status(p_updates JSONB)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_session_ids UUID[];
+  v_count INT;
+BEGIN
+  WITH u AS (
+    SELECT
+      (e->>'chunk_id')::uuid AS chunk_id,
+      e->>'status' AS status,
+      e->>'error_message' AS error_message
+    FROM jsonb_array_elements(p_updates) e
+  ),
+  updated AS (
+    UPDATE audio_chunks ac
+    SET status = u.status,
+        error_message = u.error_message
+    FROM u
+    WHERE ac.chunk_id = u.chunk_id
+    RETURNING ac.session_id
+  )
+  SELECT array_agg(DISTINCT updated.session_id), count(*)
+  INTO v_session_ids, v_count
+  FROM updated;
+
+  IF v_session_ids IS NOT NULL THEN
+    PERFORM refresh_session_progress(v_session_ids);
+  END IF;
+
+  RETURN v_count;
+END;
+$$;
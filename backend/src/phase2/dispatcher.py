@@ -3,17 +3,17 @@ import logging
 import math
 import subprocess
 import concurrent.futures
-import google.auth
-from google.auth import iam
-from google.auth.transport import requests as google_requests
-from google.auth.credentials import Signing, Credentials
-from typing import List, Dict, Any
-from google.cloud import storage
+from typing import List, Dict, Any, Callable
 from datetime import timedelta
 
 from src.shared.config import Config
 from src.shared.db import get_supabase_client
+from src.shared.clients import get_storage_client, generate_signed_url
+from src.shared.status_writer import ChunkStatusWriter
+from src.shared.job_log import JobLogWriter
 from src.phase2 import signal_extraction  # Import directly
+from src.phase2.signal_cache import SignalCache
+from src.phase3.retrieval_pipeline import PipelinedRetrieval
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +32,8 @@ def run(payload_str: str):
     gcs_audio_url = payload.get("gcs_audio_url")
     subject = payload.get("subject", "Unknown")
     exam_window = payload.get("exam_window", "midterm")
+    # JSON true/false or a string flag, parsed like the env flags in Config
+    pipelined_retrieval = str(payload.get("pipelined_retrieval", Config.PIPELINED_RETRIEVAL)).lower() == "true"
 
     if not all([session_id, gcs_audio_url]):
         raise ValueError("Missing session_id or gcs_audio_url")
@@ -69,13 +71,38 @@ def run(payload_str: str):
     result = supabase.table("audio_chunks").insert(chunks_to_process).execute()
     created_chunks = result.data
     
-    # 4. Update Session Status
-    supabase.table("sessions").update({"status": "extracting"}).eq("session_id", session_id).execute()
+    # 4. Update Session Status (progress counters seeded in the same write)
+    supabase.table("sessions").update({
+        "status": "extracting",
+        "progress": {"total": len(created_chunks), "pending": len(created_chunks), "processing": 0, "completed": 0, "failed": 0}
+    }).eq("session_id", session_id).execute()
 
     # 5. Process all chunks locally in parallel (ThreadPool)
     # Using 'copy' codec in ffmpeg makes this very lightweight on CPU.
     # Parallelism constrained by Network Bandwidth & Memory, not CPU.
-    process_chunks_locally(created_chunks, subject, exam_window)
+    # Chunk status changes are coalesced and flushed in bulk by the writer;
+    # leaving the block flushes the final states before the session moves on.
+    # In pipelined mode, each chunk's signals are handed to Phase 3 as soon as they are inserted;
+    # its progress lands in the Phase 2 log.
+    signal_cache = SignalCache() if Config.SIGNAL_CACHE_ENABLED else None
+
+    with JobLogWriter([session_id], phase="2", reset=True) as job_log:
+        retrieval = PipelinedRetrieval(session_id, job_log=job_log) if pipelined_retrieval else None
+        on_signals_inserted = retrieval.submit if retrieval else None
+        job_log.log(f"Extracting signals from {len(created_chunks)} audio chunks...")
+        with ChunkStatusWriter() as status_writer:
+            process_chunks_locally(created_chunks, subject, exam_window, status_writer, on_signals_inserted, signal_cache)
+
+        if retrieval:
+            logger.info("Phase 2 Dispatcher: Waiting for pipelined retrieval to drain...")
+            retrieval.finish()
+
+        if signal_cache:
+            stats = signal_cache.summary()
+            cache_msg = (f"Signal cache: {stats['hits']}/{stats['hits'] + stats['misses']} chunks reused "
+                         f"({stats['hit_rate']:.0%}), ~{stats['model_seconds_saved']}s of model time saved")
+            logger.info(cache_msg)
+            job_log.log(cache_msg)
 
     # 6. Mark Session Complete
     supabase.table("sessions").update({"status": "reasoning"}).eq("session_id", session_id).execute()
@@ -85,34 +112,14 @@ def run(payload_str: str):
 
 
 def get_audio_duration(gcs_uri: str) -> float:
-    storage_client = storage.Client(project=Config.GCP_PROJECT)
+    storage_client = get_storage_client()
     bucket_name = gcs_uri.replace("gs://", "").split("/")[0]
     blob_name = "/".join(gcs_uri.replace("gs://", "").split("/")[1:])
     bucket = storage_client.bucket(bucket_name)
     blob = bucket.blob(blob_name)
 
-    # Check for service account credentials to handle signing in Cloud Run
-    credentials, _ = google.auth.default()
-    
-    # In Cloud Run (Compute Engine creds), we don't have a private key.
-    # We must use IAM Signer if we are using a service account without a private key file.
-    if hasattr(credentials, "service_account_email") and credentials.service_account_email:
-        # Create a request object to refresh credentials if needed
-        request = google_requests.Request()
-        credentials.refresh(request)
-        
-        # Newer versions of google-cloud-storage support IAM signing natively
-        # if access_token and service_account_email are provided.
-        signed_url = blob.generate_signed_url(
-            version="v4",
-            expiration=timedelta(minutes=5),
-            service_account_email=credentials.service_account_email,
-            access_token=credentials.token
-        )
-    else:
-        # Fallback for local development where creds likely have a private key
-        signed_url = blob.generate_signed_url(expiration=timedelta(minutes=5))
-
+    # Handles IAM signing in Cloud Run with cached credentials
+    signed_url = generate_signed_url(blob, timedelta(minutes=5))
 
     cmd = [
         "ffprobe", 
@@ -129,7 +136,14 @@ def get_audio_duration(gcs_uri: str) -> float:
         raise ValueError(f"Could not determine audio duration for {gcs_uri}")
 
 
-def process_chunks_locally(chunks: List[Dict], subject: str, exam_window: str):
+def process_chunks_locally(
+    chunks: List[Dict],
+    subject: str,
+    exam_window: str,
+    status_writer: ChunkStatusWriter = None,
+    on_signals_inserted: Callable[[List[Dict]], None] = None,
+    signal_cache: SignalCache = None
+):
     """
     Process chunks using ThreadPoolExecutor within this same container.
     """
@@ -143,7 +157,10 @@ def process_chunks_locally(chunks: List[Dict], subject: str, exam_window: str):
                 start_offset_sec=chunk["start_offset_sec"],
                 duration_sec=chunk["duration_sec"],
                 subject_name=subject,
-                exam_window=exam_window
+                exam_window=exam_window,
+                status_writer=status_writer,
+                on_signals_inserted=on_signals_inserted,
+                signal_cache=signal_cache
             )
         except Exception as e:
             logger.error(f"Error processing chunk {chunk['chunk_id']}: {e}")
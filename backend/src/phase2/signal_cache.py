@@ -0,0 +1,81 @@
+import copy
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Optional
+
+from src.shared.db import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+class SignalCache:
+    """
+    Content-addressed cache of Phase 2 extraction output (table: signal_cache).
+
+    Key: sha256 of the sliced audio + model name + prompt version. Values are the
+    raw model signals (chunk-relative timestamps), so a hit goes through the same
+    session/chunk rebasing as a fresh extraction. One instance per session keeps
+    the hit/miss statistics for that session.
+    """
+
+    def __init__(self):
+        self.supabase = get_supabase_client()
+        self.hits = 0
+        self.misses = 0
+        self.model_seconds_saved = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(local_path: str, model_name: str, prompt_version: str) -> str:
+        h = hashlib.sha256()
+        with open(local_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        return f"{h.hexdigest()}:{model_name}:{prompt_version}"
+
+    def lookup(self, fingerprint: str) -> Optional[List[Dict]]:
+        """Returns cached signals, or None on a miss (an empty list is a valid hit)."""
+        try:
+            res = self.supabase.table("signal_cache")\
+                .select("signals, model_seconds")\
+                .eq("fingerprint", fingerprint)\
+                .limit(1)\
+                .execute()
+        except Exception as e:
+            logger.warning(f"Signal cache lookup failed, treating as miss: {e}")
+            res = None
+
+        with self._lock:
+            if not res or not res.data:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.model_seconds_saved += res.data[0].get("model_seconds") or 0.0
+        return res.data[0]["signals"] or []
+
+    def store(self, fingerprint: str, model_name: str, prompt_version: str, signals: List[Dict], model_seconds: float):
+        # Strip per-chunk ids; they are rebased on every reuse
+        raw = copy.deepcopy(signals)
+        for sig in raw:
+            sig.pop("audio_chunk_id", None)
+            sig.pop("session_id", None)
+        try:
+            self.supabase.table("signal_cache").upsert({
+                "fingerprint": fingerprint,
+                "model_name": model_name,
+                "prompt_version": prompt_version,
+                "signals": raw,
+                "model_seconds": model_seconds
+            }, on_conflict="fingerprint", ignore_duplicates=True).execute()
+        except Exception as e:
+            logger.warning(f"Failed to store signal cache entry: {e}")
+
+    def summary(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "model_seconds_saved": round(self.model_seconds_saved, 1)
+        }
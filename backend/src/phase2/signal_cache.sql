@@ -0,0 +1,17 @@
+-- Content-addressed cache of Phase 2 extraction output
+-- 같은 강의 녹음(동일 슬라이스 바이트) + 같은 모델 + 같은 프롬프트 버전이면 Gemini 호출을 건너뛰고 재사용한다.
+-- signals는 모델 원본 출력(청크 기준 상대 시간, session_id/audio_chunk_id 없음)으로 저장한다.
+
+CREATE TABLE IF NOT EXISTS signal_cache (
+  fingerprint text PRIMARY KEY, -- "<sha256 of sliced audio>:<model_name>:<prompt_version>"
+  model_name text NOT NULL,
+  prompt_version text NOT NULL,
+
+  signals jsonb NOT NULL DEFAULT '[]',
+  model_seconds double precision, -- Gemini latency paid when the entry was created
+
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Prompt/model bumps leave old entries unreachable; this index makes pruning them cheap.
+CREATE INDEX IF NOT EXISTS signal_cache_model_prompt_idx ON signal_cache(model_name, prompt_version);
@@ -2,19 +2,25 @@ import json
 import logging
 import os
 import subprocess
+import time
 import uuid
 import traceback
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 from datetime import timedelta
-from google.cloud import storage
 
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
+from vertexai.generative_models import Part
 from src.shared.config import Config
 from src.shared.db import get_supabase_client
+from src.shared.clients import get_storage_client, get_generative_model, init_vertexai, generate_signed_url
+from src.shared.status_writer import ChunkStatusWriter
+from src.phase2.signal_cache import SignalCache
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the extraction system prompt or response schema changes,
+# so cached signals from the old prompt are no longer reused.
+PROMPT_VERSION = "p2-2026-01-v1"
+
 def process_chunk_internal(
     session_id: str,
     audio_chunk_id: str,
@@ -22,64 +28,87 @@ def process_chunk_internal(
     start_offset_sec: float,
     duration_sec: float,
     subject_name: str,
-    exam_window: str
+    exam_window: str,
+    status_writer: Optional[ChunkStatusWriter] = None,
+    on_signals_inserted: Optional[Callable[[List[Dict]], None]] = None,
+    signal_cache: Optional[SignalCache] = None
 ):
     """
     Internal function to process a single chunk.
     Designed to be called by Dispatcher directly in a ThreadPool.
+    When a status_writer is given, status changes are coalesced instead of
+    written one round trip at a time. on_signals_inserted receives the inserted
+    signal rows (with signal_id) for pipelined retrieval. With a signal_cache,
+    previously extracted identical slices reuse their cached signals.
     """
-    vertexai.init(project=Config.GCP_PROJECT, location=Config.GEMINI_LOCATION)
+    init_vertexai(Config.GEMINI_LOCATION)
     supabase = get_supabase_client()
     
     # 0. Update Status: Processing
     try:
-        supabase.table("audio_chunks").update({
-            "status": "processing",
-            "error_message": None
-        }).eq("chunk_id", audio_chunk_id).execute()
+        _set_chunk_status(supabase, status_writer, audio_chunk_id, "processing")
     except Exception as e:
         logger.warning(f"Could not update status to processing: {e}")
 
     processed_gcs_uri = gcs_chunk_url
     temp_gcs_blob = None
+    fingerprint = None
+    signals = None
     
     # SLICING LOGIC
     if duration_sec > 0:
+        local_path = None
         try:
-            processed_gcs_uri = _slice_and_upload_audio(gcs_chunk_url, start_offset_sec, duration_sec, audio_chunk_id)
-            if processed_gcs_uri != gcs_chunk_url:
+            local_path = _slice_audio(gcs_chunk_url, start_offset_sec, duration_sec, audio_chunk_id)
+
+            # Identical slice + model + prompt already extracted? Skip upload and Gemini.
+            if signal_cache is not None:
+                fingerprint = signal_cache.fingerprint(local_path, Config.GEMINI_MODEL_NAME, PROMPT_VERSION)
+                signals = signal_cache.lookup(fingerprint)
+
+            if signals is None:
+                processed_gcs_uri = _upload_temp_chunk(local_path, gcs_chunk_url, audio_chunk_id)
                 temp_gcs_blob = processed_gcs_uri
         except Exception as e:
             msg = f"Failed to slice audio for chunk {audio_chunk_id}: {e}"
             logger.error(msg)
-            supabase.table("audio_chunks").update({"status": "failed", "error_message": msg}).eq("chunk_id", audio_chunk_id).execute()
+            _set_chunk_status(supabase, status_writer, audio_chunk_id, "failed", msg)
             raise
+        finally:
+            if local_path and os.path.exists(local_path):
+                os.remove(local_path)
 
-    try:
-        signals = _call_gemini_extraction(
-            session_id=session_id,
-            audio_chunk_id=audio_chunk_id,
-            gcs_uri=processed_gcs_uri,
-            subject=subject_name,
-            exam_window=exam_window
-        )
-        
-        # Success if we reach here (even if no signals)
-        supabase.table("audio_chunks").update({"status": "completed"}).eq("chunk_id", audio_chunk_id).execute()
-        
-    except Exception as e:
-        msg = f"Gemini Extraction Failed: {e}"
-        logger.error(msg)
-        supabase.table("audio_chunks").update({"status": "failed", "error_message": msg}).eq("chunk_id", audio_chunk_id).execute()
-        # Clean up temp file
-        if temp_gcs_blob:
-            _delete_gcs_file(temp_gcs_blob)
-        raise
+    if signals is not None:
+        logger.info(f"Chunk {audio_chunk_id}: Signal cache hit ({len(signals)} signals), skipping Gemini extraction.")
+        _set_chunk_status(supabase, status_writer, audio_chunk_id, "completed")
+    else:
+        try:
+            started = time.monotonic()
+            signals = _call_gemini_extraction(
+                session_id=session_id,
+                audio_chunk_id=audio_chunk_id,
+                gcs_uri=processed_gcs_uri,
+                subject=subject_name,
+                exam_window=exam_window
+            )
+            model_seconds = time.monotonic() - started
+            
+            # Success if we reach here (even if no signals)
+            _set_chunk_status(supabase, status_writer, audio_chunk_id, "completed")
+
+            if fingerprint:
+                signal_cache.store(fingerprint, Config.GEMINI_MODEL_NAME, PROMPT_VERSION, signals, model_seconds)
+            
+        except Exception as e:
+            msg = f"Gemini Extraction Failed: {e}"
+            logger.error(msg)
+            _set_chunk_status(supabase, status_writer, audio_chunk_id, "failed", msg)
+            raise
 
-    finally:
-        # Cleanup temp file
-        if temp_gcs_blob:
-            _delete_gcs_file(temp_gcs_blob)
+        finally:
+            # Cleanup temp file
+            if temp_gcs_blob:
+                _delete_gcs_file(temp_gcs_blob)
 
     if signals:
         try:
@@ -97,10 +126,25 @@ def process_chunk_internal(
         except Exception as e:
             logger.error(f"Failed to insert signals for chunk {audio_chunk_id}: {e}")
             raise
+
+        if on_signals_inserted:
+            on_signals_inserted(data.data)
     else:
         logger.info(f"Chunk {audio_chunk_id}: No signals extracted.")
 
 
+def _set_chunk_status(supabase, status_writer: Optional[ChunkStatusWriter], chunk_id: str, status: str, error_message: str = None):
+    if status_writer is not None:
+        status_writer.update(chunk_id, status, error_message)
+        return
+    # Same RPC the writer flushes through, so sessions.progress (what the UI reads) stays current
+    supabase.rpc("apply_audio_chunk_status", {"p_updates": [{
+        "chunk_id": chunk_id,
+        "status": status,
+        "error_message": error_message
+    }]}).execute()
+
+
 def run(payload_str: str):
     logger.info("Phase 2: Audio Signal Extraction Started")
     try:
@@ -120,11 +164,12 @@ def run(payload_str: str):
     )
 
 
-def _slice_and_upload_audio(original_gcs_uri: str, start: float, duration: float, chunk_id: str) -> str:
+def _slice_audio(original_gcs_uri: str, start: float, duration: float, chunk_id: str) -> str:
     """
     Slices audio using ffmpeg stream copy (-c copy) for speed.
+    Returns the local path of the slice; the caller removes it.
     """
-    storage_client = storage.Client(project=Config.GCP_PROJECT)
+    storage_client = get_storage_client()
     
     bucket_name = original_gcs_uri.replace("gs://", "").split("/")[0]
     blob_name = "/".join(original_gcs_uri.replace("gs://", "").split("/")[1:])
@@ -132,23 +177,8 @@ def _slice_and_upload_audio(original_gcs_uri: str, start: float, duration: float
     bucket = storage_client.bucket(bucket_name)
     source_blob = bucket.blob(blob_name)
 
-    # Check for service account credentials to handle signing in Cloud Run
-    import google.auth
-    from google.auth.transport import requests as google_requests
-    credentials, _ = google.auth.default()
-    
-    # In Cloud Run (Compute Engine creds), we use Access Token + Service Account Email
-    if hasattr(credentials, "service_account_email") and credentials.service_account_email:
-        request = google_requests.Request()
-        credentials.refresh(request)
-        input_url = source_blob.generate_signed_url(
-            version="v4",
-            expiration=timedelta(minutes=15),
-            service_account_email=credentials.service_account_email,
-            access_token=credentials.token
-        )
-    else:
-         input_url = source_blob.generate_signed_url(expiration=timedelta(minutes=15))
+    # Credentials are cached process-wide and only refreshed near expiry
+    input_url = generate_signed_url(source_blob, timedelta(minutes=15))
     
     # Determine extension from source file to allow "copy" codec (e.g. m4a -> m4a)
     _, ext = os.path.splitext(blob_name)
@@ -172,18 +202,22 @@ def _slice_and_upload_audio(original_gcs_uri: str, start: float, duration: float
     logger.info(f"Running ffmpeg copy from {ext} to {ext}")
     subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
     
-    # Upload to Temp GCS
+    return local_output
+
+def _upload_temp_chunk(local_path: str, original_gcs_uri: str, chunk_id: str) -> str:
+    """Uploads a sliced chunk next to the original under temp_chunks/."""
+    bucket_name = original_gcs_uri.replace("gs://", "").split("/")[0]
+    _, ext = os.path.splitext(local_path)
+
     dest_blob_name = f"temp_chunks/{chunk_id}{ext}"
-    dest_blob = storage_client.bucket(bucket_name).blob(dest_blob_name)
-    dest_blob.upload_from_filename(local_output)
-    
-    os.remove(local_output)
+    dest_blob = get_storage_client().bucket(bucket_name).blob(dest_blob_name)
+    dest_blob.upload_from_filename(local_path)
     
     return f"gs://{bucket_name}/{dest_blob_name}"
 
 def _delete_gcs_file(gcs_uri: str):
     try:
-        storage_client = storage.Client(project=Config.GCP_PROJECT)
+        storage_client = get_storage_client()
         bucket_name = gcs_uri.replace("gs://", "").split("/")[0]
         blob_name = "/".join(gcs_uri.replace("gs://", "").split("/")[1:])
         storage_client.bucket(bucket_name).blob(blob_name).delete()
@@ -201,7 +235,7 @@ def _call_gemini_extraction(
 ) -> List[Dict[str, Any]]:
     
     model_name = Config.GEMINI_MODEL_NAME # e.g. "gemini-2.5-flash-lite"
-    model = GenerativeModel(model_name)
+    model = get_generative_model(model_name, Config.GEMINI_LOCATION)
 
     # Response Schema
     response_schema = {
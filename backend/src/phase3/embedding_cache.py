@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+from src.shared.config import Config
+from src.shared.db import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Unicode (NFKC) + case + whitespace normalization used for cache keys and dedup."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class EmbeddingCache:
+    """
+    Two-level query embedding cache keyed by (model name, normalized query).
+
+    L1: in-process LRU shared by every RetrievalPipeline in the process (reruns,
+        lazy retrievals from Phase 4 across sessions).
+    L2: query_embedding_cache table (phase3/embedding_cache.sql), pruned to
+        EMBED_CACHE_MAX_ROWS by last use, shared across jobs and sessions.
+    """
+
+    # Per-text latency assumed for "saved" estimates until a real call is measured
+    DEFAULT_MS_PER_TEXT = 15.0
+
+    def __init__(self, model_name: str, max_memory_entries: int = None, max_rows: int = None):
+        self.model_name = model_name
+        self.max_memory_entries = max_memory_entries or Config.EMBED_CACHE_MEMORY_SIZE
+        self.max_rows = max_rows or Config.EMBED_CACHE_MAX_ROWS
+        self.supabase = get_supabase_client()
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._persistent_available = True
+        self._ms_per_text = None
+
+    def get_many(self, texts: List[str], embed_fn: Callable[[List[str]], List[List[float]]]) -> Tuple[List[List[float]], Dict]:
+        """
+        Returns embeddings aligned with `texts`, calling embed_fn only for misses,
+        plus a stats dict (lookups, memory_hits, persistent_hits, misses, hit_ratio, saved_ms).
+        """
+        keys = [normalize_query(t) for t in texts]
+        found: Dict[str, List[float]] = {}
+
+        # L1
+        with self._lock:
+            for key in keys:
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vec
+        memory_hits = len(found)
+
+        # L2
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        persistent = self._fetch_persistent(missing) if missing else {}
+        found.update(persistent)
+
+        # Model call for the rest (first text seen for each key)
+        to_embed = {}
+        for text, key in zip(texts, keys):
+            if key not in found and key not in to_embed:
+                to_embed[key] = text
+        if to_embed:
+            started = time.monotonic()
+            vectors = embed_fn(list(to_embed.values()))
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self._ms_per_text = elapsed_ms / len(to_embed)
+            fresh = dict(zip(to_embed.keys(), vectors))
+            found.update(fresh)
+            self._store_persistent(fresh)
+
+        with self._lock:
+            for key in set(persistent) | set(to_embed):
+                self._memory[key] = found[key]
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+        hits = memory_hits + len(persistent)
+        stats = {
+            "lookups": len(found),
+            "memory_hits": memory_hits,
+            "persistent_hits": len(persistent),
+            "misses": len(to_embed),
+            "hit_ratio": hits / len(found) if found else 0.0,
+            "saved_ms": round(hits * (self._ms_per_text or self.DEFAULT_MS_PER_TEXT))
+        }
+        return [found[k] for k in keys], stats
+
+    def _fetch_persistent(self, keys: List[str]) -> Dict[str, List[float]]:
+        if not self._persistent_available:
+            return {}
+        try:
+            res = self.supabase.rpc("fetch_query_embeddings", {
+                "p_model_name": self.model_name,
+                "p_queries": keys
+            }).execute()
+            return {row["query_norm"]: row["embedding"] for row in (res.data or [])}
+        except Exception as e:
+            logger.warning(f"Persistent embedding cache unavailable, using in-process cache only: {e}")
+            self._persistent_available = False
+            return {}
+
+    def _store_persistent(self, fresh: Dict[str, List[float]]):
+        if not self._persistent_available or not fresh:
+            return
+        rows = [{"model_name": self.model_name, "query_norm": k, "embedding": v} for k, v in fresh.items()]
+        try:
+            for i in range(0, len(rows), 500):
+                self.supabase.table("query_embedding_cache")\
+                    .upsert(rows[i : i+500], on_conflict="model_name,query_norm", ignore_duplicates=True)\
+                    .execute()
+            self.supabase.rpc("prune_query_embedding_cache", {"p_max_rows": self.max_rows}).execute()
+        except Exception as e:
+            logger.warning(f"Failed to persist {len(rows)} query embeddings: {e}")
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name: str = None) -> EmbeddingCache:
+    """Process-wide cache per embedding model."""
+    model_name = model_name or Config.EMBEDDING_MODEL_NAME
+    with _caches_lock:
+        if model_name not in _caches:
+            _caches[model_name] = EmbeddingCache(model_name)
+        return _caches[model_name]
@@ -0,0 +1,59 @@
+-- Persistent query embedding cache (second level behind the in-process LRU in phase3/embedding_cache.py)
+-- Key: (embedding model, normalized query). Size-bounded by prune_query_embedding_cache (LRU by last_used_at).
+
+CREATE TABLE IF NOT EXISTS query_embedding_cache (
+  model_name text NOT NULL,
+  query_norm text NOT NULL,
+  embedding real[] NOT NULL, -- real[] (not halfvec) so PostgREST returns a plain JSON array
+
+  created_at timestamptz NOT NULL DEFAULT now(),
+  last_used_at timestamptz NOT NULL DEFAULT now(),
+
+  PRIMARY KEY (model_name, query_norm)
+);
+
+CREATE INDEX IF NOT EXISTS query_embedding_cache_lru_idx ON query_embedding_cache(last_used_at);
+
+-- Lookup + LRU touch in one round trip (POST body, so long query lists don't hit URL limits)
+CREATE OR REPLACE FUNCTION fetch_query_embeddings(p_model_name TEXT, p_queries TEXT[])
+RETURNS TABLE (query_norm TEXT, embedding REAL[])
+LANGUAGE sql
+AS $$
+  UPDATE query_embedding_cache q
+  SET last_used_at = now()
+  WHERE q.model_name = p_model_name
+    AND q.query_norm = ANY(p_queries)
+  RETURNING q.query_norm, q.embedding;
+$$;
+
+-- Keeps the p_max_rows most recently used entries. Returns the number of evicted rows.
+-- Runs after every store, so it must stay cheap: the row count comes from the table's
+-- live-tuple statistic (no scan; may lag a few seconds, which only delays eviction), and
+-- when over the cap only the excess is deleted, read from the oldest end of the LRU index.
+CREATE OR REPLACE FUNCTION prune_query_embedding_cache(p_max_rows INT)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_excess BIGINT;
+  v_deleted INT;
+BEGIN
+  v_excess := pg_stat_get_live_tuples('query_embedding_cache'::regclass) - p_max_rows;
+  IF v_excess <= 0 THEN
+    RETURN 0;
+  END IF;
+
+  WITH doomed AS (
+    SELECT q.model_name, q.query_norm
+    FROM query_embedding_cache q
+    ORDER BY q.last_used_at
+    LIMIT v_excess
+  )
+  DELETE FROM query_embedding_cache q
+  USING doomed d
+  WHERE q.model_name = d.model_name AND q.query_norm = d.query_norm;
+
+  GET DIAGNOSTICS v_deleted = ROW_COUNT;
+  RETURN v_deleted;
+END;
+$$;
@@ -0,0 +1,58 @@
+-- Batched Hybrid Search RPC
+-- Runs hybrid_search_rrf for many queries in one round trip and tags each row with its query index.
+-- p_query_embeddings is a JSON array of 768-float arrays (PostgREST cannot pass halfvec[] directly);
+-- each element is cast to halfvec(768) inside Postgres.
+-- Requires hybrid_search_rpc.sql.
+
+DROP FUNCTION IF EXISTS hybrid_search_rrf_batch(TEXT[], JSONB, INT, INT);
+DROP FUNCTION IF EXISTS hybrid_search_rrf_batch(TEXT[], JSONB, INT, INT, UUID[]);
+DROP FUNCTION IF EXISTS hybrid_search_rrf_batch(TEXT[], JSONB, INT, INT, UUID[], TEXT);
+
+CREATE OR REPLACE FUNCTION hybrid_search_rrf_batch(
+  p_query_texts TEXT[],
+  p_query_embeddings JSONB,
+  p_match_count INT,
+  p_rrf_k INT DEFAULT 60,
+  p_source_ids UUID[] DEFAULT NULL, -- Subject scope (NULL = all chunks)
+  p_keyword_mode TEXT DEFAULT 'trgm', -- Keyword channel: 'trgm' | 'word' | 'fts'
+  p_vector_tier TEXT DEFAULT 'full'   -- Vector channel: 'full' | 'binary' | 'routed'
+)
+RETURNS TABLE (
+  query_index INT, -- 0-based position in p_query_texts
+  chunk_id UUID,
+  content_text TEXT,
+  page_start INT,
+  page_end INT,
+  anchor_path TEXT[],
+  score_vector FLOAT,
+  rank_vector BIGINT,
+  score_keyword FLOAT,
+  rank_keyword BIGINT,
+  rrf_score FLOAT
+)
+LANGUAGE sql
+AS $$
+  SELECT
+    (q.ord - 1)::int AS query_index,
+    r.chunk_id,
+    r.content_text,
+    r.page_start,
+    r.page_end,
+    r.anchor_path,
+    r.score_vector,
+    r.rank_vector,
+    r.score_keyword,
+    r.rank_keyword,
+    r.rrf_score
+  FROM unnest(p_query_texts) WITH ORDINALITY AS q(query_text, ord)
+  CROSS JOIN LATERAL hybrid_search_rrf(
+    q.query_text,
+    ((p_query_embeddings -> (q.ord - 1)::int)::text)::halfvec(768),
+    p_match_count,
+    p_rrf_k,
+    p_source_ids => p_source_ids,
+    p_keyword_mode => p_keyword_mode,
+    p_vector_tier => p_vector_tier
+  ) r
+  ORDER BY q.ord, r.rrf_score DESC;
+$$;
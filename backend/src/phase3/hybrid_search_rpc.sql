@@ -1,14 +1,273 @@
 -- Hybrid Search RPC (RRF based)
 -- This function combines Vector Search (pgvector) and Keyword Search (pg_trgm) using Reciprocal Rank Fusion.
 -- It is designed to work with the 'halfvec' type for embeddings.
+--
+-- Subject scoping: pass p_source_ids (the subject's sources) so both channels only touch that
+-- subject's chunks. Scoped scans are exact and bounded by the subject size through the
+-- chunks(source_id, ...) btree, so latency follows the course, not the whole platform.
+-- p_source_ids = NULL keeps the legacy platform-wide search (global HNSW / trigram GIN).
+--
+-- Keyword channel modes (p_keyword_mode):
+--   'trgm' : similarity(content_text, query) with the % operator (legacy). Whole-chunk trigram
+--            similarity of a 3-word query vs a ~1,000-char chunk is tiny, so % drops most chunks.
+--   'word' : word_similarity (<% operator): best match of the query against any extent of the
+--            chunk. Same gin_trgm_ops index.
+--   'fts'  : full text over the precomputed content_tsv column (GIN). 'simple' config + prefix
+--            terms ('노드':*) so Korean particles/endings still match (노드 -> 노드를, 노드에서);
+--            terms are OR-ed and ranked with ts_rank (length-normalized).
+--
+-- Vector tiers (p_vector_tier):
+--   'full'   : cosine over halfvec(768) (HNSW chunks_embedding_hnsw when unscoped).
+--   'binary' : two-tier. Hamming distance over the stored sign bits (embedding_bq, 768 bits =
+--              96 bytes per chunk) picks 4 x p_limit candidates (v_oversample), which are
+--              rescored with the full halfvec cosine. Scoped, the bits are read by an index-only
+--              scan of chunks_source_bq_idx, so only the shortlist's halfvecs are touched
+--              (see scripts/bench_tiered_search.py).
+--   'routed' : coarse-to-fine. Ranks the topic centroids built at ingest (phase1/topic_index.sql)
+--              and scans only the chunks of the nearest 8 topics (v_topic_probes), plus every
+--              chunk of sources that have no topic index yet.
+
+-- Signature changed (p_keyword_mode added): drop the old ones so PostgREST sees a single candidate.
+DROP FUNCTION IF EXISTS hybrid_search_rrf(TEXT, halfvec, INT, INT, FLOAT, FLOAT);
+DROP FUNCTION IF EXISTS hybrid_search_rrf(TEXT, halfvec, INT, INT, FLOAT, FLOAT, UUID[]);
+DROP FUNCTION IF EXISTS hybrid_keyword_channel(TEXT, INT, UUID[]);
+-- Signature changed again (p_vector_k / p_keyword_k added for tuning, see scripts/bench_retrieval_sweep.py)
+DROP FUNCTION IF EXISTS hybrid_search_rrf(TEXT, halfvec, INT, INT, FLOAT, FLOAT, UUID[], TEXT);
+-- ... and p_vector_tier
+DROP FUNCTION IF EXISTS hybrid_search_rrf(TEXT, halfvec, INT, INT, FLOAT, FLOAT, UUID[], TEXT, INT, INT);
+DROP FUNCTION IF EXISTS hybrid_vector_channel(halfvec, INT, UUID[]);
+
+CREATE INDEX IF NOT EXISTS chunks_source_pages_idx ON chunks(source_id, page_start, page_end);
+
+-- Full-text column for the 'fts' keyword mode
+ALTER TABLE chunks
+  ADD COLUMN IF NOT EXISTS content_tsv tsvector
+  GENERATED ALWAYS AS (to_tsvector('simple', content_text)) STORED;
+
+CREATE INDEX IF NOT EXISTS chunks_content_tsv_idx ON chunks USING gin (content_tsv);
+
+-- "KCL 노드 해석" -> 'kcl':* | '노드':* | '해석':*  (NULL when the text has no words)
+CREATE OR REPLACE FUNCTION keyword_tsquery(p_query_text TEXT)
+RETURNS tsquery
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT to_tsquery('simple', string_agg(quote_literal(w) || ':*', ' | '))
+  FROM regexp_split_to_table(lower(p_query_text), '[[:space:][:punct:]]+') AS w
+  WHERE w <> '';
+$$;
+
+-- Binary-quantized tier for 'binary' mode (pgvector >= 0.7). Generated column, so every ingest
+-- path maintains it; adding it rewrites chunks once. The btree on source_id carries the bits so a
+-- subject's Hamming scan is index-only (needs the visibility map, i.e. autovacuum, to be current).
+-- No HNSW over the bits: Phase 3 always searches subject-scoped, where it would not be used.
+ALTER TABLE chunks
+  ADD COLUMN IF NOT EXISTS embedding_bq bit(768)
+  GENERATED ALWAYS AS (binary_quantize(embedding)::bit(768)) STORED;
+
+CREATE INDEX IF NOT EXISTS chunks_source_bq_idx ON chunks(source_id) INCLUDE (chunk_id, embedding_bq);
+
+DROP INDEX IF EXISTS chunks_embedding_bq_hnsw;
+
+-- 1. Vector channel (Semantic)
+CREATE OR REPLACE FUNCTION hybrid_vector_channel(
+  p_query_embedding halfvec(768),
+  p_limit INT,
+  p_source_ids UUID[] DEFAULT NULL,
+  p_vector_tier TEXT DEFAULT 'full' -- 'full' | 'binary' | 'routed'
+)
+RETURNS TABLE (chunk_id UUID, score FLOAT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  -- Binary candidates per final row; Hamming ranking is coarse, so oversample before rescoring
+  v_oversample CONSTANT INT := 4;
+  -- Topics scanned per query in 'routed' mode
+  v_topic_probes CONSTANT INT := 8;
+BEGIN
+  IF p_vector_tier = 'routed' THEN
+    RETURN QUERY
+    WITH routed AS MATERIALIZED (
+      SELECT t.topic_id
+      FROM source_topics t
+      WHERE p_source_ids IS NULL OR t.source_id = ANY(p_source_ids)
+      ORDER BY t.centroid <=> p_query_embedding
+      LIMIT v_topic_probes
+    ),
+    unindexed AS MATERIALIZED (
+      SELECT s.source_id
+      FROM sources s
+      WHERE (p_source_ids IS NULL OR s.source_id = ANY(p_source_ids))
+        AND NOT EXISTS (SELECT 1 FROM source_topics t WHERE t.source_id = s.source_id)
+    ),
+    candidates AS MATERIALIZED (
+      SELECT c.chunk_id, c.embedding
+      FROM chunk_topics ct
+      JOIN chunks c ON c.chunk_id = ct.chunk_id
+      WHERE ct.topic_id IN (SELECT r.topic_id FROM routed r)
+      UNION ALL
+      SELECT c.chunk_id, c.embedding
+      FROM chunks c
+      WHERE c.source_id IN (SELECT u.source_id FROM unindexed u)
+    )
+    SELECT cand.chunk_id, (1 - (cand.embedding <=> p_query_embedding))::float
+    FROM candidates cand
+    ORDER BY cand.embedding <=> p_query_embedding
+    LIMIT p_limit;
+
+  ELSIF p_vector_tier = 'binary' THEN
+    IF p_source_ids IS NULL THEN
+      -- Platform-wide: exact Hamming over every chunk's stored bits (no bit index, see above)
+      RETURN QUERY
+      WITH candidates AS MATERIALIZED (
+        SELECT c.chunk_id
+        FROM chunks c
+        ORDER BY c.embedding_bq <~> binary_quantize(p_query_embedding)::bit(768)
+        LIMIT p_limit * v_oversample
+      )
+      SELECT c.chunk_id, (1 - (c.embedding <=> p_query_embedding))::float
+      FROM candidates cand
+      JOIN chunks c ON c.chunk_id = cand.chunk_id
+      ORDER BY c.embedding <=> p_query_embedding
+      LIMIT p_limit;
+    ELSE
+      -- Hamming over the subject's bits (index-only scan of chunks_source_bq_idx),
+      -- full cosine only for the shortlist
+      RETURN QUERY
+      WITH candidates AS MATERIALIZED (
+        SELECT c.chunk_id
+        FROM chunks c
+        WHERE c.source_id = ANY(p_source_ids)
+        ORDER BY c.embedding_bq <~> binary_quantize(p_query_embedding)::bit(768)
+        LIMIT p_limit * v_oversample
+      )
+      SELECT c.chunk_id, (1 - (c.embedding <=> p_query_embedding))::float
+      FROM candidates cand
+      JOIN chunks c ON c.chunk_id = cand.chunk_id
+      ORDER BY c.embedding <=> p_query_embedding
+      LIMIT p_limit;
+    END IF;
+
+  ELSIF p_source_ids IS NULL THEN
+    -- For cosine distance <=> : 1 - distance is similarity. Uses the global HNSW index.
+    RETURN QUERY
+    SELECT c.chunk_id, (1 - (c.embedding <=> p_query_embedding))::float
+    FROM chunks c
+    ORDER BY c.embedding <=> p_query_embedding
+    LIMIT p_limit;
+  ELSE
+    -- Exact scan over the subject's rows only. MATERIALIZED keeps the planner from
+    -- walking the global HNSW graph and post-filtering (which also loses recall).
+    RETURN QUERY
+    WITH scoped AS MATERIALIZED (
+      SELECT c.chunk_id, c.embedding
+      FROM chunks c
+      WHERE c.source_id = ANY(p_source_ids)
+    )
+    SELECT s.chunk_id, (1 - (s.embedding <=> p_query_embedding))::float
+    FROM scoped s
+    ORDER BY s.embedding <=> p_query_embedding
+    LIMIT p_limit;
+  END IF;
+END;
+$$;
+
+-- 2. Keyword channel (Syntactic)
+CREATE OR REPLACE FUNCTION hybrid_keyword_channel(
+  p_query_text TEXT,
+  p_limit INT,
+  p_source_ids UUID[] DEFAULT NULL,
+  p_keyword_mode TEXT DEFAULT 'trgm' -- 'trgm' | 'word' | 'fts'
+)
+RETURNS TABLE (chunk_id UUID, score FLOAT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_tsquery tsquery;
+BEGIN
+  IF p_keyword_mode = 'fts' THEN
+    v_tsquery := keyword_tsquery(p_query_text);
+    IF v_tsquery IS NULL THEN
+      RETURN;
+    END IF;
+    IF p_source_ids IS NULL THEN
+      RETURN QUERY
+      SELECT c.chunk_id, ts_rank(c.content_tsv, v_tsquery, 1)::float
+      FROM chunks c
+      WHERE c.content_tsv @@ v_tsquery -- uses chunks_content_tsv_idx
+      ORDER BY ts_rank(c.content_tsv, v_tsquery, 1) DESC
+      LIMIT p_limit;
+    ELSE
+      RETURN QUERY
+      WITH scoped AS MATERIALIZED (
+        SELECT c.chunk_id, c.content_tsv
+        FROM chunks c
+        WHERE c.source_id = ANY(p_source_ids)
+      )
+      SELECT s.chunk_id, ts_rank(s.content_tsv, v_tsquery, 1)::float
+      FROM scoped s
+      WHERE s.content_tsv @@ v_tsquery
+      ORDER BY ts_rank(s.content_tsv, v_tsquery, 1) DESC
+      LIMIT p_limit;
+    END IF;
+
+  ELSIF p_keyword_mode = 'word' THEN
+    IF p_source_ids IS NULL THEN
+      RETURN QUERY
+      SELECT c.chunk_id, word_similarity(p_query_text, c.content_text)::float
+      FROM chunks c
+      WHERE p_query_text <% c.content_text -- uses pg_trgm index
+      ORDER BY word_similarity(p_query_text, c.content_text) DESC
+      LIMIT p_limit;
+    ELSE
+      RETURN QUERY
+      WITH scoped AS MATERIALIZED (
+        SELECT c.chunk_id, c.content_text
+        FROM chunks c
+        WHERE c.source_id = ANY(p_source_ids)
+      )
+      SELECT s.chunk_id, word_similarity(p_query_text, s.content_text)::float
+      FROM scoped s
+      WHERE p_query_text <% s.content_text
+      ORDER BY word_similarity(p_query_text, s.content_text) DESC
+      LIMIT p_limit;
+    END IF;
+
+  ELSIF p_source_ids IS NULL THEN
+    RETURN QUERY
+    SELECT c.chunk_id, similarity(c.content_text, p_query_text)::float
+    FROM chunks c
+    WHERE c.content_text % p_query_text -- uses pg_trgm index
+    ORDER BY similarity(c.content_text, p_query_text) DESC
+    LIMIT p_limit;
+  ELSE
+    RETURN QUERY
+    WITH scoped AS MATERIALIZED (
+      SELECT c.chunk_id, c.content_text
+      FROM chunks c
+      WHERE c.source_id = ANY(p_source_ids)
+    )
+    SELECT s.chunk_id, similarity(s.content_text, p_query_text)::float
+    FROM scoped s
+    WHERE s.content_text % p_query_text
+    ORDER BY similarity(s.content_text, p_query_text) DESC
+    LIMIT p_limit;
+  END IF;
+END;
+$$;
 
 CREATE OR REPLACE FUNCTION hybrid_search_rrf(
   p_query_text TEXT,
   p_query_embedding halfvec(768),
   p_match_count INT,
   p_rrf_k INT DEFAULT 60,
-  p_full_text_weight FLOAT DEFAULT 1.0, -- Reserved for Weighted Sum if needed, unused in pure RRF
-  p_semantic_weight FLOAT DEFAULT 1.0   -- Reserved
+  p_full_text_weight FLOAT DEFAULT 1.0, -- Weight of the keyword term in RRF (1.0 = plain RRF)
+  p_semantic_weight FLOAT DEFAULT 1.0,  -- Weight of the vector term in RRF
+  p_source_ids UUID[] DEFAULT NULL,     -- Subject scope (NULL = all chunks)
+  p_keyword_mode TEXT DEFAULT 'trgm',   -- Keyword channel: 'trgm' | 'word' | 'fts'
+  p_vector_k INT DEFAULT NULL,          -- Vector candidates entering RRF (NULL = p_match_count)
+  p_keyword_k INT DEFAULT NULL,         -- Keyword candidates entering RRF (NULL = p_match_count)
+  p_vector_tier TEXT DEFAULT 'full'     -- Vector channel: 'full' | 'binary' | 'routed'
 )
 RETURNS TABLE (
   chunk_id UUID,
@@ -26,43 +285,22 @@ LANGUAGE plpgsql
 AS $$
 BEGIN
   RETURN QUERY
-  WITH 
+  WITH
   -- 1. Vector Search (Semantic)
   vector_search AS (
-    SELECT 
-      c.chunk_id,
-      c.content_text,
-      c.page_start,
-      c.page_end,
-      c.anchor_path,
-      -- Negative inner product distance (higher is better for cosine similarity if normalized, but <-> is L2 usually)
-      -- For cosine distance <=> : 1 - distance is similarity.
-      -- Here assumes <=> (cosine distance) operator. 
-      (1 - (c.embedding <=> p_query_embedding))::float as score_v
-    FROM chunks c
-    ORDER BY c.embedding <=> p_query_embedding
-    LIMIT p_match_count * 2 -- Fetch more candidates for RRF intersection
+    SELECT v.chunk_id, v.score AS score_v
+    FROM hybrid_vector_channel(p_query_embedding, COALESCE(p_vector_k, p_match_count), p_source_ids, p_vector_tier) v
   ),
   ranked_vector AS (
     SELECT *,
            RANK() OVER (ORDER BY score_v DESC) as rank_v
     FROM vector_search
-    LIMIT p_match_count
   ),
 
   -- 2. Keyword Search (Syntactic)
   keyword_search AS (
-    SELECT 
-      c.chunk_id,
-      c.content_text,
-      c.page_start,
-      c.page_end,
-      c.anchor_path,
-      similarity(c.content_text, p_query_text)::float as score_k
-    FROM chunks c
-    WHERE c.content_text % p_query_text -- uses pg_trgm index
-    ORDER BY similarity(c.content_text, p_query_text) DESC
-    LIMIT p_match_count
+    SELECT k.chunk_id, k.score AS score_k
+    FROM hybrid_keyword_channel(p_query_text, COALESCE(p_keyword_k, p_match_count), p_source_ids, p_keyword_mode) k
   ),
   ranked_keyword AS (
     SELECT *,
@@ -72,36 +310,36 @@ BEGIN
 
   -- 3. Merge & RRF
   merged AS (
-    SELECT 
+    SELECT
       COALESCE(v.chunk_id, k.chunk_id) as chunk_id,
-      COALESCE(v.content_text, k.content_text) as content_text,
-      COALESCE(v.page_start, k.page_start) as page_start,
-      COALESCE(v.page_end, k.page_end) as page_end,
-      COALESCE(v.anchor_path, k.anchor_path) as anchor_path,
       v.score_v as score_vector,
       v.rank_v as rank_vector,
       k.score_k as score_keyword,
-      k.rank_k as rank_keyword
+      k.rank_k as rank_keyword,
+      (
+        COALESCE(p_semantic_weight / (p_rrf_k + v.rank_v), 0.0) +
+        COALESCE(p_full_text_weight / (p_rrf_k + k.rank_k), 0.0)
+      )::float as rrf_score
     FROM ranked_vector v
     FULL OUTER JOIN ranked_keyword k ON v.chunk_id = k.chunk_id
+    ORDER BY rrf_score DESC
+    LIMIT p_match_count
   )
 
-  SELECT 
+  -- 4. Load text/page metadata only for the final rows
+  SELECT
     m.chunk_id,
-    m.content_text,
-    m.page_start,
-    m.page_end,
-    m.anchor_path,
+    c.content_text,
+    c.page_start,
+    c.page_end,
+    c.anchor_path,
     m.score_vector,
     m.rank_vector,
     m.score_keyword,
     m.rank_keyword,
-    (
-      COALESCE(1.0 / (p_rrf_k + m.rank_vector), 0.0) +
-      COALESCE(1.0 / (p_rrf_k + m.rank_keyword), 0.0)
-    )::float as rrf_score
+    m.rrf_score
   FROM merged m
-  ORDER BY rrf_score DESC
-  LIMIT p_match_count;
+  JOIN chunks c ON c.chunk_id = m.chunk_id
+  ORDER BY m.rrf_score DESC;
 END;
 $$;
@@ -0,0 +1,267 @@
+import bisect
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.shared.db import get_supabase_client
+from src.shared.pg import get_pg_pool
+
+logger = logging.getLogger(__name__)
+
+# pg_trgm defaults (similarity_threshold for the `%` operator)
+TRGM_THRESHOLD = 0.3
+_WORD_RE = re.compile(r"\w+")
+
+# Keyword channels the local index implements ('word' exists only in SQL, hybrid_search_rpc.sql)
+LOCAL_KEYWORD_MODES = ("trgm", "fts")
+# ts_rank: weight of unlabeled (D) lexemes, positions kept per lexeme, and sum(1/i^2) = pi^2/6
+TS_WEIGHT_D = 0.1
+TS_MAX_POSITIONS = 256
+TS_POSITION_NORM = 1.64493406685
+
+# Rows per chunks page while loading (PostgREST max-rows is usually 1000)
+LOAD_PAGE_SIZE = 1000
+# Rows converted float16 -> float32 at a time while scoring (bounds scratch memory)
+SCORE_BLOCK_ROWS = 8192
+
+
+def trigrams(text: str) -> set:
+    """Same trigram set as pg_trgm's show_trgm(): per word, lowercased, padded '  w '."""
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def ts_lexemes(text: str) -> Counter:
+    """Lexeme -> occurrence count, like to_tsvector('simple', text): lowercased words."""
+    return Counter(_WORD_RE.findall(text.lower()))
+
+
+def ts_lexeme_rank(occurrences: int) -> float:
+    """ts_rank's per-lexeme term for unweighted positions (tsrank.c calc_rank_or)."""
+    n = min(occurrences, TS_MAX_POSITIONS)
+    return TS_WEIGHT_D * sum(1.0 / (j * j) for j in range(1, n + 1)) / TS_POSITION_NORM
+
+
+def _rank_desc(scores: np.ndarray) -> np.ndarray:
+    """SQL RANK() OVER (ORDER BY score DESC) for scores already sorted descending."""
+    return np.searchsorted(-scores, -scores, side="left") + 1
+
+
+def _parse_vector(value) -> np.ndarray:
+    # PostgREST serializes halfvec as the text literal "[0.1,0.2,...]"
+    if isinstance(value, str):
+        return np.array(value.strip("[]").split(","), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+class LocalSearchIndex:
+    """
+    In-memory hybrid search over one subject's chunks.
+
+    Drop-in for hybrid_search_rrf_batch (phase3/hybrid_search_batch_rpc.sql): same channels
+    (cosine vector top k; keyword top k by pg_trgm `%` or by the 'fts' prefix-OR tsquery with
+    ts_rank(..., 1)), same RRF fusion and the same output rows including query_index. Embeddings live in one contiguous float16 matrix
+    (L2-normalized, so cosine = dot product); all queries of a batch are scored with one
+    matrix multiply per block.
+    """
+
+    def __init__(self, chunks: List[Dict]):
+        self.chunk_ids = [c["chunk_id"] for c in chunks]
+        self.meta = [{
+            "chunk_id": c["chunk_id"],
+            "content_text": c.get("content_text"),
+            "page_start": c.get("page_start"),
+            "page_end": c.get("page_end"),
+            "anchor_path": c.get("anchor_path"),
+        } for c in chunks]
+
+        mat = np.stack([_parse_vector(c["embedding"]) for c in chunks]) if chunks else np.zeros((0, 768), np.float32)
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        self.embeddings = np.ascontiguousarray((mat / np.where(norms == 0, 1, norms)).astype(np.float16))
+
+        # Trigram inverted index: trigram -> chunk row indices
+        postings = defaultdict(list)
+        self.trigram_counts = np.zeros(len(chunks), dtype=np.int32)
+        for row, c in enumerate(chunks):
+            grams = trigrams(c.get("content_text") or "")
+            self.trigram_counts[row] = len(grams)
+            for g in grams:
+                postings[g].append(row)
+        self.postings = {g: np.asarray(rows, dtype=np.int32) for g, rows in postings.items()}
+
+        # Full-text index: sorted lexemes (prefix ranges via bisect) -> rows and ts_rank terms
+        lexeme_rows = defaultdict(list)
+        lexeme_ranks = defaultdict(list)
+        self.ts_lengths = np.zeros(len(chunks), dtype=np.float64)
+        for row, c in enumerate(chunks):
+            lexemes = ts_lexemes(c.get("content_text") or "")
+            self.ts_lengths[row] = sum(min(n, TS_MAX_POSITIONS) for n in lexemes.values())
+            for lexeme, n in lexemes.items():
+                lexeme_rows[lexeme].append(row)
+                lexeme_ranks[lexeme].append(ts_lexeme_rank(n))
+        self.lexemes = sorted(lexeme_rows)
+        self.lexeme_rows = [np.asarray(lexeme_rows[l], dtype=np.int32) for l in self.lexemes]
+        self.lexeme_ranks = [np.asarray(lexeme_ranks[l], dtype=np.float64) for l in self.lexemes]
+        # ts_rank normalization 1: divide by log2(document length + 1)
+        self.ts_norms = np.where(self.ts_lengths > 0, np.log2(self.ts_lengths + 1), 1.0)
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    @classmethod
+    def load(cls, source_ids: Sequence[str], supabase=None) -> "LocalSearchIndex":
+        """Loads the subject's chunks (text, metadata, embedding): pooled Postgres when available, else paged REST."""
+        started = time.monotonic()
+        chunks = None
+        pool = get_pg_pool()
+        if pool is not None and supabase is None:
+            try:
+                chunks = pool.query(
+                    """SELECT chunk_id::text AS chunk_id, content_text, page_start, page_end, anchor_path,
+                              embedding::text AS embedding
+                       FROM chunks WHERE source_id = ANY(%s::uuid[])""",
+                    (list(source_ids),)
+                )
+            except Exception as e:
+                logger.warning(f"Direct chunk load failed, using REST: {e}")
+        if chunks is None:
+            chunks = cls._load_rest(source_ids, supabase or get_supabase_client())
+        index = cls([c for c in chunks if c.get("embedding") is not None])
+        logger.info(f"Local search index: {len(index)} chunks from {len(source_ids)} sources "
+                    f"loaded in {time.monotonic() - started:.1f}s ({index.embeddings.nbytes / 2**20:.1f} MiB float16)")
+        return index
+
+    @staticmethod
+    def _load_rest(source_ids: Sequence[str], supabase) -> List[Dict]:
+        chunks = []
+        offset = 0
+        while True:
+            page = supabase.table("chunks")\
+                .select("chunk_id, content_text, page_start, page_end, anchor_path, embedding")\
+                .in_("source_id", list(source_ids))\
+                .order("chunk_id")\
+                .range(offset, offset + LOAD_PAGE_SIZE - 1)\
+                .execute().data
+            chunks.extend(page)
+            if len(page) < LOAD_PAGE_SIZE:
+                break
+            offset += LOAD_PAGE_SIZE
+        return chunks
+
+    def _vector_topk(self, query_embeddings: List[List[float]], limit: int):
+        """Per query: (row indices, cosine scores) of the top `limit` chunks, best first."""
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        norms = np.linalg.norm(q, axis=1, keepdims=True)
+        q = q / np.where(norms == 0, 1, norms)
+        scores = np.empty((len(q), len(self)), dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK_ROWS):
+            block = self.embeddings[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = q @ block.T
+
+        if limit < len(self):
+            top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        else:
+            top = np.tile(np.arange(len(self)), (len(q), 1))
+        out = []
+        for i in range(len(q)):
+            rows = top[i][np.argsort(-scores[i, top[i]], kind="stable")]
+            out.append((rows, scores[i, rows]))
+        return out
+
+    def _keyword_topk(self, query_text: str, limit: int):
+        """pg_trgm similarity(content_text, query) over chunks passing the `%` threshold."""
+        grams = trigrams(query_text)
+        if not grams or not len(self):
+            return np.zeros(0, np.int32), np.zeros(0, np.float32)
+        hits = [self.postings[g] for g in grams if g in self.postings]
+        if not hits:
+            return np.zeros(0, np.int32), np.zeros(0, np.float32)
+        shared = np.bincount(np.concatenate(hits), minlength=len(self))
+        rows = np.flatnonzero(shared)
+        sim = shared[rows] / (self.trigram_counts[rows] + len(grams) - shared[rows])
+        keep = sim >= TRGM_THRESHOLD
+        rows, sim = rows[keep], sim[keep].astype(np.float32)
+        order = np.argsort(-sim, kind="stable")[:limit]
+        return rows[order], sim[order]
+
+    def _fts_topk(self, query_text: str, limit: int):
+        """
+        keyword_tsquery (each query word as a prefix term, OR-ed) matched against the chunks'
+        lexemes and ranked like ts_rank(content_tsv, query, 1).
+        """
+        terms = set(_WORD_RE.findall(query_text.lower()))
+        if not terms or not len(self):
+            return np.zeros(0, np.int32), np.zeros(0, np.float32)
+        scores = np.zeros(len(self), dtype=np.float64)
+        for term in terms:
+            start = bisect.bisect_left(self.lexemes, term)
+            end = bisect.bisect_left(self.lexemes, term + "\U0010ffff", lo=start)
+            for i in range(start, end):
+                scores[self.lexeme_rows[i]] += self.lexeme_ranks[i] # rows are distinct per lexeme
+        rows = np.flatnonzero(scores)
+        if not len(rows):
+            return np.zeros(0, np.int32), np.zeros(0, np.float32)
+        rank = (scores[rows] / len(terms) / self.ts_norms[rows]).astype(np.float32)
+        order = np.argsort(-rank, kind="stable")[:limit]
+        return rows[order], rank[order]
+
+    def search_batch(self, query_texts: List[str], query_embeddings: List[List[float]],
+                     match_count: int, rrf_k: int = 60, keyword_mode: str = "trgm") -> List[Dict]:
+        """Rows shaped like hybrid_search_rrf_batch (0-based query_index)."""
+        if keyword_mode not in LOCAL_KEYWORD_MODES:
+            raise ValueError(f"Keyword mode '{keyword_mode}' is not supported by the local index")
+        keyword_topk = self._fts_topk if keyword_mode == "fts" else self._keyword_topk
+        if not len(self) or not query_texts:
+            return []
+        results = []
+        vector_hits = self._vector_topk(query_embeddings, match_count)
+        for qi, text in enumerate(query_texts):
+            merged = {}
+            v_rows, v_scores = vector_hits[qi]
+            for row, score, rank in zip(v_rows, v_scores, _rank_desc(v_scores)):
+                merged[row] = {"score_vector": float(score), "rank_vector": int(rank),
+                               "score_keyword": None, "rank_keyword": None}
+            k_rows, k_scores = keyword_topk(text, match_count)
+            for row, score, rank in zip(k_rows, k_scores, _rank_desc(k_scores)):
+                entry = merged.setdefault(row, {"score_vector": None, "rank_vector": None})
+                entry["score_keyword"], entry["rank_keyword"] = float(score), int(rank)
+
+            for entry in merged.values():
+                entry["rrf_score"] = (
+                    (1.0 / (rrf_k + entry["rank_vector"]) if entry["rank_vector"] else 0.0) +
+                    (1.0 / (rrf_k + entry["rank_keyword"]) if entry["rank_keyword"] else 0.0)
+                )
+            top = sorted(merged.items(), key=lambda kv: -kv[1]["rrf_score"])[:match_count]
+            for row, entry in top:
+                results.append({**self.meta[row], **entry, "query_index": qi})
+        return results
+
+
+_indexes: "OrderedDict[tuple, LocalSearchIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+MAX_CACHED_INDEXES = 2
+
+
+def get_local_index(source_ids: Sequence[str]) -> LocalSearchIndex:
+    """Process-wide index per subject scope, so Phase 4's per-session retrievals load it once."""
+    key = tuple(sorted(source_ids))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = LocalSearchIndex.load(key)
+            _indexes[key] = index
+            while len(_indexes) > MAX_CACHED_INDEXES:
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(key)
+        return index
+
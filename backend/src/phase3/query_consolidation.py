@@ -0,0 +1,61 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryCluster:
+    """Near-duplicate queries searched once, via the leader's text and embedding."""
+    leader: str
+    embedding: List[float]
+    members: List[str] = field(default_factory=list)
+    signal_ids: List[str] = field(default_factory=list)
+
+
+def cluster_queries(
+    query_map: Dict[str, List[str]],
+    embeddings: List[List[float]],
+    threshold: float
+) -> List[QueryCluster]:
+    """
+    Greedy leader clustering over cosine similarity.
+
+    query_map: normalized query -> signal_ids (insertion order matches embeddings).
+    Queries requested by more signals become leaders first; every unassigned query
+    with similarity >= threshold to the leader joins its cluster. threshold >= 1.0
+    only merges identical vectors, i.e. disables collapsing.
+    """
+    queries = list(query_map.keys())
+    if not queries:
+        return []
+
+    mat = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    mat = mat / np.where(norms == 0, 1, norms)
+    sims = mat @ mat.T
+
+    order = sorted(range(len(queries)), key=lambda i: -len(query_map[queries[i]]))
+    unassigned = np.ones(len(queries), dtype=bool)
+    clusters = []
+
+    for leader in order:
+        if not unassigned[leader]:
+            continue
+        mask = unassigned & (sims[leader] >= threshold)
+        mask[leader] = True
+        members = np.flatnonzero(mask)
+        unassigned[members] = False
+        # dict.fromkeys: union of signal ids, first-seen order
+        signal_ids = list(dict.fromkeys(sid for m in members for sid in query_map[queries[m]]))
+        clusters.append(QueryCluster(
+            leader=queries[leader],
+            embedding=embeddings[leader],
+            members=[queries[m] for m in members],
+            signal_ids=signal_ids
+        ))
+
+    return clusters
@@ -0,0 +1,75 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from src.shared.config import Config
+from src.shared.db import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Fields of a hybrid_search_rrf row that Phase 3 stores (content comes from chunks when needed)
+CACHED_FIELDS = ("chunk_id", "rank_vector", "rank_keyword", "score_vector", "score_keyword", "rrf_score")
+
+
+class RetrievalCache:
+    """
+    Cross-session cache of query -> ranked chunks for one subject (phase3/retrieval_cache.sql).
+
+    Keyed by (normalized query, search parameters hash) and stamped with the subject's source
+    version. The version is read before searching and stored with the results, so a source
+    ingested or deleted mid-search leaves entries that are never served.
+    """
+
+    def __init__(self, subject_id: str, params_hash: str, max_rows: int = None):
+        self.subject_id = subject_id
+        self.params_hash = params_hash
+        self.max_rows = max_rows or Config.RETRIEVAL_CACHE_MAX_ROWS
+        self.supabase = get_supabase_client()
+        self._available = True
+
+    def key(self, query_norm: str) -> str:
+        return hashlib.sha256(f"{self.params_hash}\n{query_norm}".encode()).hexdigest()[:32]
+
+    def lookup(self, queries: List[str]) -> Tuple[Dict[str, List[Dict]], Optional[int]]:
+        """
+        Returns (query -> cached rows for the hits, source version) for normalized queries.
+        The version is None when the cache is unavailable; store() is then a no-op.
+        """
+        if not self._available or not queries:
+            return {}, None
+        try:
+            version = self.supabase.rpc("subject_source_version", {"p_subject_id": self.subject_id}).execute().data
+            keys = {self.key(q): q for q in queries}
+            res = self.supabase.rpc("fetch_retrieval_cache", {
+                "p_subject_id": self.subject_id,
+                "p_version": version,
+                "p_keys": list(keys)
+            }).execute()
+            return {keys[row["cache_key"]]: row["results"] for row in (res.data or [])}, version
+        except Exception as e:
+            logger.warning(f"Retrieval cache unavailable, searching every query: {e}")
+            self._available = False
+            return {}, None
+
+    def store(self, results_by_query: Dict[str, List[Dict]], version: Optional[int]):
+        if not self._available or version is None or not results_by_query:
+            return
+        try:
+            # A search that came back without data (None) is not an empty result; don't cache it
+            rows = [{
+                "subject_id": self.subject_id,
+                "cache_key": self.key(q),
+                "query_norm": q,
+                "source_version": version,
+                "results": [{f: r.get(f) for f in CACHED_FIELDS} for r in results]
+            } for q, results in results_by_query.items() if results is not None]
+            for i in range(0, len(rows), 500):
+                self.supabase.table("retrieval_cache")\
+                    .upsert(rows[i : i+500], on_conflict="subject_id,cache_key")\
+                    .execute()
+            self.supabase.rpc("prune_retrieval_cache", {
+                "p_subject_id": self.subject_id,
+                "p_max_rows": self.max_rows
+            }).execute()
+        except Exception as e:
+            logger.warning(f"Failed to cache {len(results_by_query)} retrieval results: {e}")
@@ -0,0 +1,130 @@
+-- Cross-session retrieval cache per subject (phase3/retrieval_cache.py)
+-- Sessions of the same course ask the same questions week after week; a query's ranked
+-- chunks only change when the subject's textbooks change.
+--
+--   subject_source_versions : subject_id -> version, bumped by trigger whenever a source of the
+--                             subject is added, deleted, (de)activated or (re-)ingested
+--   retrieval_cache         : (subject_id, cache_key) -> ranked rows, stamped with the version
+--                             they were computed at
+--
+-- cache_key = hash(normalized query + search parameters). Entries whose source_version is not
+-- the subject's current version are never returned and are dropped by prune_retrieval_cache.
+
+CREATE TABLE IF NOT EXISTS subject_source_versions (
+  subject_id uuid PRIMARY KEY REFERENCES subjects(subject_id) ON DELETE CASCADE,
+  version bigint NOT NULL DEFAULT 0,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION bump_subject_source_version(p_subject_id UUID)
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+  INSERT INTO subject_source_versions AS v (subject_id, version)
+  VALUES (p_subject_id, 1)
+  ON CONFLICT (subject_id) DO UPDATE
+    SET version = v.version + 1, updated_at = now()
+  RETURNING v.version;
+$$;
+
+-- Phase 1 flips ingest_status queued -> running -> succeeded/failed, so a source being
+-- (re-)ingested bumps the version both when its chunks start changing and when they're done.
+CREATE OR REPLACE FUNCTION sources_bump_subject_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    -- subject already gone (cascade delete): nothing to invalidate
+    IF EXISTS (SELECT 1 FROM subjects WHERE subject_id = OLD.subject_id) THEN
+      PERFORM bump_subject_source_version(OLD.subject_id);
+    END IF;
+  END IF;
+  IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.subject_id IS DISTINCT FROM OLD.subject_id) THEN
+    PERFORM bump_subject_source_version(NEW.subject_id);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS sources_bump_subject_version ON sources;
+CREATE TRIGGER sources_bump_subject_version
+AFTER INSERT OR DELETE OR UPDATE OF ingest_status, active, subject_id ON sources
+FOR EACH ROW EXECUTE FUNCTION sources_bump_subject_version();
+
+CREATE TABLE IF NOT EXISTS retrieval_cache (
+  subject_id uuid NOT NULL REFERENCES subjects(subject_id) ON DELETE CASCADE,
+  cache_key text NOT NULL,
+  query_norm text NOT NULL,
+  source_version bigint NOT NULL,
+  results jsonb NOT NULL, -- [{chunk_id, rank_vector, rank_keyword, score_vector, score_keyword, rrf_score}, ...]
+
+  created_at timestamptz NOT NULL DEFAULT now(),
+  last_used_at timestamptz NOT NULL DEFAULT now(),
+
+  PRIMARY KEY (subject_id, cache_key)
+);
+
+CREATE INDEX IF NOT EXISTS retrieval_cache_lru_idx ON retrieval_cache(last_used_at);
+
+-- Current source version of a subject (0 before any source was added)
+CREATE OR REPLACE FUNCTION subject_source_version(p_subject_id UUID)
+RETURNS BIGINT
+LANGUAGE sql STABLE
+AS $$
+  SELECT COALESCE((SELECT version FROM subject_source_versions WHERE subject_id = p_subject_id), 0);
+$$;
+
+-- Lookup + LRU touch in one round trip; only entries computed at p_version are returned
+CREATE OR REPLACE FUNCTION fetch_retrieval_cache(p_subject_id UUID, p_version BIGINT, p_keys TEXT[])
+RETURNS TABLE (cache_key TEXT, results JSONB)
+LANGUAGE sql
+AS $$
+  UPDATE retrieval_cache c
+  SET last_used_at = now()
+  WHERE c.subject_id = p_subject_id
+    AND c.cache_key = ANY(p_keys)
+    AND c.source_version = p_version
+  RETURNING c.cache_key, c.results;
+$$;
+
+-- Drops p_subject_id's entries from older source versions, then keeps the p_max_rows most
+-- recently used entries overall. Returns the number of deleted rows.
+-- Runs after every store, so it only touches the storing subject's rows (primary key prefix);
+-- other subjects' stale entries go when they next store, or age out through the LRU trim.
+-- The trim reads the row count from the live-tuple statistic (no scan) and, when over the
+-- cap, deletes only the excess from the oldest end of the LRU index.
+DROP FUNCTION IF EXISTS prune_retrieval_cache(INT);
+
+CREATE OR REPLACE FUNCTION prune_retrieval_cache(p_subject_id UUID, p_max_rows INT)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_version BIGINT := subject_source_version(p_subject_id);
+  v_stale INT;
+  v_excess BIGINT;
+  v_evicted INT := 0;
+BEGIN
+  DELETE FROM retrieval_cache c
+  WHERE c.subject_id = p_subject_id
+    AND c.source_version < v_version;
+  GET DIAGNOSTICS v_stale = ROW_COUNT;
+
+  v_excess := pg_stat_get_live_tuples('retrieval_cache'::regclass) - v_stale - p_max_rows;
+  IF v_excess > 0 THEN
+    WITH doomed AS (
+      SELECT c.subject_id, c.cache_key
+      FROM retrieval_cache c
+      ORDER BY c.last_used_at
+      LIMIT v_excess
+    )
+    DELETE FROM retrieval_cache c
+    USING doomed d
+    WHERE c.subject_id = d.subject_id AND c.cache_key = d.cache_key;
+    GET DIAGNOSTICS v_evicted = ROW_COUNT;
+  END IF;
+
+  RETURN v_stale + v_evicted;
+END;
+$$;
@@ -2,15 +2,21 @@
 import json
 import concurrent.futures
 import sys
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from collections import defaultdict
 import hashlib
 
 from tenacity import retry, stop_after_attempt, wait_exponential
-from vertexai.language_models import TextEmbeddingModel
 
 from src.shared.config import Config
 from src.shared.db import get_supabase_client
+from src.shared.pg import get_pg_pool
+from src.shared.job_log import JobLogWriter
+from src.shared.clients import get_embedding_model
+from src.phase3.embedding_cache import get_embedding_cache, normalize_query
+from src.phase3.query_consolidation import cluster_queries
+from src.phase3.local_search import LOCAL_KEYWORD_MODES, get_local_index
+from src.phase3.retrieval_cache import RetrievalCache
 
 logger = logging.getLogger(__name__)
 
@@ -21,84 +27,40 @@ FINAL_K = 50
 RRF_C = 60
 
 class RetrievalPipeline:
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, job_log: Optional[JobLogWriter] = None):
         self.session_id = session_id
+        # Progress goes to sessions.logs: through the caller's writer (Phase 2 handoff, Phase 4
+        # lazy retrieval), or an own Phase 3 writer that appends to the session's log
+        self._owns_job_log = job_log is None
+        self.job_log = job_log or JobLogWriter([session_id], phase="3")
         self.supabase = get_supabase_client()
-        self.embedding_model = TextEmbeddingModel.from_pretrained(Config.EMBEDDING_MODEL_NAME)
+        self.embedding_model = get_embedding_model(Config.EMBEDDING_MODEL_NAME)
+        self.embedding_cache = get_embedding_cache(Config.EMBEDDING_MODEL_NAME)
+        self._batch_rpc_available = True
+        self.subject_id = None
+        self.source_ids = None # subject scope, loaded on first search
+        self.source_version = None # subject's source version at scope load (phase3/retrieval_cache.sql)
+        self.result_cache = None # cross-session query -> results cache for the subject
+        self.local_index = None # in-memory index when RETRIEVAL_BACKEND=local
+
+    def _log(self, message: str):
+        logger.info(message)
+        self.job_log.log(message)
+
+    def close(self):
+        """Flushes the job log if this pipeline created it (a caller's writer is left to the caller)."""
+        if self._owns_job_log:
+            self.job_log.close()
 
     def run(self):
+        if self._owns_job_log:
+            self.job_log.start()
         try:
             # 1. Update Session Status
             self.supabase.table("sessions").update({"status": "gathering"}).eq("session_id", self.session_id).execute()
             
-            # 2. Fetch Signals with Queries
-            signals = self._fetch_signals()
-            logger.info(f"Loaded {len(signals)} signals for session {self.session_id}")
-            
-            if not signals:
-                logger.warning("No signals found for this session.")
-                self._mark_complete()
-                return
-
-            # 3. Optimize Queries (Deduplication)
-            # Map: query_text -> list of signal_ids that requested it
-            query_map = defaultdict(list)
-            for s in signals:
-                queries = s.get("search_queries", []) or []
-                for q in queries:
-                    # Normalize: trim, lowercase
-                    norm_q = q.strip()
-                    if len(norm_q) < 2: continue # skip garbage
-                    query_map[norm_q].append(s["signal_id"])
-            
-            unique_queries = list(query_map.keys())
-            logger.info(f"Processing {len(unique_queries)} unique queries from {len(signals)} signals.")
-
-            # 4. Generate Embeddings (Batch)
-            query_embeddings = self._generate_embeddings(unique_queries)
-            
-            # 5. Execute Hybrid Search (Parallel)
-            # We have (query_text, embedding) pairs.
-            # Run DB RPC for each query.
-            all_candidates = []
-            
-            # DB connection is HTTP (Supabase), so it handles concurrency well. 
-            # But high concurrency with large payloads causes Protocol Errors (HTTP/2 flow control).
-            max_workers = 1
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_query = {
-                    executor.submit(self._search_rpc, q_text, q_vec): q_text
-                    for q_text, q_vec in zip(unique_queries, query_embeddings)
-                }
-                
-                for future in concurrent.futures.as_completed(future_to_query):
-                    q_text = future_to_query[future]
-                    try:
-                        results = future.result()
-                        # Map results back to all signal_ids that asked for this query
-                        signal_ids = query_map[q_text]
-                        
-                        for sid in signal_ids:
-                            for res in results:
-                                all_candidates.append({
-                                    "session_id": self.session_id,
-                                    "signal_id": sid,
-                                    "chunk_id": res["chunk_id"],
-                                    "query_used": q_text,
-                                    "retrieval_channel": "rrf", # simplified for now
-                                    "rank_vector": res["rank_vector"],
-                                    "rank_keyword": res["rank_keyword"],
-                                    "score_vector": res["score_vector"],
-                                    "score_keyword": res["score_keyword"],
-                                    "rrf_score": res["rrf_score"]
-                                })
-                                
-                    except Exception as e:
-                        logger.error(f"Search failed for query '{q_text}': {e}")
-            
-            # 6. Bulk Insert Candidates
-            logger.info(f"Inserting {len(all_candidates)} evidence candidates...")
-            self._save_candidates(all_candidates)
+            # 2-6. Search the signals that are new or changed since their last search
+            self.retrieve_pending()
             
             # 7. Update Session Status
             self._mark_complete()
@@ -107,6 +69,191 @@ class RetrievalPipeline:
             logger.error(f"Phase 3 Failed: {e}", exc_info=True)
             self.supabase.table("sessions").update({"status": "failed"}).eq("session_id", self.session_id).execute()
             raise
+        finally:
+            self.close()
+
+    def retrieve_pending(self) -> int:
+        """
+        Searches the session's signals that have no retrieval state for the current search
+        config and subject scope (new, edited, or left pending by a failed search), without
+        touching the session status. Returns the number of signals searched.
+        Used by run() and by Phase 4 before reasoning.
+        """
+        # Fetch Signals with Queries
+        signals = self._fetch_signals()
+        logger.info(f"Loaded {len(signals)} signals for session {self.session_id}")
+
+        if not signals:
+            self._log("No signals found for this session.")
+            logger.warning("No signals found for this session.")
+            return 0
+
+        # Only signals that are new or changed since their last search (idempotent reruns)
+        signals = self._pending_signals(signals)
+        if not signals:
+            logger.info("All signals already retrieved with the current search config. Nothing to do.")
+            return 0
+
+        # 3-6. Dedup queries, embed, search and save results
+        self.retrieve_for_signals(signals)
+        return len(signals)
+
+    def retrieve_for_signals(self, signals: List[Dict]) -> int:
+        """
+        Searches evidence for the given signals (each needs signal_id and
+        search_queries) and saves the results. Returns the number of result rows saved.
+        Used by run() for a whole session and by Phase 2 for per-chunk handoff.
+        Each signal's links are replaced, not appended, and its search state is recorded
+        so later runs skip it.
+        """
+        # 3. Optimize Queries (Deduplication)
+        # Map: normalized query -> list of signal_ids that requested it
+        query_map = defaultdict(list)
+        for s in signals:
+            queries = s.get("search_queries", []) or []
+            for q in queries:
+                # Normalize: NFKC, casefold, collapse whitespace
+                norm_q = normalize_query(q)
+                if len(norm_q) < 2: continue # skip garbage
+                query_map[norm_q].append(s["signal_id"])
+        
+        unique_queries = list(query_map.keys())
+        self._log(f"Processing {len(unique_queries)} unique queries from {len(signals)} signals.")
+
+        # Only the session's subject textbooks are searched
+        self._load_scope()
+        if not self.source_ids:
+            self._log("No active textbook sources for this subject. Skipping search.")
+            logger.warning(f"No active sources for session {self.session_id}'s subject. Skipping search.")
+            return 0
+
+        # 4. Generate Embeddings (Batch)
+        query_embeddings = self._generate_embeddings(unique_queries)
+
+        # 4b. Collapse near-duplicate queries ("KCL 노드 해석" / "노드 해석 KCL") into one search each
+        clusters = cluster_queries(query_map, query_embeddings, Config.QUERY_CLUSTER_THRESHOLD)
+        if unique_queries:
+            self._log(
+                f"Query consolidation: {len(unique_queries)} -> {len(clusters)} searches "
+                f"(reduction {1 - len(clusters) / len(unique_queries):.0%}, threshold {Config.QUERY_CLUSTER_THRESHOLD})"
+            )
+        
+        # 4c. Queries already searched by earlier sessions of the subject (same sources, same params)
+        results_by_query, cache_version = self._lookup_cache([c.leader for c in clusters])
+        misses = [c for c in clusters if c.leader not in results_by_query]
+
+        # 5. Execute Hybrid Search (Batched)
+        # One hybrid_search_rrf_batch RPC per SEARCH_BATCH_SIZE queries instead of one per query.
+        # Over REST calls stay sequential: concurrent large payloads cause Protocol Errors (HTTP/2 flow control).
+        # With DATABASE_URL set, batches run concurrently on pooled direct connections.
+        searched = self._search_batched(
+            [c.leader for c in misses],
+            [c.embedding for c in misses]
+        )
+        results_by_query.update(searched)
+        if self.result_cache is not None:
+            self.result_cache.store(searched, cache_version)
+
+        # Results are stored once per query; signals link to the query instead of
+        # copying its FINAL_K rows (see retrieval_results.sql)
+        result_rows = []
+        link_rows = []
+        failed_signal_ids = set()
+        searched_queries = []
+        for cluster in clusters:
+            results = results_by_query.get(cluster.leader)
+            if results is None:
+                # search failed (already logged): leave these signals pending for the next run
+                failed_signal_ids.update(cluster.signal_ids)
+                continue
+            searched_queries.append(cluster.leader)
+            for res in results:
+                result_rows.append({
+                    "session_id": self.session_id,
+                    "query_text": cluster.leader,
+                    "chunk_id": res["chunk_id"],
+                    "retrieval_channel": "rrf", # simplified for now
+                    "rank_vector": res["rank_vector"],
+                    "rank_keyword": res["rank_keyword"],
+                    "score_vector": res["score_vector"],
+                    "score_keyword": res["score_keyword"],
+                    "rrf_score": res["rrf_score"]
+                })
+            for sid in cluster.signal_ids:
+                link_rows.append({
+                    "session_id": self.session_id,
+                    "signal_id": sid,
+                    "query_text": cluster.leader
+                })
+        
+        # 6. Bulk Insert Results + Signal Links
+        fanout = sum(len(results_by_query.get(c.leader) or []) * len(c.signal_ids) for c in clusters)
+        self._log(
+            f"Inserting {len(result_rows)} retrieval results and {len(link_rows)} signal links "
+            f"(legacy fan-out would be {fanout} evidence candidates)..."
+        )
+        done = [s for s in signals if s["signal_id"] not in failed_signal_ids]
+        self._save_results(result_rows, link_rows, [s["signal_id"] for s in done], searched_queries)
+        self._save_retrieval_state(done)
+        return len(result_rows)
+
+    def _lookup_cache(self, queries: List[str]) -> Tuple[Dict[str, List[Dict]], Any]:
+        if not Config.RETRIEVAL_CACHE_ENABLED or not queries:
+            return {}, None
+        if self.result_cache is None:
+            self.result_cache = RetrievalCache(self.subject_id, _search_params_hash())
+        cached, version = self.result_cache.lookup(queries)
+        self._log(f"Retrieval cache: {len(cached)}/{len(queries)} hits (subject {self.subject_id}, source version {version})")
+        return cached, version
+
+    def _pending_signals(self, signals: List[Dict]) -> List[Dict]:
+        state = self.supabase.table("signal_retrieval_state")\
+            .select("signal_id, config_hash, queries_hash")\
+            .eq("session_id", self.session_id)\
+            .execute().data
+        self._load_scope()
+        config_hash = self._state_config_hash()
+        searched = {r["signal_id"]: (r["config_hash"], r["queries_hash"]) for r in state}
+        pending = [s for s in signals if searched.get(s["signal_id"]) != (config_hash, _queries_hash(s))]
+        self._log(f"Incremental retrieval: {len(pending)}/{len(signals)} signals new or changed.")
+        return pending
+
+    def _save_retrieval_state(self, signals: List[Dict]):
+        # Written after results/links, so a crash in between only means a re-search next run
+        if not signals: return
+        config_hash = self._state_config_hash()
+        rows = [{
+            "signal_id": s["signal_id"],
+            "session_id": self.session_id,
+            "config_hash": config_hash,
+            "queries_hash": _queries_hash(s)
+        } for s in signals]
+        batch_size = 500
+        for i in range(0, len(rows), batch_size):
+            self.supabase.table("signal_retrieval_state")\
+                .upsert(rows[i : i+batch_size], on_conflict="signal_id")\
+                .execute()
+
+    def _load_scope(self):
+        if self.source_ids is not None:
+            return
+        self.source_ids = self._fetch_source_ids()
+        try:
+            self.source_version = self.supabase.rpc("subject_source_version", {"p_subject_id": self.subject_id}).execute().data
+        except Exception as e:
+            logger.warning(f"Could not read the source version of subject {self.subject_id}: {e}")
+
+    def _state_config_hash(self) -> str:
+        """
+        Search config plus the subject's source set: a textbook ingested, re-ingested,
+        deactivated or deleted since a signal's last search makes it pending again.
+        """
+        scope = {
+            "search": _search_config_hash(),
+            "source_ids": sorted(self.source_ids or []),
+            "source_version": self.source_version,
+        }
+        return hashlib.sha256(json.dumps(scope, sort_keys=True).encode()).hexdigest()[:16]
 
     def _fetch_signals(self) -> List[Dict]:
         # Fetch all signals for the session that have search_queries (not empty)
@@ -117,7 +264,31 @@ class RetrievalPipeline:
             .execute()
         return response.data
 
+    def _fetch_source_ids(self) -> List[str]:
+        session = self.supabase.table("sessions")\
+            .select("subject_id")\
+            .eq("session_id", self.session_id)\
+            .single()\
+            .execute()
+        self.subject_id = session.data["subject_id"]
+        sources = self.supabase.table("sources")\
+            .select("source_id")\
+            .eq("subject_id", self.subject_id)\
+            .eq("active", True)\
+            .execute()
+        return [s["source_id"] for s in sources.data]
+
     def _generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        # Course vocabulary repeats across sessions: only cache misses reach the model
+        embeddings, stats = self.embedding_cache.get_many(texts, self._embed_texts)
+        self._log(
+            f"Embedding cache: {stats['memory_hits'] + stats['persistent_hits']}/{stats['lookups']} hits "
+            f"(memory {stats['memory_hits']}, persistent {stats['persistent_hits']}, "
+            f"ratio {stats['hit_ratio']:.0%}), {stats['misses']} embedded, ~{stats['saved_ms']} ms saved"
+        )
+        return embeddings
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
         # Vertex AI Embedding API supports batching
         # Batch size 8 is safe default
         batch_size = Config.EMBED_BATCH_SIZE
@@ -137,6 +308,104 @@ class RetrievalPipeline:
         
         return all_embeddings
 
+    def _search_batched(self, queries: List[str], embeddings: List[List[float]]) -> Dict[str, List[Dict]]:
+        """Returns query_text -> RRF rows. Failed queries are logged and left out."""
+        if Config.RETRIEVAL_BACKEND == "local":
+            try:
+                return self._search_local(queries, embeddings)
+            except Exception as e:
+                logger.warning(f"Local search failed, falling back to RPC: {e}")
+
+        batch_size = Config.SEARCH_BATCH_SIZE
+        batches = [
+            (i, queries[i : i+batch_size], embeddings[i : i+batch_size])
+            for i in range(0, len(queries), batch_size)
+        ]
+        results_by_query = {}
+
+        pool = get_pg_pool()
+        if pool is not None and len(batches) > 1:
+            # Direct connections are per thread, so batches can run concurrently
+            workers = min(Config.SEARCH_CONCURRENCY, pool.maxconn, len(batches))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search") as executor:
+                for part in executor.map(lambda b: self._search_one_batch(*b, pool=pool), batches):
+                    results_by_query.update(part)
+        else:
+            for batch in batches:
+                results_by_query.update(self._search_one_batch(*batch, pool=pool))
+        
+        return results_by_query
+
+    def _search_one_batch(self, offset: int, batch_queries: List[str], batch_embeddings: List[List[float]], pool=None) -> Dict[str, List[Dict]]:
+        results_by_query = {}
+        rows = None
+        if pool is not None:
+            try:
+                rows = self._search_direct_batch(pool, batch_queries, batch_embeddings)
+            except Exception as e:
+                logger.warning(f"Direct search failed for queries {offset}-{offset+len(batch_queries)}, using REST: {e}")
+        try:
+            if rows is None:
+                if not self._batch_rpc_available:
+                    raise RuntimeError("hybrid_search_rrf_batch unavailable")
+                rows = self._search_rpc_batch(batch_queries, batch_embeddings)
+            grouped = defaultdict(list)
+            for row in rows:
+                grouped[row.pop("query_index")].append(row)
+            for j, q_text in enumerate(batch_queries):
+                results_by_query[q_text] = grouped.get(j, [])
+        except Exception as e:
+            # e.g. batch RPC not deployed yet: fall back to one call per query
+            if self._batch_rpc_available:
+                self._batch_rpc_available = False
+                logger.warning(f"Batched search failed for queries {offset}-{offset+len(batch_queries)}, falling back to per-query RPC: {e}")
+            for q_text, q_vec in zip(batch_queries, batch_embeddings):
+                try:
+                    results_by_query[q_text] = self._search_rpc(q_text, q_vec)
+                except Exception as e:
+                    logger.error(f"Search failed for query '{q_text}': {e}")
+        return results_by_query
+
+    def _search_direct_batch(self, pool, query_texts: List[str], query_embeddings: List[List[float]]) -> List[Dict]:
+        # Same RPC as _search_rpc_batch over a pooled connection; ids as text to match PostgREST output
+        return pool.query(
+            """
+            SELECT query_index, chunk_id::text AS chunk_id, content_text, page_start, page_end, anchor_path,
+                   score_vector, rank_vector, score_keyword, rank_keyword, rrf_score
+            FROM hybrid_search_rrf_batch(%s, %s::jsonb, %s, %s,
+                                         p_source_ids => %s::uuid[], p_keyword_mode => %s, p_vector_tier => %s)
+            """,
+            (query_texts, json.dumps(query_embeddings), FINAL_K, RRF_C, self.source_ids,
+             Config.KEYWORD_CHANNEL, Config.VECTOR_TIER)
+        )
+
+    def _search_local(self, queries: List[str], embeddings: List[List[float]]) -> Dict[str, List[Dict]]:
+        # Same rows as hybrid_search_rrf_batch, computed against the subject's chunks in memory.
+        # Checked before loading: an unsupported channel must not cost the subject's full load
+        if Config.KEYWORD_CHANNEL not in LOCAL_KEYWORD_MODES:
+            raise ValueError(f"Keyword channel '{Config.KEYWORD_CHANNEL}' is not supported by the local index")
+        if self.local_index is None:
+            self.local_index = get_local_index(self.source_ids)
+        rows = self.local_index.search_batch(queries, embeddings, FINAL_K, RRF_C, Config.KEYWORD_CHANNEL)
+        results_by_query = {q: [] for q in queries}
+        for row in rows:
+            results_by_query[queries[row.pop("query_index")]].append(row)
+        return results_by_query
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    def _search_rpc_batch(self, query_texts: List[str], query_embeddings: List[List[float]]) -> List[Dict]:
+        params = {
+            "p_query_texts": query_texts,
+            "p_query_embeddings": query_embeddings,
+            "p_match_count": FINAL_K,
+            "p_rrf_k": RRF_C,
+            "p_source_ids": self.source_ids,
+            "p_keyword_mode": Config.KEYWORD_CHANNEL,
+            "p_vector_tier": Config.VECTOR_TIER
+        }
+        response = self.supabase.rpc("hybrid_search_rrf_batch", params).execute()
+        return response.data or []
+
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def _search_rpc(self, query_text: str, query_embedding: List[float]) -> List[Dict]:
         # Call the Supabase RPC function 'hybrid_search_rrf'
@@ -144,23 +413,140 @@ class RetrievalPipeline:
             "p_query_text": query_text,
             "p_query_embedding": query_embedding,
             "p_match_count": FINAL_K, # We ask for Top K final
-            "p_rrf_k": RRF_C
+            "p_rrf_k": RRF_C,
+            "p_source_ids": self.source_ids,
+            "p_keyword_mode": Config.KEYWORD_CHANNEL,
+            "p_vector_tier": Config.VECTOR_TIER
         }
         
         # rpc call
         response = self.supabase.rpc("hybrid_search_rrf", params).execute()
         return response.data
 
-    def _save_candidates(self, candidates: List[Dict]):
-        # Batch insert
+    def _save_results(self, result_rows: List[Dict], link_rows: List[Dict], signal_ids: List[str], queries: List[str]):
+        """
+        Replace-per-signal: the signals' old links and the re-searched queries' old results
+        are deleted before the new rows go in; results nothing links to anymore are pruned.
+        Over the pg pool the whole replace is one transaction, so a failure leaves the old rows.
+        """
+        pool = get_pg_pool()
+        if pool is not None:
+            try:
+                with pool.connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute("DELETE FROM signal_queries WHERE session_id = %s AND signal_id = ANY(%s::uuid[])",
+                                    (self.session_id, signal_ids))
+                        cur.execute("DELETE FROM retrieval_results WHERE session_id = %s AND query_text = ANY(%s)",
+                                    (self.session_id, queries))
+                    pool.insert_rows("retrieval_results", result_rows, on_conflict="session_id,query_text,chunk_id",
+                                     update=True, conn=conn)
+                    pool.insert_rows("signal_queries", link_rows, on_conflict="session_id,signal_id,query_text", conn=conn)
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT prune_orphan_retrieval_results(%s)", (self.session_id,))
+                return
+            except Exception as e:
+                logger.warning(f"Direct insert failed, using REST: {e}")
+
         batch_size = 500
-        for i in range(0, len(candidates), batch_size):
-            batch = candidates[i : i+batch_size]
-            self.supabase.table("evidence_candidates").insert(batch).execute()
+        for i in range(0, len(signal_ids), batch_size):
+            self.supabase.table("signal_queries")\
+                .delete()\
+                .eq("session_id", self.session_id)\
+                .in_("signal_id", signal_ids[i : i+batch_size])\
+                .execute()
+        for i in range(0, len(queries), batch_size):
+            self.supabase.table("retrieval_results")\
+                .delete()\
+                .eq("session_id", self.session_id)\
+                .in_("query_text", queries[i : i+batch_size])\
+                .execute()
+        for i in range(0, len(result_rows), batch_size):
+            batch = result_rows[i : i+batch_size]
+            self.supabase.table("retrieval_results")\
+                .upsert(batch, on_conflict="session_id,query_text,chunk_id")\
+                .execute()
+        for i in range(0, len(link_rows), batch_size):
+            batch = link_rows[i : i+batch_size]
+            self.supabase.table("signal_queries")\
+                .upsert(batch, on_conflict="session_id,signal_id,query_text", ignore_duplicates=True)\
+                .execute()
+        self.supabase.rpc("prune_orphan_retrieval_results", {"p_session_id": self.session_id}).execute()
 
     def _mark_complete(self):
          self.supabase.table("sessions").update({"status": "reasoning"}).eq("session_id", self.session_id).execute()
-         logger.info("Phase 3 Retrieval Pipeline Succeeded.")
+         self._log("Phase 3 Retrieval Pipeline Succeeded.")
+
+
+def _search_params() -> Dict[str, Any]:
+    """Everything that changes which chunks a single query returns."""
+    return {
+        "embedding_model": Config.EMBEDDING_MODEL_NAME,
+        "final_k": FINAL_K,
+        "rrf_c": RRF_C,
+        "keyword_channel": Config.KEYWORD_CHANNEL,
+        "vector_tier": Config.VECTOR_TIER,
+    }
+
+
+def _search_params_hash() -> str:
+    return hashlib.sha256(json.dumps(_search_params(), sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _search_config_hash() -> str:
+    """Search params plus query clustering, which decides the queries actually searched."""
+    config = {**_search_params(), "cluster_threshold": Config.QUERY_CLUSTER_THRESHOLD}
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _queries_hash(signal: Dict) -> str:
+    queries = sorted({normalize_query(q) for q in (signal.get("search_queries") or [])})
+    return hashlib.sha256("\n".join(queries).encode()).hexdigest()[:16]
+
+
+class PipelinedRetrieval:
+    """
+    Opt-in Phase 2 -> Phase 3 handoff.
+    Each chunk's freshly inserted signals are searched on a single background
+    worker (same one-RPC-at-a-time limit as run()), so evidence accumulates
+    while later chunks are still being processed by Gemini. Progress goes to
+    the given job log (Phase 2's), or to an own Phase 3 one flushed by finish().
+    """
+    def __init__(self, session_id: str, job_log: Optional[JobLogWriter] = None):
+        self.pipeline = RetrievalPipeline(session_id, job_log=job_log)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrieval-handoff")
+        self._futures = {}
+
+    def submit(self, signals: List[Dict]):
+        if not signals: return
+        future = self._executor.submit(self.pipeline.retrieve_for_signals, signals)
+        self._futures[future] = signals
+
+    def finish(self) -> int:
+        """
+        Waits for queued searches; failed batches are retried once inline. Never raises:
+        signals whose retry also fails keep no retrieval state, so Phase 4 searches them
+        as pending (retrieve_pending) before reasoning.
+        """
+        total = 0
+        failed = 0
+        try:
+            for future in concurrent.futures.as_completed(list(self._futures)):
+                signals = self._futures[future]
+                try:
+                    total += future.result()
+                except Exception as e:
+                    logger.warning(f"Pipelined retrieval failed for {len(signals)} signals, retrying: {e}")
+                    try:
+                        total += self.pipeline.retrieve_for_signals(signals)
+                    except Exception as e:
+                        failed += len(signals)
+                        logger.error(f"Pipelined retrieval retry failed for {len(signals)} signals, left pending: {e}")
+        finally:
+            self._executor.shutdown(wait=True)
+        self.pipeline._log(f"Pipelined retrieval saved {total} retrieval results for session {self.pipeline.session_id}"
+                           f"{f' ({failed} signals left pending)' if failed else ''}.")
+        self.pipeline.close()
+        return total
 
 
 def run(payload_str: str):
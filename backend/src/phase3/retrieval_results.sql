@@ -0,0 +1,102 @@
+-- Normalized Phase 3 output
+-- evidence_candidates stored one row per (signal x search result): a query shared by N signals
+-- wrote its FINAL_K results N times. Results are now stored once per (session, query, chunk)
+-- and signals point at the queries they asked for.
+--
+--   retrieval_results : session_id, query_text, chunk_id + ranks/scores   (FINAL_K rows per query)
+--   signal_queries    : session_id, signal_id, query_text                 (one row per signal-query link)
+--
+-- query_text is the normalized (cluster leader) query actually sent to hybrid search.
+-- evidence_candidates_expanded rebuilds the old per-signal shape when it's needed (debugging, exports).
+
+CREATE TABLE IF NOT EXISTS retrieval_results (
+  session_id uuid NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+  query_text text NOT NULL,
+  chunk_id uuid NOT NULL REFERENCES chunks(chunk_id) ON DELETE CASCADE,
+
+  retrieval_channel text CHECK (retrieval_channel IN ('vector','keyword','rrf')),
+
+  rank_vector int,
+  rank_keyword int,
+
+  score_vector double precision,
+  score_keyword double precision,
+  rrf_score double precision,
+
+  created_at timestamptz NOT NULL DEFAULT now(),
+
+  PRIMARY KEY (session_id, query_text, chunk_id)
+);
+
+-- Phase 4 reads distinct chunks per session
+CREATE INDEX IF NOT EXISTS retrieval_results_session_chunk_idx
+ON retrieval_results(session_id, chunk_id);
+
+CREATE TABLE IF NOT EXISTS signal_queries (
+  session_id uuid NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+  signal_id uuid NOT NULL REFERENCES signals(signal_id) ON DELETE CASCADE,
+  query_text text NOT NULL,
+
+  PRIMARY KEY (session_id, signal_id, query_text)
+);
+
+CREATE INDEX IF NOT EXISTS signal_queries_session_query_idx
+ON signal_queries(session_id, query_text);
+
+-- Legacy shape: one row per (signal, chunk) with the query and scores that produced it
+CREATE OR REPLACE VIEW evidence_candidates_expanded AS
+SELECT
+  sq.session_id,
+  sq.signal_id,
+  rr.chunk_id,
+  rr.query_text AS query_used,
+  rr.retrieval_channel,
+  rr.rank_vector,
+  rr.rank_keyword,
+  rr.score_vector,
+  rr.score_keyword,
+  rr.rrf_score,
+  rr.created_at
+FROM signal_queries sq
+JOIN retrieval_results rr
+  ON rr.session_id = sq.session_id
+ AND rr.query_text = sq.query_text;
+
+-- Incremental retrieval: which search configuration and query set each signal was last
+-- searched with. RetrievalPipeline.run() only searches signals whose hashes differ
+-- (new signals, edited search_queries, a changed FINAL_K / RRF_C / keyword mode / model, or
+-- a changed source set of the subject: config_hash also covers the active source_ids and
+-- subject_source_version from retrieval_cache.sql).
+CREATE TABLE IF NOT EXISTS signal_retrieval_state (
+  signal_id uuid PRIMARY KEY REFERENCES signals(signal_id) ON DELETE CASCADE,
+  session_id uuid NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+
+  config_hash text NOT NULL,
+  queries_hash text NOT NULL,
+
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS signal_retrieval_state_session_idx
+ON signal_retrieval_state(session_id);
+
+-- Drops results no signal links to anymore (after a signal's queries were replaced).
+-- Returns the number of deleted rows.
+CREATE OR REPLACE FUNCTION prune_orphan_retrieval_results(p_session_id UUID)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_deleted INT;
+BEGIN
+  DELETE FROM retrieval_results rr
+  WHERE rr.session_id = p_session_id
+    AND NOT EXISTS (
+      SELECT 1 FROM signal_queries sq
+      WHERE sq.session_id = rr.session_id
+        AND sq.query_text = rr.query_text
+    );
+  GET DIAGNOSTICS v_deleted = ROW_COUNT;
+  RETURN v_deleted;
+END;
+$$;
@@ -0,0 +1,108 @@
+import logging
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from src.phase4.evidence_pruning import signal_relevance
+
+logger = logging.getLogger(__name__)
+
+# Same rough estimate as chunks.token_count (phase1/ingest_pipeline.py)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class ContextPacker:
+    """
+    Builds the Phase 4 prompt context within a token budget.
+
+    The session header and the complete signal timeline always go in. Reference blocks
+    fill the rest: first each signal's best chunk (strongest signals first) so every signal
+    that has evidence keeps some, then the remaining chunks by aggregated RRF score (sum
+    over the signals that retrieved them, so chunks shared by many signals rank higher).
+    Included blocks are emitted in (source, page) order for locality.
+    """
+
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+
+    def pack(self, meta: Dict, signals: List[Dict], candidates: List[Dict], links: List[Dict],
+             chunks_map: Dict[str, Dict]) -> Tuple[str, Dict]:
+        """Returns (context, breakdown); breakdown has the token split and included/dropped counts."""
+        header = [
+            "## Exam Session Info",
+            f"- Subject: {meta.get('subject_name')}",
+            f"- Exam Window: {meta.get('exam_window')}",
+            f"- Audio URL: {meta.get('gcs_audio_url')}",
+            "",
+        ]
+        timeline = ["## Audio Signals Timeline"]
+        for s in signals:
+            timeline.append(
+                f"[#SIGNAL id={s['signal_id']} t={s['chunk_index']}:{s['t0_sec']:.1f}-{s['t1_sec']:.1f} "
+                f"type={s['signal_type']}] {s['content']}"
+            )
+        timeline.append("")
+
+        header_tokens = estimate_tokens("\n".join(header))
+        timeline_tokens = estimate_tokens("\n".join(timeline))
+        remaining = self.token_budget - header_tokens - timeline_tokens
+        if remaining <= 0:
+            logger.warning(f"Signal timeline alone (~{header_tokens + timeline_tokens} tokens) exceeds the "
+                           f"context budget of {self.token_budget}; no reference blocks included.")
+
+        blocks = {}
+        for chunk_id, chunk in chunks_map.items():
+            head = f"[[CHUNK id={chunk_id} page={chunk.get('page_start')}-{chunk.get('page_end')} anchor={chunk.get('anchor_path')}]]"
+            blocks[chunk_id] = f"{head}\n{(chunk.get('content_text') or '').strip()}\n"
+
+        included, reference_tokens = [], 0
+        for chunk_id in self._rank(candidates, links, chunks_map):
+            cost = estimate_tokens(blocks[chunk_id])
+            if reference_tokens + cost > remaining:
+                continue # a smaller block further down may still fit
+            included.append(chunk_id)
+            reference_tokens += cost
+
+        included.sort(key=lambda cid: (
+            str(chunks_map[cid].get("source_id") or ""),
+            chunks_map[cid].get("page_start") or 0,
+            cid
+        ))
+        references = ["## Textbook Reference Blocks"] + [blocks[cid] for cid in included]
+        context = "\n".join(header + timeline + references)
+
+        breakdown = {
+            "budget": self.token_budget,
+            "header": header_tokens,
+            "signals": timeline_tokens,
+            "references": reference_tokens,
+            "total": estimate_tokens(context),
+            "chunks_included": len(included),
+            "chunks_dropped": len(chunks_map) - len(included),
+        }
+        return context, breakdown
+
+    def _rank(self, candidates: List[Dict], links: List[Dict], chunks_map: Dict[str, Dict]) -> List[str]:
+        relevance = signal_relevance(candidates, links)
+        aggregate = defaultdict(float)
+        for scores in relevance.values():
+            for chunk_id, score in scores.items():
+                aggregate[chunk_id] += score
+        if not relevance:
+            # No signal links (e.g. legacy sessions): rank by the best score of any query
+            for c in candidates:
+                aggregate[c["chunk_id"]] = max(aggregate[c["chunk_id"]], c.get("rrf_score") or 0.0)
+
+        order = []
+        seen = set()
+        strongest_first = sorted(relevance.values(), key=lambda scores: -max(scores.values(), default=0.0))
+        for scores in strongest_first:
+            best = max((cid for cid in scores if cid in chunks_map), key=lambda cid: scores[cid], default=None)
+            if best is not None and best not in seen:
+                seen.add(best)
+                order.append(best)
+        rest = sorted((cid for cid in chunks_map if cid not in seen), key=lambda cid: -aggregate.get(cid, 0.0))
+        return order + rest
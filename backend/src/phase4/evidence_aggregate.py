@@ -0,0 +1,46 @@
+import logging
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Per-chunk fields of an aggregate_evidence row that describe the chunk itself
+CHUNK_FIELDS = ("chunk_id", "source_id", "page_start", "page_end", "anchor_path", "token_count",
+                "content_text", "embedding")
+
+
+def signal_query_key(signal_id: str) -> str:
+    # Stands in for query_text: aggregated scores are already per signal, so each signal
+    # gets one pseudo query that only it links to
+    return f"signal:{signal_id}"
+
+
+def expand_aggregate(rows: List[Dict], signals: List[Dict]) -> Tuple[List[Dict], List[Dict], Dict[str, Dict]]:
+    """
+    Turns aggregate_evidence rows (phase4/evidence_aggregate.sql) into the shapes the rest of
+    Phase 4 takes: (candidates, links, chunks).
+
+    candidates: one row per (signal, chunk) with the signal's best score, keyed by the signal's
+                pseudo query, plus one per (session, chunk) with the session's best score and no
+                query (these link to no signal; they keep per-session chunk sets and the
+                no-links ranking fallback working).
+    links:      one per signal that has evidence.
+    chunks:     chunk_id -> chunk fields (text and embedding only if requested).
+    Scores for signals not in `signals` (deleted meanwhile) are dropped.
+    """
+    session_of = {s["signal_id"]: s["session_id"] for s in signals}
+    candidates, linked, chunks = [], {}, {}
+    for row in rows:
+        chunk_id = row["chunk_id"]
+        chunks[chunk_id] = {f: row.get(f) for f in CHUNK_FIELDS}
+        for signal_id, score in (row.get("signal_scores") or {}).items():
+            session_id = session_of.get(signal_id)
+            if session_id is None:
+                continue
+            linked[signal_id] = session_id
+            candidates.append({"session_id": session_id, "query_text": signal_query_key(signal_id),
+                               "chunk_id": chunk_id, "rrf_score": score})
+        for session_id, score in (row.get("session_scores") or {}).items():
+            candidates.append({"session_id": session_id, "query_text": None, "chunk_id": chunk_id, "rrf_score": score})
+    links = [{"session_id": session_id, "signal_id": signal_id, "query_text": signal_query_key(signal_id)}
+             for signal_id, session_id in linked.items()]
+    return candidates, links, chunks
@@ -0,0 +1,66 @@
+-- Phase 4 evidence in one round trip
+-- retrieval_results + signal_queries + chunks를 서버에서 청크 단위로 집계한다.
+-- retrieval_results.sql 적용 이후 실행
+--
+-- One object per distinct chunk retrieved for p_session_ids:
+--   chunk_id, source_id, page_start, page_end, anchor_path, token_count,
+--   content_text (p_with_text), embedding as text (p_with_embedding),
+--   best_score      : max rrf_score over every query that retrieved it
+--   session_scores  : {session_id: best rrf_score within that session}
+--   signal_scores   : {signal_id: best rrf_score over that signal's queries}
+-- Returned as a single jsonb value so PostgREST's max-rows does not cut it off.
+
+CREATE OR REPLACE FUNCTION aggregate_evidence(
+  p_session_ids UUID[],
+  p_with_text BOOLEAN DEFAULT true,
+  p_with_embedding BOOLEAN DEFAULT false
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+  WITH rr AS (
+    SELECT session_id, query_text, chunk_id, rrf_score
+    FROM retrieval_results
+    WHERE session_id = ANY(p_session_ids)
+  ),
+  session_best AS (
+    SELECT chunk_id, session_id, max(rrf_score) AS score
+    FROM rr
+    GROUP BY chunk_id, session_id
+  ),
+  by_chunk AS (
+    SELECT chunk_id, max(score) AS best_score, jsonb_object_agg(session_id, score) AS session_scores
+    FROM session_best
+    GROUP BY chunk_id
+  ),
+  signal_best AS (
+    SELECT rr.chunk_id, sq.signal_id, max(rr.rrf_score) AS score
+    FROM rr
+    JOIN signal_queries sq
+      ON sq.session_id = rr.session_id
+     AND sq.query_text = rr.query_text
+    GROUP BY rr.chunk_id, sq.signal_id
+  ),
+  by_signal AS (
+    SELECT chunk_id, jsonb_object_agg(signal_id, score) AS signal_scores
+    FROM signal_best
+    GROUP BY chunk_id
+  )
+  SELECT COALESCE(jsonb_agg(jsonb_build_object(
+    'chunk_id', c.chunk_id,
+    'source_id', c.source_id,
+    'page_start', c.page_start,
+    'page_end', c.page_end,
+    'anchor_path', c.anchor_path,
+    'token_count', c.token_count,
+    'content_text', CASE WHEN p_with_text THEN c.content_text END,
+    'embedding', CASE WHEN p_with_embedding THEN c.embedding::text END,
+    'best_score', b.best_score,
+    'session_scores', b.session_scores,
+    'signal_scores', COALESCE(s.signal_scores, '{}'::jsonb)
+  )), '[]'::jsonb)
+  FROM by_chunk b
+  JOIN chunks c ON c.chunk_id = b.chunk_id
+  LEFT JOIN by_signal s ON s.chunk_id = b.chunk_id;
+$$;
@@ -0,0 +1,113 @@
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def signal_relevance(candidates: List[Dict], links: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """
+    signal_id -> {chunk_id: relevance}, relevance = best rrf_score of the chunk over the
+    signal's queries (candidates: retrieval_results rows, links: signal_queries rows).
+    """
+    by_query = defaultdict(list)
+    for c in candidates:
+        by_query[(c["session_id"], c["query_text"])].append(c)
+    relevance = defaultdict(dict)
+    for link in links:
+        scores = relevance[link["signal_id"]]
+        for c in by_query.get((link["session_id"], link["query_text"]), []):
+            score = c.get("rrf_score") or 0.0
+            if score > scores.get(c["chunk_id"], -1.0):
+                scores[c["chunk_id"]] = score
+    return relevance
+
+
+def parse_embedding(value) -> Optional[np.ndarray]:
+    # halfvec arrives as the text literal "[0.1,0.2,...]" (PostgREST and embedding::text)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return np.array(value.strip("[]").split(","), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _unit_rows(embeddings: Dict[str, np.ndarray], chunk_ids: List[str]) -> np.ndarray:
+    mat = np.stack([embeddings[c] for c in chunk_ids]).astype(np.float32)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    return mat / np.where(norms == 0, 1, norms)
+
+
+def prune_evidence(relevance: Dict[str, Dict[str, float]], embeddings: Dict[str, np.ndarray],
+                   budget: int, mmr_lambda: float = 0.7, dup_threshold: float = 0.95) -> Tuple[Set[str], Dict]:
+    """
+    Picks at most `budget` chunks per signal with maximal marginal relevance:
+    score = lambda * relevance - (1 - lambda) * max cosine to chunks already kept
+    (by this signal or any earlier one). Chunks another signal already kept cost nothing
+    extra, so signals share evidence instead of pulling in near-copies. Candidates with
+    cosine >= dup_threshold to a kept chunk are dropped outright, so a signal may keep fewer.
+    Signals are processed strongest first. Chunks without an embedding are never picked.
+
+    Returns (kept chunk_ids, stats) where stats has chunks_before/after, signals_with_evidence,
+    signals_covered and relevance_kept (kept relevance / relevance of each signal's plain top-`budget`).
+    """
+    all_ids = sorted({c for scores in relevance.values() for c in scores if c in embeddings})
+    if not all_ids:
+        return set(), {"chunks_before": 0, "chunks_after": 0, "signals_with_evidence": 0,
+                       "signals_covered": 0, "relevance_kept": 1.0}
+    row_of = {c: i for i, c in enumerate(all_ids)}
+    x = _unit_rows(embeddings, all_ids)
+
+    kept_rows: List[int] = []
+    kept = np.zeros(len(all_ids), dtype=bool)
+    covered, with_evidence = 0, 0
+    kept_mass, top_mass = 0.0, 0.0
+
+    order = sorted(relevance, key=lambda s: -max(relevance[s].values(), default=0.0))
+    for signal_id in order:
+        scores = {c: v for c, v in relevance[signal_id].items() if c in row_of}
+        if not scores:
+            continue
+        with_evidence += 1
+        rows = np.fromiter((row_of[c] for c in scores), dtype=np.int64, count=len(scores))
+        rel = np.fromiter(scores.values(), dtype=np.float32, count=len(scores))
+        top_mass += float(np.sort(rel)[::-1][:budget].sum())
+        rel_norm = rel / rel.max() if rel.max() > 0 else rel
+
+        # Redundancy against everything kept so far; already-kept candidates are free to reuse
+        cand = x[rows]
+        redundancy = (cand @ x[kept_rows].T).max(axis=1) if kept_rows else np.zeros(len(rows), np.float32)
+        free = kept[rows].copy()
+        redundancy[free] = 0.0
+        available = np.ones(len(rows), dtype=bool)
+
+        picked = 0
+        while picked < budget:
+            # Near-copies of something kept are dropped outright
+            available &= free | (redundancy < dup_threshold)
+            if not available.any():
+                break
+            mmr = np.where(available, mmr_lambda * rel_norm - (1 - mmr_lambda) * redundancy, -np.inf)
+            best = int(np.argmax(mmr))
+            available[best] = False
+            row = rows[best]
+            if not kept[row]:
+                kept[row] = True
+                kept_rows.append(row)
+            kept_mass += float(rel[best])
+            picked += 1
+            redundancy = np.maximum(redundancy, cand @ x[row])
+            redundancy[free] = 0.0
+        covered += 1 if picked else 0
+
+    kept_ids = {all_ids[r] for r in kept_rows}
+    stats = {
+        "chunks_before": len(all_ids),
+        "chunks_after": len(kept_ids),
+        "signals_with_evidence": with_evidence,
+        "signals_covered": covered,
+        "relevance_kept": kept_mass / top_mass if top_mass else 1.0,
+    }
+    return kept_ids, stats
@@ -0,0 +1,159 @@
+import difflib
+import json
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+REPORT_KEYS = ["professor_mentioned", "likely", "trap_warnings"]
+
+MERGE_SYSTEM_PROMPT = """
+[ROLE]
+You are the "Grand Master" TA for an exam preparation service.
+Several partial reports were written independently, each covering a few lecture sessions of the same course.
+Merge them into one whole-semester exam preparation report.
+
+[INPUT]
+A list of partial report items, each with an "id", its original "category", "title", "why" and "confidence".
+
+[TASK]
+1. Merge items that describe the same topic (across or within partial reports) into one item.
+   A topic repeated across sessions deserves higher confidence.
+2. Re-classify merged items into the 3 categories:
+   - professor_mentioned: Explicitly emphasized by professor.
+   - likely: High probability based on signal + matching textbook content.
+   - trap_warnings: Specific misconceptions or tricky points mentioned.
+3. Order each category by importance for the exam (most important first).
+
+[OUTPUT SCHEMA (JSON Only)]
+{
+  "professor_mentioned": [
+    {
+      "title": "Topic Name",
+      "why": "Merged explanation",
+      "confidence": 0.0-1.0,
+      "merged_from": ["<id>", "<id>"]
+    }
+  ],
+  "likely": [...],
+  "trap_warnings": [...]
+}
+
+[CONSTRAINTS]
+- Every input id must appear in exactly one "merged_from" list.
+- Do not invent new topics.
+- Return VALID JSON only.
+- **IMPORTANT**: Write the report entirely in KOREAN (한국어). The 'title' and 'why' fields MUST be in Korean.
+"""
+
+
+def partition_sessions(session_ids: List[str], signals: List[Dict], max_signals: int) -> List[List[str]]:
+    """
+    Consecutive sessions (the order they were passed in, i.e. lecture weeks) grouped so that
+    each partition has at most max_signals signals. A single larger session gets its own partition.
+    """
+    counts = {sid: 0 for sid in session_ids}
+    for s in signals:
+        if s.get("session_id") in counts:
+            counts[s["session_id"]] += 1
+
+    partitions, current, size = [], [], 0
+    for sid in session_ids:
+        if current and size + counts[sid] > max_signals:
+            partitions.append(current)
+            current, size = [], 0
+        current.append(sid)
+        size += counts[sid]
+    if current:
+        partitions.append(current)
+    return partitions
+
+
+def index_partial_items(partials: List[Dict]) -> Dict[str, Dict]:
+    """Gives every partial report item an id ("<part>.<n>") and its original category."""
+    items = {}
+    for i, partial in enumerate(partials):
+        for key in REPORT_KEYS:
+            for item in partial.get(key, []):
+                items[f"{i + 1}.{len(items) + 1}"] = {**item, "category": key}
+    return items
+
+
+def merge_input(items: Dict[str, Dict]) -> str:
+    """
+    What the merge call sees: id, category, title, why and confidence per item. Signal and
+    chunk refs stay out of the prompt and the answer; expand_merged() re-attaches them.
+    """
+    return json.dumps([{
+        "id": item_id,
+        "category": item["category"],
+        "title": item.get("title"),
+        "why": item.get("why"),
+        "confidence": item.get("confidence")
+    } for item_id, item in items.items()], ensure_ascii=False)
+
+
+def expand_merged(merged: Dict, items: Dict[str, Dict]) -> Dict:
+    """
+    Builds the report from the merge (or delta) call's groups: each group gets the union of
+    its members' audio_refs and citations plus its own (delta calls add refs for new signals;
+    a group without members is a new item). Items no group mentions are kept as they were.
+    """
+    report = {k: [] for k in REPORT_KEYS}
+    used = set()
+    for key in REPORT_KEYS:
+        for group in merged.get(key, []) or []:
+            member_ids = [m for m in group.get("merged_from", []) or [] if m in items and m not in used]
+            members = [items[m] for m in member_ids]
+            if not members and not group.get("audio_refs"):
+                continue
+            used.update(member_ids)
+            sources = members + [group]
+            report[key].append({
+                "title": group.get("title") or members[0].get("title"),
+                "why": group.get("why") or members[0].get("why"),
+                "confidence": group.get("confidence", max((m.get("confidence", 0) for m in members), default=0)),
+                "audio_refs": _union(sources, "audio_refs", "signal_id"),
+                "citations": _union(sources, "citations", "chunk_id")
+            })
+    for item_id, item in items.items():
+        if item_id not in used:
+            report[item["category"]].append({k: v for k, v in item.items() if k != "category"})
+    return report
+
+
+def _union(members: List[Dict], field: str, key: str) -> List[Dict]:
+    out, seen = [], set()
+    for m in members:
+        for ref in m.get(field) or []:
+            if ref.get(key) not in seen:
+                seen.add(ref.get(key))
+                out.append(ref)
+    return out
+
+
+def merge_partial_reports(partials: List[Dict], title_similarity: float = 0.85) -> Dict:
+    """
+    Deterministic merge used when the merge call fails: items with near-identical titles in
+    the same category are combined (refs unioned, highest confidence kept), then each category
+    is sorted by confidence.
+    """
+    merged = {k: [] for k in REPORT_KEYS}
+    for key in REPORT_KEYS:
+        for partial in partials:
+            for item in partial.get(key, []):
+                title = (item.get("title") or "").strip()
+                match = next((m for m in merged[key]
+                              if difflib.SequenceMatcher(None, m.get("title") or "", title).ratio() >= title_similarity), None)
+                if match is None:
+                    merged[key].append({**item,
+                                        "audio_refs": list(item.get("audio_refs") or []),
+                                        "citations": list(item.get("citations") or [])})
+                    continue
+                match["confidence"] = max(match.get("confidence", 0), item.get("confidence", 0))
+                seen_signals = {r.get("signal_id") for r in match["audio_refs"]}
+                match["audio_refs"] += [r for r in item.get("audio_refs") or [] if r.get("signal_id") not in seen_signals]
+                seen_chunks = {c.get("chunk_id") for c in match["citations"]}
+                match["citations"] += [c for c in item.get("citations") or [] if c.get("chunk_id") not in seen_chunks]
+        merged[key].sort(key=lambda m: -m.get("confidence", 0))
+    return merged
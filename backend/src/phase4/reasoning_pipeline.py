@@ -1,45 +1,102 @@
 ﻿import logging
 import json
 import sys
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import time
+import concurrent.futures
+from typing import List, Dict, Any, Optional, Tuple
 from collections import defaultdict
 import difflib
 
-from google import genai
 from google.genai import types
 
 from src.shared.config import Config
 from src.shared.db import get_supabase_client
+from src.shared.clients import get_genai_client
+from src.shared.pg import get_pg_pool
+from src.shared.job_log import JobLogWriter
+from src.shared.paged_fetch import fetch_by_ids, fetch_all_in
 from src.phase3.retrieval_pipeline import RetrievalPipeline
+from src.phase4.context_packer import ContextPacker
+from src.phase4.map_reduce import (
+    MERGE_SYSTEM_PROMPT, partition_sessions, index_partial_items, merge_input, expand_merged, merge_partial_reports
+)
+from src.phase4.report_state import DELTA_SYSTEM_PROMPT, session_fingerprints, find_reusable_state, delta_context
+from src.phase4.evidence_pruning import signal_relevance, prune_evidence, parse_embedding
+from src.phase4.evidence_aggregate import expand_aggregate
+from src.phase4.report_cache import EMPTY_EVIDENCE, prompt_version, input_fingerprint
 
 logger = logging.getLogger(__name__)
 
+# Columns Phase 4 reads (the prompt timeline, partitioning and report state fingerprints);
+# search_queries and the chunk embedding never leave the database here
+SIGNAL_COLUMNS = "signal_id, session_id, chunk_index, signal_type, content, t0_sec, t1_sec"
+CHUNK_COLUMNS = "chunk_id, source_id, content_text, page_start, page_end, anchor_path"
+
+REASONING_SYSTEM_PROMPT = """
+[ROLE]
+You are the "Grand Master" TA for an exam preparation service.
+Your goal is to synthesize audio signals (professor's speech) and textbook references to create a high-quality exam preparation report.
+
+[INPUT]
+1. Session Info: Subject and exam scope.
+2. Signal Timeline: List of important signals detected in audio.
+3. Reference Blocks: Textbook chunks retrieved based on signals.
+
+[TASK]
+1. Correlate audio signals with specific textbook chunks.
+2. Filter out signals that are repetitive or trivial.
+3. Classify remaining items into 3 categories:
+   - professor_mentioned: Explicitly emphasized by professor ("This will be on the exam", "Important").
+   - likely: High probability based on signal + matching textbook content.
+   - trap_warnings: Specific misconceptions or tricky points mentioned.
+
+[OUTPUT SCHEMA (JSON Only)]
+{
+  "professor_mentioned": [
+    {
+      "title": "Topic Name",
+      "why": "Explanation citing audio and text",
+      "confidence": 0.0-1.0,
+      "audio_refs": [{"signal_id": "..."}],
+      "citations": [{"chunk_id": "...", "reason": "..."}]
+    }
+  ],
+  "likely": [...],
+  "trap_warnings": [...]
+}
+
+[CONSTRAINTS]
+- If a signal has NO matching textbook reference but is very explicit in audio, keep it but note "Textbook reference missing" in 'why'.
+- If a Reference Block is not relevant to any signal, ignore it.
+- Use EXACT chunk_ids from input in citations.
+- Return VALID JSON only.
+- **IMPORTANT**: Write the report entirely in KOREAN (한국어). The 'title' and 'why' fields MUST be in Korean.
+"""
+
 class ReasoningPipeline:
     def __init__(self, session_ids: List[str], subject_id: str, exam_window: str = "midterm"):
         self.session_ids = session_ids
         self.subject_id = subject_id
         self.exam_window = exam_window
-        self.logs_buffer = []
+        # Phase 4 starts a fresh log view for its sessions; entries are flushed in the background
+        self.job_log = JobLogWriter(session_ids, phase="4", reset=True)
+        # Cleared when the aggregate_evidence RPC (phase4/evidence_aggregate.sql) is not installed
+        self._aggregate_available = True
+        # Set when a partition or the merge call failed; such reports are not saved as report state
+        self._degraded = False
+        # Sessions of failed partitions; listed in the published report (incomplete_sessions)
+        self._incomplete_sessions: List[str] = []
         self.supabase = get_supabase_client()
         # Initialize Google GenAI Client for Gemini 3.0 Thinking Mode
         # Use GEMINI_LOCATION (e.g. us-central1) specifically for Thinking Mode availability
-        self.client = genai.Client(vertexai=True, project=Config.GCP_PROJECT, location=Config.GEMINI_LOCATION)
+        self.client = get_genai_client(Config.GEMINI_LOCATION)
 
     def _log(self, message: str):
         logger.info(message)
-        timestamp = datetime.now().isoformat()
-        entry = {"ts": timestamp, "msg": message}
-        self.logs_buffer.append(entry)
-        try:
-            # Overwrite logs column with current history
-            self.supabase.table("sessions").update({
-                "logs": self.logs_buffer
-            }).in_("session_id", self.session_ids).execute()
-        except Exception as e:
-            logger.warning(f"Failed to update logs: {e}")
+        self.job_log.log(message)
 
     def run(self):
+        self.job_log.start()
         try:
             self._log("Starting Reasoning Phase (Phase 4)...")
             # 1. Update Sessions Status
@@ -49,7 +106,6 @@ class ReasoningPipeline:
             self._log(f"Fetching aggregation data for {len(self.session_ids)} sessions...")
             subject_meta = self._fetch_subject_meta()
             signals = self._fetch_signals_aggregated()
-            evidence_candidates = self._fetch_evidence_candidates_aggregated()
 
             if not signals:
                 self._log("No signals found across sessions. Aborting.")
@@ -57,70 +113,138 @@ class ReasoningPipeline:
                 self._save_empty_report()
                 return
 
-            # Check if evidence exists. If not, trigger Lazy Retrieval (Phase 3)
-            if not evidence_candidates and signals:
-                self._log("No evidence candidates found. Triggering Phase 3 (Retrieval) automatically...")
-                for sid in self.session_ids:
-                    try:
-                        self._log(f"Running Retrieval for session {sid}...")
-                        rp = RetrievalPipeline(session_id=sid)
-                        rp.run()
-                    except Exception as e:
-                        self._log(f"Retrieval failed for session {sid}: {e}")
-                
-                # Re-fetch evidence after retrieval
-                evidence_candidates = self._fetch_evidence_candidates_aggregated()
-                self._log(f"After retrieval: Found {len(evidence_candidates)} candidates.")
+            # Unchanged inputs: serve the stored report without a model call
+            fingerprint = self._input_fingerprint(subject_meta, signals) if Config.REPORT_CACHE_ENABLED else None
+            cached = self._find_cached_report(fingerprint) if fingerprint else None
+            if cached is not None:
+                self._log(
+                    f"Report cache hit: inputs unchanged since the report of {cached['created_at']} "
+                    f"({len(signals)} signals, {Config.REASONING_MODEL_NAME}). Skipping the model call."
+                )
+                self._publish_report(cached["items"])
+                return
+
+            # Incremental update: a stored report over a subset of these sessions only needs the new ones
+            report_state = self._load_report_state(signals) if Config.REPORT_INCREMENTAL else None
+            reason_signals = signals
+            evidence_sessions = self.session_ids
+            if report_state is not None:
+                new_sessions = set(self.session_ids) - set(report_state["session_ids"])
+                reason_signals = [s for s in signals if s["session_id"] in new_sessions]
+                evidence_sessions = [sid for sid in self.session_ids if sid in new_sessions]
+                self._log(
+                    f"Incremental update: reusing the report over {len(report_state['session_ids'])} sessions, "
+                    f"reasoning over {len(new_sessions)} new sessions ({len(reason_signals)} signals)."
+                )
+
+            # Lazy Retrieval (Phase 3) for signals without evidence: sessions never retrieved, and
+            # signals whose pipelined retrieval failed in Phase 2. Incremental, so a fully
+            # retrieved session only costs the retrieval state lookup.
+            if self._retrieve_pending(evidence_sessions):
+                fingerprint = None # taken before retrieval; don't cache under it
+
+            evidence_candidates, signal_links, chunk_rows = self._fetch_evidence(evidence_sessions, signals)
 
             self._log(f"Found {len(signals)} signals and {len(evidence_candidates)} evidence candidates.")
 
             # 3. Dedup & Load Chunks
-            candidate_chunk_ids = list(set([c["chunk_id"] for c in evidence_candidates]))
-            chunks_map = {}
-            if candidate_chunk_ids:
-                chunks_map = self._fetch_chunks(candidate_chunk_ids)
+            chunks_map = self._load_chunks(evidence_candidates, signal_links, chunk_rows)
             
             self._log(f"Retrieved {len(chunks_map)} unique textbook chunks for context.")
 
-            # 4. Context Assembly
-            prompt_context = self._assemble_context(subject_meta, signals, evidence_candidates, chunks_map)
-            
-            # 5. Model Call
-            self._log(f"Calling Gemini Thinking Mode ({Config.REASONING_MODEL_NAME}) (this may take 30-60s)...")
-            report_json = self._call_gemini_reasoning(prompt_context)
-            
-            # 6. Validation & Post-processing
-            self._log("Validating and cleaning generated report...")
-            final_report = self._validate_and_clean_report(report_json, chunks_map)
-            
-            # 7. Save Report (Virtual 'All Sessions' Report)
-            # Strategy: To make frontend queries simple, we save the SAME report to ALL participating sessions.
-            # First, clean up any existing reports for these sessions to avoid duplicates/confusion.
-            try:
-                self.supabase.table("session_reports").delete().in_("session_id", self.session_ids).execute()
-            except Exception as e:
-                logger.warning(f"Failed to clean up old reports: {e}")
-
-            # Then insert for all
-            report_items = []
-            for sid in self.session_ids:
-                report_items.append({
-                    "session_id": sid,
-                    "report_json": final_report
-                })
-            
-            if report_items:
-                self.supabase.table("session_reports").insert(report_items).execute()
+            partitions = self._partition_sessions(signals)
+            final_report = None
+            if report_state is not None:
+                # 4-6. Delta: previous items + the new sessions' signals and evidence
+                try:
+                    final_report = self._reason_delta(
+                        report_state, subject_meta, reason_signals, evidence_candidates, signal_links, chunks_map
+                    )
+                except Exception as e:
+                    self._log(f"Delta update failed, falling back to a full report: {e}")
+                    # The delta only loaded the new sessions' evidence; the full report needs all of it
+                    old_sessions = [sid for sid in self.session_ids if sid not in evidence_sessions]
+                    if self._retrieve_pending(old_sessions):
+                        fingerprint = None
+                    evidence_candidates, signal_links, chunk_rows = self._fetch_evidence(self.session_ids, signals)
+                    chunks_map = self._load_chunks(evidence_candidates, signal_links, chunk_rows)
+                    self._log(f"Retrieved {len(chunks_map)} unique textbook chunks for the full report.")
+
+            if final_report is None and len(partitions) > 1:
+                # 4-6. Map-reduce: partial reports per group of sessions, then one merge call
+                final_report = self._reason_hierarchical(
+                    partitions, subject_meta, signals, evidence_candidates, signal_links, chunks_map
+                )
+            elif final_report is None:
+                # 4. Context Assembly
+                prompt_context = self._assemble_context(subject_meta, signals, evidence_candidates, signal_links, chunks_map)
+
+                # 5. Model Call
+                self._log(f"Calling Gemini Thinking Mode ({Config.REASONING_MODEL_NAME}) (this may take 30-60s)...")
+                report_json = self._call_gemini_reasoning(prompt_context)
+
+                # 6. Validation & Post-processing
+                self._log("Validating and cleaning generated report...")
+                final_report = self._validate_and_clean_report(report_json, chunks_map)
             
-            # 8. Complete Sessions
-            self._log("Report saved. Marking sessions as completed.")
-            self.supabase.table("sessions").update({"status": "completed"}).in_("session_id", self.session_ids).execute()
-            logger.info(f"Phase 4 Reasoning Succeeded for sessions: {self.session_ids}")
+            if self._incomplete_sessions:
+                final_report["incomplete_sessions"] = [sid for sid in self.session_ids if sid in self._incomplete_sessions]
+                final_report["note"] = (
+                    f"{len(self._incomplete_sessions)} of {len(self.session_ids)} sessions could not be analyzed "
+                    f"and are missing from this report"
+                )
+                self._log(f"Publishing a partial report; missing sessions: {self._incomplete_sessions}")
+            self._publish_report(final_report)
+            if self._degraded:
+                # Some sessions' partials are missing; a state claiming to cover them would let
+                # later delta updates skip them for good
+                self._log("Report is incomplete; not saving it as report state.")
+            elif Config.REPORT_INCREMENTAL or Config.REPORT_CACHE_ENABLED:
+                self._save_report_state(signals, final_report, fingerprint)
 
         except Exception as e:
             logger.error(f"Phase 4 Failed: {e}", exc_info=True)
             self.supabase.table("sessions").update({"status": "failed"}).in_("session_id", self.session_ids).execute()
             raise e
+        finally:
+            self.job_log.close()
+
+    def _retrieve_pending(self, session_ids: List[str]) -> int:
+        """Runs incremental retrieval per session; returns the number of signals searched."""
+        searched = 0
+        for sid in session_ids:
+            try:
+                searched += RetrievalPipeline(session_id=sid, job_log=self.job_log).retrieve_pending()
+            except Exception as e:
+                self._log(f"Retrieval failed for session {sid}: {e}")
+        if searched:
+            self._log(f"Lazy retrieval searched {searched} pending signals across {len(session_ids)} sessions.")
+        return searched
+
+    def _publish_report(self, report: Dict):
+        # 7. Save Report (Virtual 'All Sessions' Report)
+        # Strategy: To make frontend queries simple, we save the SAME report to ALL participating sessions.
+        # First, clean up any existing reports for these sessions to avoid duplicates/confusion.
+        try:
+            self.supabase.table("session_reports").delete().in_("session_id", self.session_ids).execute()
+        except Exception as e:
+            logger.warning(f"Failed to clean up old reports: {e}")
+
+        # Then insert for all
+        report_items = []
+        for sid in self.session_ids:
+            report_items.append({
+                "session_id": sid,
+                "report_json": report
+            })
+        
+        if report_items:
+            self.supabase.table("session_reports").insert(report_items).execute()
+        
+        # 8. Complete Sessions
+        self._log("Report saved. Marking sessions as completed.")
+        self.supabase.table("sessions").update({"status": "completed"}).in_("session_id", self.session_ids).execute()
+        logger.info(f"Phase 4 Reasoning Succeeded for sessions: {self.session_ids}")
 
     def _fetch_subject_meta(self) -> Dict:
         subj = self.supabase.table("subjects").select("name").eq("subject_id", self.subject_id).single().execute()
@@ -131,104 +255,384 @@ class ReasoningPipeline:
 
     def _fetch_signals_aggregated(self) -> List[Dict]:
         # Fetch signals for ALL sessions
-        return self.supabase.table("signals")\
-            .select("*")\
-            .in_("session_id", self.session_ids)\
-            .order("chunk_index")\
-            .order("t0_sec")\
-            .execute().data
-
-    def _fetch_evidence_candidates_aggregated(self) -> List[Dict]:
-        return self.supabase.table("evidence_candidates")\
-            .select("*")\
-            .in_("session_id", self.session_ids)\
-            .execute().data
+        pool = get_pg_pool()
+        if pool is not None:
+            try:
+                return pool.query(
+                    """SELECT signal_id::text AS signal_id, session_id::text AS session_id, chunk_index,
+                              signal_type, content, t0_sec, t1_sec
+                       FROM signals WHERE session_id = ANY(%s::uuid[])
+                       ORDER BY chunk_index, t0_sec, signal_id""",
+                    (self.session_ids,)
+                )
+            except Exception as e:
+                logger.warning(f"Direct signal fetch failed, using REST: {e}")
+        return fetch_all_in(self.supabase, "signals", SIGNAL_COLUMNS, "session_id", self.session_ids,
+                            order=["chunk_index", "t0_sec", "signal_id"])
+
+    def _fetch_evidence(self, session_ids: List[str], signals: List[Dict]) -> Tuple[List[Dict], List[Dict], Dict[str, Dict]]:
+        """
+        (candidates, signal links, chunk rows) for the sessions. Tries the aggregate_evidence RPC
+        first: one round trip, one row per distinct chunk with its text and, when pruning is on,
+        the embeddings pruning needs. Falls back to reading retrieval_results and signal_queries
+        row by row, in which case chunk rows are empty and chunks are fetched separately.
+        """
+        if self._aggregate_available:
+            try:
+                rows = self._fetch_evidence_aggregate(session_ids)
+                return expand_aggregate(rows, signals)
+            except Exception as e:
+                logger.warning(f"aggregate_evidence unavailable, fetching candidates and links: {e}")
+                self._aggregate_available = False
+        candidates = self._fetch_evidence_candidates_aggregated(session_ids)
+        links = self._fetch_signal_links(session_ids) if candidates else []
+        return candidates, links, {}
+
+    def _load_chunks(self, candidates: List[Dict], links: List[Dict], chunk_rows: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Distinct candidate chunks (pruned when enabled) with their text, keyed by chunk_id."""
+        chunk_ids = list(set([c["chunk_id"] for c in candidates]))
+        if not chunk_ids:
+            return {}
+        if Config.EVIDENCE_PRUNING_ENABLED:
+            vectors = None
+            if chunk_rows:
+                vectors = {cid: {"embedding": parse_embedding(c.get("embedding")), "token_count": c.get("token_count")}
+                           for cid, c in chunk_rows.items()}
+            chunk_ids = self._prune_evidence(candidates, links, chunk_ids, vectors)
+        if chunk_rows:
+            # The aggregate already carried the text, pruned-away chunks included
+            return {cid: chunk_rows[cid] for cid in chunk_ids if cid in chunk_rows}
+        return self._fetch_chunks(chunk_ids)
+
+    def _fetch_evidence_aggregate(self, session_ids: List[str]) -> List[Dict]:
+        # Text even when pruning: shipping the pruned-away chunks' text costs about what a
+        # follow-up select of the kept chunks would, minus its round trips
+        with_text = True
+        with_embedding = Config.EVIDENCE_PRUNING_ENABLED
+        pool = get_pg_pool()
+        if pool is not None:
+            try:
+                return pool.query(
+                    "SELECT aggregate_evidence(%s::uuid[], %s, %s) AS evidence",
+                    (session_ids, with_text, with_embedding)
+                )[0]["evidence"] or []
+            except Exception as e:
+                logger.warning(f"Direct evidence aggregation failed, using REST: {e}")
+        return self.supabase.rpc("aggregate_evidence", {
+            "p_session_ids": session_ids,
+            "p_with_text": with_text,
+            "p_with_embedding": with_embedding
+        }).execute().data or []
+
+    def _fetch_evidence_candidates_aggregated(self, session_ids: List[str]) -> List[Dict]:
+        # One row per (session, query, chunk); signal links live in signal_queries
+        pool = get_pg_pool()
+        if pool is not None:
+            try:
+                return pool.query(
+                    """SELECT session_id::text AS session_id, query_text, chunk_id::text AS chunk_id, rrf_score
+                       FROM retrieval_results WHERE session_id = ANY(%s::uuid[])""",
+                    (session_ids,)
+                )
+            except Exception as e:
+                logger.warning(f"Direct evidence fetch failed, using REST: {e}")
+        return fetch_all_in(self.supabase, "retrieval_results", "session_id, query_text, chunk_id, rrf_score",
+                            "session_id", session_ids, order=["session_id", "query_text", "chunk_id"])
+
+    def _prune_evidence(self, candidates: List[Dict], links: List[Dict], chunk_ids: List[str],
+                        vectors: Optional[Dict[str, Dict]] = None) -> List[str]:
+        # Per-signal MMR over chunk embeddings: near-duplicate paragraphs and repeated
+        # definitions don't all need to reach the prompt
+        try:
+            if vectors is None:
+                vectors = self._fetch_chunk_vectors(chunk_ids)
+            embeddings = {cid: v["embedding"] for cid, v in vectors.items() if v["embedding"] is not None}
+            kept, stats = prune_evidence(
+                signal_relevance(candidates, links), embeddings,
+                Config.EVIDENCE_PER_SIGNAL, Config.EVIDENCE_MMR_LAMBDA, Config.EVIDENCE_DUP_THRESHOLD
+            )
+        except Exception as e:
+            logger.warning(f"Evidence pruning failed, using all {len(chunk_ids)} chunks: {e}")
+            return chunk_ids
+        if not kept:
+            return chunk_ids
+
+        tokens_before = sum(v["token_count"] or 0 for v in vectors.values())
+        tokens_after = sum(vectors[cid]["token_count"] or 0 for cid in kept)
+        self._log(
+            f"Evidence pruning: {len(chunk_ids)} -> {len(kept)} chunks, ~{tokens_before} -> ~{tokens_after} tokens "
+            f"({1 - tokens_after / tokens_before if tokens_before else 0:.0%} saved), "
+            f"signal coverage {stats['signals_covered']}/{stats['signals_with_evidence']}, "
+            f"relevance kept {stats['relevance_kept']:.0%} (budget {Config.EVIDENCE_PER_SIGNAL}/signal)"
+        )
+        return list(kept)
+
+    def _fetch_signal_links(self, session_ids: List[str]) -> List[Dict]:
+        pool = get_pg_pool()
+        if pool is not None:
+            try:
+                return pool.query(
+                    """SELECT session_id::text AS session_id, signal_id::text AS signal_id, query_text
+                       FROM signal_queries WHERE session_id = ANY(%s::uuid[])""",
+                    (session_ids,)
+                )
+            except Exception as e:
+                logger.warning(f"Direct signal link fetch failed, using REST: {e}")
+        return fetch_all_in(self.supabase, "signal_queries", "session_id, signal_id, query_text",
+                            "session_id", session_ids, order=["session_id", "signal_id", "query_text"])
+
+    def _fetch_chunk_vectors(self, chunk_ids: List[str]) -> Dict[str, Dict]:
+        """chunk_id -> {embedding (float32 array or None), token_count}, without the chunk text."""
+        rows = None
+        pool = get_pg_pool()
+        if pool is not None:
+            try:
+                rows = pool.query(
+                    """SELECT chunk_id::text AS chunk_id, embedding::text AS embedding, token_count
+                       FROM chunks WHERE chunk_id = ANY(%s::uuid[])""",
+                    (chunk_ids,)
+                )
+            except Exception as e:
+                logger.warning(f"Direct chunk vector fetch failed, using REST: {e}")
+        if rows is None:
+            rows = []
+            for page in fetch_by_ids(self.supabase, "chunks", "chunk_id, embedding, token_count", "chunk_id", chunk_ids):
+                rows.extend(page)
+        return {r["chunk_id"]: {"embedding": parse_embedding(r.get("embedding")), "token_count": r.get("token_count")} for r in rows}
 
     def _fetch_chunks(self, chunk_ids: List[str]) -> Dict[str, Dict]:
         if not chunk_ids: return {}
-        # Batching might be needed if really large
-        res = self.supabase.table("chunks").select("*").in_("chunk_id", chunk_ids).execute()
-        return {c["chunk_id"]: c for c in res.data}
-
-
-    def _assemble_context(self, meta: Dict, signals: List[Dict], candidates: List[Dict], chunks_map: Dict) -> str:
-        # A. Session Info
-        context = f"## Exam Session Info\n"
-        context += f"- Subject: {meta.get('subject_name')}\n"
-        context += f"- Exam Window: {meta.get('exam_window')}\n"
-        context += f"- Audio URL: {meta.get('gcs_audio_url')}\n\n"
-        
-        # B. Signals Timeline
-        context += "## Audio Signals Timeline\n"
-        for s in signals:
-            line = f"[#SIGNAL id={s['signal_id']} t={s['chunk_index']}:{s['t0_sec']:.1f}-{s['t1_sec']:.1f} type={s['signal_type']}] {s['content']}"
-            context += line + "\n"
-        context += "\n"
-        
-        # C. Evidence References (Textbook Chunks)
-        context += "## Textbook Reference Blocks\n"
-        # We need to filter which chunks are actually relevant. 
-        # But Phase 3 already filtered them via candidates.
-        # Just dump the unique chunks found in candidates.
-        
-        # Sort chunks possibly? By page_num if available?
-        # Let's simple dump.
-        
-        used_chunk_ids = set()
-        
-        # Group candidates by chunk_id to maybe show relevance score? 
-        # Simplest: just dump content.
-        
-        # Map source_id to title for better context? (Optional, skip for simpler impl)
-        
-        for chunk_id, chunk in chunks_map.items():
-            header = f"[[CHUNK id={chunk_id} page={chunk.get('page_start')}-{chunk.get('page_end')} anchor={chunk.get('anchor_path')}]]"
-            body = chunk.get("content_text", "").strip()
-            context += f"{header}\n{body}\n\n"
-            
+        pool = get_pg_pool()
+        if pool is not None:
+            try:
+                rows = pool.query(
+                    """SELECT chunk_id::text AS chunk_id, source_id::text AS source_id, content_text,
+                              page_start, page_end, anchor_path
+                       FROM chunks WHERE chunk_id = ANY(%s::uuid[])""",
+                    (chunk_ids,)
+                )
+                return {c["chunk_id"]: c for c in rows}
+            except Exception as e:
+                logger.warning(f"Direct chunk fetch failed, using REST: {e}")
+        # Text columns only, in concurrent pages of ids; the map fills as pages arrive
+        chunks_map = {}
+        for page in fetch_by_ids(self.supabase, "chunks", CHUNK_COLUMNS, "chunk_id", chunk_ids):
+            chunks_map.update((c["chunk_id"], c) for c in page)
+        return chunks_map
+
+
+    def _assemble_context(self, meta: Dict, signals: List[Dict], candidates: List[Dict],
+                          links: List[Dict], chunks_map: Dict) -> str:
+        # Full signal timeline + the best-ranked reference blocks that fit CONTEXT_TOKEN_BUDGET
+        context, breakdown = ContextPacker(Config.CONTEXT_TOKEN_BUDGET).pack(meta, signals, candidates, links, chunks_map)
+        self._log(
+            f"Context: ~{breakdown['total']}/{breakdown['budget']} tokens "
+            f"(header {breakdown['header']}, signals {breakdown['signals']}, references {breakdown['references']}); "
+            f"{breakdown['chunks_included']} reference blocks included, {breakdown['chunks_dropped']} dropped for budget"
+        )
         return context
 
-    def _call_gemini_reasoning(self, prompt_context: str) -> Dict:
-        system_prompt = """
-[ROLE]
-You are the "Grand Master" TA for an exam preparation service.
-Your goal is to synthesize audio signals (professor's speech) and textbook references to create a high-quality exam preparation report.
+    def _partition_sessions(self, signals: List[Dict]) -> List[List[str]]:
+        mode = Config.REASONING_MODE
+        if mode == "single" or len(self.session_ids) < 2:
+            return [self.session_ids]
+        if mode == "auto" and len(signals) <= Config.REASONING_PARTITION_SIGNALS:
+            return [self.session_ids]
+        return partition_sessions(self.session_ids, signals, Config.REASONING_PARTITION_SIGNALS)
+
+    def _reason_hierarchical(self, partitions: List[List[str]], meta: Dict, signals: List[Dict],
+                             candidates: List[Dict], links: List[Dict], chunks_map: Dict) -> Dict:
+        """
+        Map: one reasoning call per partition (REASONING_CONCURRENCY at a time), each with only
+        its sessions' signals and evidence. Reduce: one small merge call over the partial reports.
+        A failed partition is logged and left out instead of failing the whole report; its
+        sessions are recorded in _incomplete_sessions.
+        """
+        def reason_partition(part_sessions: List[str]) -> Dict:
+            part = set(part_sessions)
+            part_signals = [s for s in signals if s.get("session_id") in part]
+            part_candidates = [c for c in candidates if c["session_id"] in part]
+            part_links = [l for l in links if l["session_id"] in part]
+            part_chunk_ids = {c["chunk_id"] for c in part_candidates}
+            part_chunks = {cid: chunk for cid, chunk in chunks_map.items() if cid in part_chunk_ids}
+            context, _ = ContextPacker(Config.CONTEXT_TOKEN_BUDGET).pack(
+                meta, part_signals, part_candidates, part_links, part_chunks
+            )
+            return self._validate_and_clean_report(self._call_gemini_reasoning(context), part_chunks)
+
+        self._log(
+            f"Hierarchical reasoning: {len(partitions)} partitions of up to {Config.REASONING_PARTITION_SIGNALS} signals, "
+            f"{Config.REASONING_CONCURRENCY} in parallel ({Config.REASONING_MODEL_NAME})..."
+        )
+        started = time.monotonic()
+        results = {}
+        workers = min(Config.REASONING_CONCURRENCY, len(partitions))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reasoning") as executor:
+            futures = {executor.submit(reason_partition, p): i for i, p in enumerate(partitions)}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    self._log(f"Partial reasoning failed for sessions {partitions[futures[future]]}: {e}")
+                    self._degraded = True
+                    self._incomplete_sessions.extend(partitions[futures[future]])
+        partials = [results[i] for i in sorted(results)] # week order, whatever finished first
+        if not partials:
+            raise RuntimeError(f"All {len(partitions)} partial reasoning calls failed")
+        self._log(f"{len(partials)}/{len(partitions)} partial reports done in {time.monotonic() - started:.1f}s. Merging...")
+
+        if len(partials) == 1:
+            return partials[0]
+        items = index_partial_items(partials)
+        try:
+            merged = expand_merged(self._call_gemini_json(MERGE_SYSTEM_PROMPT, merge_input(items)), items)
+        except Exception as e:
+            self._log(f"Merge call failed, merging partial reports by title: {e}")
+            self._degraded = True
+            merged = merge_partial_reports(partials)
+        return self._validate_and_clean_report(merged, chunks_map)
+
+    def _reason_delta(self, state: Dict, meta: Dict, signals: List[Dict], candidates: List[Dict],
+                      links: List[Dict], chunks_map: Dict) -> Dict:
+        """
+        One call with the stored report's items (ids, titles, no refs) and only the new sessions'
+        context. New refs must cite the new chunks; existing items keep their refs.
+        """
+        if not signals:
+            return state["items"]
+        items = index_partial_items([state["items"]])
+        context, breakdown = ContextPacker(Config.CONTEXT_TOKEN_BUDGET).pack(meta, signals, candidates, links, chunks_map)
+        prompt = delta_context(merge_input(items), context)
+        self._log(
+            f"Calling {Config.REASONING_MODEL_NAME} for a delta update: {len(items)} existing items + "
+            f"~{breakdown['total']} tokens of new lectures..."
+        )
+        delta = self._validate_and_clean_report(self._call_gemini_json(DELTA_SYSTEM_PROMPT, prompt), chunks_map)
+        return expand_merged(delta, items)
+
+    def _load_report_state(self, signals: List[Dict]) -> Optional[Dict]:
+        try:
+            states = self.supabase.table("report_states")\
+                .select("report_state_id, session_ids, session_fingerprints")\
+                .eq("subject_id", self.subject_id)\
+                .eq("exam_window", self.exam_window)\
+                .eq("model_name", Config.REASONING_MODEL_NAME)\
+                .order("created_at", desc=True)\
+                .limit(Config.REPORT_STATE_KEEP)\
+                .execute().data
+            if not states:
+                return None
+            fingerprints = session_fingerprints(signals, self._session_evidence_fingerprints())
+            state = find_reusable_state(states, self.session_ids, fingerprints)
+            if state is None:
+                return None
+            new_sessions = set(self.session_ids) - set(state["session_ids"])
+            new_signals = sum(1 for s in signals if s["session_id"] in new_sessions)
+            if new_signals > Config.REASONING_PARTITION_SIGNALS:
+                # Too much new material for one delta call; the full (hierarchical) path handles it
+                logger.info(f"{new_signals} new signals exceed one partition; not updating incrementally.")
+                return None
+            state["items"] = self.supabase.table("report_states")\
+                .select("items")\
+                .eq("report_state_id", state["report_state_id"])\
+                .single()\
+                .execute().data["items"]
+            return state
+        except Exception as e:
+            logger.warning(f"Report state unavailable, reasoning over all sessions: {e}")
+            return None
 
-[INPUT]
-1. Session Info: Subject and exam scope.
-2. Signal Timeline: List of important signals detected in audio.
-3. Reference Blocks: Textbook chunks retrieved based on signals.
+    def _session_evidence_fingerprints(self) -> Dict[str, str]:
+        """session_id -> fingerprint of its retrieved chunk ids; sessions without evidence are absent."""
+        pool = get_pg_pool()
+        if pool is not None:
+            try:
+                return pool.query(
+                    "SELECT session_evidence_fingerprints(%s::uuid[]) AS fps", (self.session_ids,)
+                )[0]["fps"] or {}
+            except Exception as e:
+                logger.warning(f"Direct session evidence fingerprints failed, using REST: {e}")
+        return self.supabase.rpc("session_evidence_fingerprints", {"p_session_ids": self.session_ids}).execute().data or {}
 
-[TASK]
-1. Correlate audio signals with specific textbook chunks.
-2. Filter out signals that are repetitive or trivial.
-3. Classify remaining items into 3 categories:
-   - professor_mentioned: Explicitly emphasized by professor ("This will be on the exam", "Important").
-   - likely: High probability based on signal + matching textbook content.
-   - trap_warnings: Specific misconceptions or tricky points mentioned.
+    def _input_fingerprint(self, meta: Dict, signals: List[Dict]) -> Optional[str]:
+        """input_fingerprint() of this run, or None when the evidence can't be fingerprinted or is empty."""
+        try:
+            pool = get_pg_pool()
+            evidence = None
+            if pool is not None:
+                try:
+                    evidence = pool.query("SELECT evidence_fingerprint(%s::uuid[]) AS fp", (self.session_ids,))[0]["fp"]
+                except Exception as e:
+                    logger.warning(f"Direct evidence fingerprint failed, using REST: {e}")
+            if evidence is None:
+                evidence = self.supabase.rpc("evidence_fingerprint", {"p_session_ids": self.session_ids}).execute().data
+        except Exception as e:
+            logger.warning(f"Evidence fingerprint unavailable, report cache skipped: {e}")
+            return None
+        if not evidence or evidence == EMPTY_EVIDENCE:
+            return None # retrieval still has to run
+        settings = {
+            "context_token_budget": Config.CONTEXT_TOKEN_BUDGET,
+            "evidence_pruning": [Config.EVIDENCE_PRUNING_ENABLED, Config.EVIDENCE_PER_SIGNAL,
+                                 Config.EVIDENCE_MMR_LAMBDA, Config.EVIDENCE_DUP_THRESHOLD],
+            "reasoning": [Config.REASONING_MODE, Config.REASONING_PARTITION_SIGNALS],
+        }
+        return input_fingerprint(
+            self.session_ids, meta, signals, evidence, Config.REASONING_MODEL_NAME,
+            prompt_version(REASONING_SYSTEM_PROMPT, MERGE_SYSTEM_PROMPT, DELTA_SYSTEM_PROMPT), settings
+        )
 
-[OUTPUT SCHEMA (JSON Only)]
-{
-  "professor_mentioned": [
-    {
-      "title": "Topic Name",
-      "why": "Explanation citing audio and text",
-      "confidence": 0.0-1.0,
-      "audio_refs": [{"signal_id": "..."}],
-      "citations": [{"chunk_id": "...", "reason": "..."}]
-    }
-  ],
-  "likely": [...],
-  "trap_warnings": [...]
-}
+    def _find_cached_report(self, fingerprint: str) -> Optional[Dict]:
+        try:
+            rows = self.supabase.table("report_states")\
+                .select("items, created_at")\
+                .eq("subject_id", self.subject_id)\
+                .eq("input_fingerprint", fingerprint)\
+                .order("created_at", desc=True)\
+                .limit(1)\
+                .execute().data
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.warning(f"Report cache unavailable: {e}")
+            return None
 
-[CONSTRAINTS]
-- If a signal has NO matching textbook reference but is very explicit in audio, keep it but note "Textbook reference missing" in 'why'.
-- If a Reference Block is not relevant to any signal, ignore it.
-- Use EXACT chunk_ids from input in citations.
-- Return VALID JSON only.
-- **IMPORTANT**: Write the report entirely in KOREAN (한국어). The 'title' and 'why' fields MUST be in Korean.
-"""
+    def _save_report_state(self, signals: List[Dict], report: Dict, fingerprint: Optional[str] = None):
+        try:
+            fingerprints = session_fingerprints(signals, self._session_evidence_fingerprints())
+        except Exception as e:
+            logger.warning(f"Session evidence fingerprints unavailable, report state not saved: {e}")
+            return
+        state = {
+            "subject_id": self.subject_id,
+            "exam_window": self.exam_window,
+            "model_name": Config.REASONING_MODEL_NAME,
+            "session_ids": self.session_ids,
+            "session_fingerprints": {sid: fingerprints.get(sid) for sid in self.session_ids},
+            "items": report
+        }
+        if fingerprint:
+            state["input_fingerprint"] = fingerprint
+        try:
+            self.supabase.table("report_states").insert(state).execute()
+            self.supabase.rpc("prune_report_states", {
+                "p_subject_id": self.subject_id,
+                "p_keep": Config.REPORT_STATE_KEEP
+            }).execute()
+        except Exception as e:
+            logger.warning(f"Failed to save report state: {e}")
+
+    def _call_gemini_json(self, system_prompt: str, contents: str) -> Dict:
+        response = self.client.models.generate_content(
+            model=Config.REASONING_MODEL_NAME,
+            contents=contents,
+            config=types.GenerateContentConfig(
+                system_instruction=system_prompt,
+                response_mime_type="application/json"
+            )
+        )
+        return json.loads(response.text)
+
+    def _call_gemini_reasoning(self, prompt_context: str) -> Dict:
         # Call Gemini 3.0 Flash with Thinking Mode
         logger.info(f"Calling {Config.REASONING_MODEL_NAME} with Thinking Mode (HIGH) [DEBUG: {Config.REASONING_MODEL_NAME}]")
         
@@ -237,7 +641,7 @@ Your goal is to synthesize audio signals (professor's speech) and textbook refer
                 model=Config.REASONING_MODEL_NAME,
                 contents=prompt_context,
                 config=types.GenerateContentConfig(
-                    system_instruction=system_prompt,
+                    system_instruction=REASONING_SYSTEM_PROMPT,
                     response_mime_type="application/json"
                 )
             )
@@ -0,0 +1,38 @@
+import hashlib
+import json
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# evidence_fingerprint() of a session set without any retrieval results (md5 of '')
+EMPTY_EVIDENCE = hashlib.md5(b"").hexdigest()
+
+
+def prompt_version(*prompts: str) -> str:
+    """Short hash of the system prompts; editing any of them invalidates cached reports."""
+    return hashlib.sha256("\n\x00".join(prompts).encode()).hexdigest()[:12]
+
+
+def input_fingerprint(session_ids: List[str], meta: Dict, signals: List[Dict], evidence: str,
+                      model_name: str, prompt_version: str, settings: Dict) -> str:
+    """
+    Stable hash of what a Phase 4 report is generated from: the session set, subject and exam
+    window, every signal as it appears in the prompt timeline, the retrieved chunk ids
+    (evidence_fingerprint in phase4/report_cache.sql), the model, the prompt version and the
+    settings that shape the context (budget, pruning, reasoning mode).
+    """
+    payload = {
+        "sessions": sorted(session_ids),
+        "subject": meta.get("subject_name"),
+        "exam_window": meta.get("exam_window"),
+        "signals": sorted(
+            [s["signal_id"], s.get("signal_type"), s.get("chunk_index"), s.get("t0_sec"), s.get("t1_sec"), s.get("content")]
+            for s in signals
+        ),
+        "evidence": evidence,
+        "model": model_name,
+        "prompt": prompt_version,
+        "settings": settings,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode()).hexdigest()
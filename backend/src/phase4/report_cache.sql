@@ -0,0 +1,26 @@
+-- Phase 4 report cache (phase4/report_cache.py)
+-- 입력(세션, signals, 근거 chunk, 모델, 프롬프트)이 그대로면 저장된 리포트를 재사용하고 모델 호출을 건너뛴다.
+-- report_state.sql 적용 이후 실행
+--
+-- input_fingerprint : hash of everything the report was generated from; NULL for states saved
+--                     before this patch (never matched)
+
+ALTER TABLE report_states ADD COLUMN IF NOT EXISTS input_fingerprint text;
+
+CREATE INDEX IF NOT EXISTS report_states_input_idx
+ON report_states(subject_id, input_fingerprint);
+
+-- md5 of the sorted distinct chunk ids retrieved for the sessions (Phase 3 output),
+-- so the cache check doesn't ship the evidence itself
+CREATE OR REPLACE FUNCTION evidence_fingerprint(p_session_ids UUID[])
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT md5(COALESCE(string_agg(chunk_id::text, ',' ORDER BY chunk_id::text), ''))
+  FROM (
+    SELECT DISTINCT chunk_id
+    FROM retrieval_results
+    WHERE session_id = ANY(p_session_ids)
+  ) c;
+$$;
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from src.phase4.report_cache import EMPTY_EVIDENCE
+
+logger = logging.getLogger(__name__)
+
+DELTA_SYSTEM_PROMPT = """
+[ROLE]
+You are the "Grand Master" TA for an exam preparation service.
+An exam preparation report already exists for earlier lectures of this course. New lectures were added.
+Update the report with the new lectures only.
+
+[INPUT]
+1. Current Report Items: existing items, each with an "id", "category", "title", "why" and "confidence".
+2. Session Info, Signal Timeline and Reference Blocks of the NEW lectures only.
+
+[TASK]
+1. For each important new signal, either attach it to the existing item about the same topic
+   (list that item's id in "merged_from"; raise confidence if the professor repeats the topic)
+   or create a new item (empty "merged_from").
+2. Cite textbook chunks from the new Reference Blocks that support the new signals.
+3. Filter out new signals that are repetitive or trivial.
+4. Existing items you do not mention stay in the report unchanged.
+
+[OUTPUT SCHEMA (JSON Only)]
+{
+  "professor_mentioned": [
+    {
+      "title": "Topic Name",
+      "why": "Explanation citing audio and text (updated if merged)",
+      "confidence": 0.0-1.0,
+      "merged_from": ["<existing id>"],
+      "audio_refs": [{"signal_id": "<new signal>"}],
+      "citations": [{"chunk_id": "<new chunk>", "reason": "..."}]
+    }
+  ],
+  "likely": [...],
+  "trap_warnings": [...]
+}
+
+[CONSTRAINTS]
+- Each existing id may appear in at most one "merged_from" list.
+- audio_refs and citations list only NEW signal_ids / chunk_ids from the input; existing refs are kept automatically.
+- Return VALID JSON only.
+- **IMPORTANT**: Write the report entirely in KOREAN (한국어). The 'title' and 'why' fields MUST be in Korean.
+"""
+
+
+def session_fingerprints(signals: List[Dict], evidence: Dict[str, str]) -> Dict[str, str]:
+    """
+    session_id -> hash of its signals as they appear in the prompt timeline and of its evidence
+    (session_evidence_fingerprints in phase4/report_state.sql). Changes when Phase 2 re-extracts
+    or Phase 3 re-retrieves the session.
+    """
+    by_session = defaultdict(list)
+    for s in signals:
+        by_session[s["session_id"]].append(
+            [s["signal_id"], s.get("signal_type"), s.get("chunk_index"), s.get("t0_sec"), s.get("t1_sec"), s.get("content")]
+        )
+    return {
+        sid: hashlib.sha256(json.dumps(
+            {"signals": sorted(rows), "evidence": evidence.get(sid, EMPTY_EVIDENCE)},
+            sort_keys=True, ensure_ascii=False, default=str
+        ).encode()).hexdigest()[:16]
+        for sid, rows in by_session.items()
+    }
+
+
+def find_reusable_state(states: List[Dict], session_ids: List[str], fingerprints: Dict[str, str]) -> Optional[Dict]:
+    """
+    The state covering the most of `session_ids` (newest first on ties) whose sessions are all
+    still requested and unchanged, and which leaves at least one session to add. None otherwise.
+    """
+    requested = set(session_ids)
+    best = None
+    for state in states:
+        covered = set(state["session_ids"])
+        if not covered or not covered < requested:
+            continue
+        if any(fingerprints.get(sid) != state["session_fingerprints"].get(sid) for sid in covered):
+            continue
+        if best is None or len(covered) > len(best["session_ids"]):
+            best = state
+    return best
+
+
+def delta_context(items_input: str, new_context: str) -> str:
+    """Prompt for the delta call: current items (merge_input format) followed by the new lectures' context."""
+    return f"## Current Report Items\n{items_input}\n\n{new_context}"
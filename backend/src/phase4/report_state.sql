@@ -0,0 +1,65 @@
+-- Incremental Phase 4 reports (phase4/report_state.py)
+-- 리포트마다 최종 항목(+근거 signal_id / chunk_id)을 저장해 두고, 세션이 추가되면
+-- 새 세션의 signals/evidence와 이전 상태만 delta 호출로 보낸다.
+--
+-- items            : the report as saved ({professor_mentioned, likely, trap_warnings}, refs included)
+-- session_ids      : sessions the report covers
+-- session_fingerprints : session_id -> hash of its signals (ids and prompt fields) and of its
+--                        retrieved chunk ids; a session whose signals or evidence changed
+--                        (Phase 2 / Phase 3 rerun) makes the state unusable
+
+CREATE TABLE IF NOT EXISTS report_states (
+  report_state_id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  subject_id uuid NOT NULL REFERENCES subjects(subject_id) ON DELETE CASCADE,
+  exam_window text NOT NULL,
+  model_name text NOT NULL,
+
+  session_ids uuid[] NOT NULL,
+  session_fingerprints jsonb NOT NULL,
+  items jsonb NOT NULL,
+
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS report_states_subject_idx
+ON report_states(subject_id, exam_window, created_at DESC);
+
+-- Keeps the p_keep newest states of a subject. Returns the number of deleted rows.
+CREATE OR REPLACE FUNCTION prune_report_states(p_subject_id UUID, p_keep INT)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_deleted INT;
+BEGIN
+  DELETE FROM report_states r
+  WHERE r.subject_id = p_subject_id
+    AND r.report_state_id NOT IN (
+      SELECT report_state_id FROM report_states
+      WHERE subject_id = p_subject_id
+      ORDER BY created_at DESC
+      LIMIT p_keep
+    );
+  GET DIAGNOSTICS v_deleted = ROW_COUNT;
+  RETURN v_deleted;
+END;
+$$;
+
+-- session_id -> md5 of the session's sorted distinct retrieved chunk ids (evidence_fingerprint
+-- per session). Sessions without retrieval results are left out.
+CREATE OR REPLACE FUNCTION session_evidence_fingerprints(p_session_ids UUID[])
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT COALESCE(jsonb_object_agg(session_id, fp), '{}'::jsonb)
+  FROM (
+    SELECT session_id, md5(string_agg(chunk_id::text, ',' ORDER BY chunk_id::text)) AS fp
+    FROM (
+      SELECT DISTINCT session_id, chunk_id
+      FROM retrieval_results
+      WHERE session_id = ANY(p_session_ids)
+    ) d
+    GROUP BY session_id
+  ) f;
+$$;
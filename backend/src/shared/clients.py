@@ -0,0 +1,140 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import google.auth
+from google.auth.transport import requests as google_requests
+from google.cloud import storage
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Refresh access tokens this long before they actually expire so a signed URL
+# handed to ffmpeg/ffprobe never carries a token that dies mid-request.
+CREDENTIAL_REFRESH_MARGIN = timedelta(minutes=5)
+
+_lock = threading.RLock()
+_credentials_lock = threading.Lock()
+
+_storage_client: Optional[storage.Client] = None
+_credentials = None
+_vertex_location: Optional[str] = None
+_generative_models: Dict[Tuple[str, str], object] = {}
+_embedding_models: Dict[Tuple[str, str], object] = {}
+_genai_clients: Dict[str, object] = {}
+
+
+def get_storage_client() -> storage.Client:
+    """Returns the process-wide GCS client (created on first use)."""
+    global _storage_client
+    if _storage_client is None:
+        with _lock:
+            if _storage_client is None:
+                _storage_client = storage.Client(project=Config.GCP_PROJECT)
+    return _storage_client
+
+
+def get_credentials():
+    """
+    Returns default credentials, refreshed only when the cached token is
+    missing or within CREDENTIAL_REFRESH_MARGIN of expiry.
+    """
+    global _credentials
+    with _credentials_lock:
+        if _credentials is None:
+            _credentials, _ = google.auth.default()
+
+        if _needs_refresh(_credentials):
+            logger.info("Refreshing cached GCP credentials.")
+            _credentials.refresh(google_requests.Request())
+        return _credentials
+
+
+def _needs_refresh(credentials) -> bool:
+    # Only service-account style creds (Cloud Run) are used for IAM signing.
+    if not getattr(credentials, "service_account_email", None):
+        return False
+    if not credentials.token or credentials.expiry is None:
+        return True
+    # google-auth stores expiry as naive UTC
+    return credentials.expiry - datetime.utcnow() < CREDENTIAL_REFRESH_MARGIN
+
+
+def generate_signed_url(blob: storage.Blob, expiration: timedelta) -> str:
+    """Signs a GCS blob URL using the cached credentials."""
+    credentials = get_credentials()
+
+    # In Cloud Run (Compute Engine creds), we don't have a private key.
+    # Newer versions of google-cloud-storage support IAM signing natively
+    # if access_token and service_account_email are provided.
+    if getattr(credentials, "service_account_email", None):
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=expiration,
+            service_account_email=credentials.service_account_email,
+            access_token=credentials.token
+        )
+    # Fallback for local development where creds likely have a private key
+    return blob.generate_signed_url(expiration=expiration)
+
+
+def init_vertexai(location: str = None):
+    """Calls vertexai.init once per location instead of once per request."""
+    global _vertex_location
+    location = location or Config.VERTEX_LOCATION
+    if _vertex_location == location:
+        return
+    with _lock:
+        if _vertex_location != location:
+            import vertexai
+            vertexai.init(project=Config.GCP_PROJECT, location=location)
+            _vertex_location = location
+
+
+def get_generative_model(model_name: str, location: str = None):
+    """Returns a shared vertexai GenerativeModel for (model, location)."""
+    location = location or Config.GEMINI_LOCATION
+    key = (model_name, location)
+    model = _generative_models.get(key)
+    if model is None:
+        with _lock:
+            model = _generative_models.get(key)
+            if model is None:
+                from vertexai.generative_models import GenerativeModel
+                init_vertexai(location)
+                model = GenerativeModel(model_name)
+                _generative_models[key] = model
+    return model
+
+
+def get_embedding_model(model_name: str = None, location: str = None):
+    """Returns a shared TextEmbeddingModel (from_pretrained runs once)."""
+    model_name = model_name or Config.EMBEDDING_MODEL_NAME
+    location = location or Config.VERTEX_LOCATION
+    key = (model_name, location)
+    model = _embedding_models.get(key)
+    if model is None:
+        with _lock:
+            model = _embedding_models.get(key)
+            if model is None:
+                from vertexai.language_models import TextEmbeddingModel
+                init_vertexai(location)
+                model = TextEmbeddingModel.from_pretrained(model_name)
+                _embedding_models[key] = model
+    return model
+
+
+def get_genai_client(location: str = None):
+    """Returns a shared google-genai client bound to Vertex AI."""
+    location = location or Config.GEMINI_LOCATION
+    client = _genai_clients.get(location)
+    if client is None:
+        with _lock:
+            client = _genai_clients.get(location)
+            if client is None:
+                from google import genai
+                client = genai.Client(vertexai=True, project=Config.GCP_PROJECT, location=location)
+                _genai_clients[location] = client
+    return client
@@ -13,6 +13,14 @@ class Config:
     SUPABASE_URL = os.getenv("SUPABASE_URL")
     # Prefer SUPABASE_SERVICE_ROLE_KEY, fall back to SUPABASE_KEY
     SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_KEY")
+    # Optional direct Postgres connection (shared/pg.py); heavy paths fall back to REST when unset
+    DATABASE_URL = os.getenv("SUPABASE_DB_URL") or os.getenv("DATABASE_URL")
+    # Max pooled connections per phase ("phase:size,..."), e.g. Phase 2's 50 dispatcher threads share 16
+    PG_POOL_SIZES = {
+        phase: int(size)
+        for phase, size in (item.split(":") for item in os.getenv("PG_POOL_SIZES", "1:4,split:16,2:8,3:8,4:8").split(","))
+    }
+    PG_POOL_DEFAULT_SIZE = int(os.getenv("PG_POOL_DEFAULT_SIZE", "4"))
     
     # Gemini Configuration
     GEMINI_LOCATION = "us-central1"
@@ -28,6 +36,60 @@ class Config:
     # Pipeline Settings
     INGEST_BATCH_PAGES = int(os.getenv("INGEST_BATCH_PAGES", "20"))
     EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "8"))
+    # k-means topic index per source at the end of Phase 1 (phase1/topic_index.sql)
+    TOPIC_INDEX_ENABLED = os.getenv("TOPIC_INDEX_ENABLED", "true").lower() == "true"
+    # Query embedding cache: in-process LRU entries / persistent table rows (phase3/embedding_cache.sql)
+    EMBED_CACHE_MEMORY_SIZE = int(os.getenv("EMBED_CACHE_MEMORY_SIZE", "20000"))
+    EMBED_CACHE_MAX_ROWS = int(os.getenv("EMBED_CACHE_MAX_ROWS", "200000"))
+    # Cosine similarity at which near-duplicate search queries share one search (>= 1.0 disables).
+    # Off by default: collapsing cost ~14% evidence recall at 0.93 on synthetic paraphrases
+    # (scripts/bench_query_consolidation.py); enable only with a threshold validated on real queries.
+    QUERY_CLUSTER_THRESHOLD = float(os.getenv("QUERY_CLUSTER_THRESHOLD", "1.0"))
+    # Cross-session query -> results cache per subject, invalidated by source changes (phase3/retrieval_cache.sql)
+    RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+    RETRIEVAL_CACHE_MAX_ROWS = int(os.getenv("RETRIEVAL_CACHE_MAX_ROWS", "200000"))
+    # Queries per hybrid_search_rrf_batch RPC (phase3/hybrid_search_batch_rpc.sql)
+    SEARCH_BATCH_SIZE = int(os.getenv("SEARCH_BATCH_SIZE", "32"))
+    # Phase 3 search backend: "rpc" (hybrid_search_rrf_batch) or "local" (in-memory index, phase3/local_search.py)
+    RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "rpc").lower()
+    # Concurrent search batches when the direct Postgres pool is available (REST stays sequential)
+    SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "4"))
+    # Keyword half of hybrid search: "trgm" (whole-chunk similarity), "word" (word_similarity) or "fts" (content_tsv).
+    # "trgm" returns no hits for short queries (scripts/bench_keyword_channel.py); the local backend supports "trgm" and "fts"
+    KEYWORD_CHANNEL = os.getenv("KEYWORD_CHANNEL", "fts").lower()
+    # Vector half of hybrid search: "full" (halfvec HNSW), "binary" (bit-quantized prefilter + halfvec rescoring)
+    # or "routed" (IVF-style: only the chunks of each query's nearest topics, phase1/topic_index.sql)
+    VECTOR_TIER = os.getenv("VECTOR_TIER", "full").lower()
+    # Phase 4 evidence pruning: MMR-selected chunks per signal before the prompt (phase4/evidence_pruning.py)
+    EVIDENCE_PRUNING_ENABLED = os.getenv("EVIDENCE_PRUNING_ENABLED", "true").lower() == "true"
+    EVIDENCE_PER_SIGNAL = int(os.getenv("EVIDENCE_PER_SIGNAL", "6"))
+    # Relevance vs novelty trade-off (1.0 = relevance only) and cosine at which a chunk counts as a near-duplicate
+    EVIDENCE_MMR_LAMBDA = float(os.getenv("EVIDENCE_MMR_LAMBDA", "0.7"))
+    EVIDENCE_DUP_THRESHOLD = float(os.getenv("EVIDENCE_DUP_THRESHOLD", "0.95"))
+    # Estimated prompt tokens for Phase 4's context; the signal timeline always goes in, references fill the rest
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "200000"))
+    # Phase 4 reasoning: "single" (one call), "hierarchical" (per-partition calls + merge) or
+    # "auto" (hierarchical once the sessions have more than REASONING_PARTITION_SIGNALS signals)
+    REASONING_MODE = os.getenv("REASONING_MODE", "auto").lower()
+    REASONING_PARTITION_SIGNALS = int(os.getenv("REASONING_PARTITION_SIGNALS", "200"))
+    REASONING_CONCURRENCY = int(os.getenv("REASONING_CONCURRENCY", "4"))
+    # Update the last stored report with only the newly added sessions (phase4/report_state.sql)
+    REPORT_INCREMENTAL = os.getenv("REPORT_INCREMENTAL", "true").lower() == "true"
+    REPORT_STATE_KEEP = int(os.getenv("REPORT_STATE_KEEP", "10"))
+    # Reuse the stored report when Phase 4's inputs are unchanged (phase4/report_cache.sql)
+    REPORT_CACHE_ENABLED = os.getenv("REPORT_CACHE_ENABLED", "true").lower() == "true"
+    # Coalesced audio_chunks status writes (see shared/status_writer.py)
+    STATUS_FLUSH_INTERVAL_SEC = float(os.getenv("STATUS_FLUSH_INTERVAL_SEC", "2"))
+    # Concurrent REST pages for large id-list selects (see shared/paged_fetch.py). Sequential by default:
+    # concurrent large payloads on the shared HTTP/2 client cause Protocol Errors; big reads take the pg pool
+    FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "1"))
+    # Buffered job progress logs (see shared/job_log.py); sessions.logs keeps the last JOB_LOG_TAIL entries
+    JOB_LOG_FLUSH_INTERVAL_SEC = float(os.getenv("JOB_LOG_FLUSH_INTERVAL_SEC", "1"))
+    JOB_LOG_TAIL = int(os.getenv("JOB_LOG_TAIL", "200"))
+    # Search each chunk's signals as soon as Phase 2 inserts them (Phase 3 overlaps Phase 2)
+    PIPELINED_RETRIEVAL = os.getenv("PIPELINED_RETRIEVAL", "false").lower() == "true"
+    # Reuse Phase 2 signals for byte-identical audio slices (phase2/signal_cache.sql)
+    SIGNAL_CACHE_ENABLED = os.getenv("SIGNAL_CACHE_ENABLED", "true").lower() == "true"
     
     @classmethod
     def validate(cls):
@@ -1,11 +1,16 @@
+import threading
 from supabase import create_client, Client
 from .config import Config
 
 _supabase_client: Client = None
+_supabase_lock = threading.Lock()
 
 def get_supabase_client() -> Client:
     global _supabase_client
     if _supabase_client is None:
-        Config.validate()
-        _supabase_client = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+        # Dispatcher threads can race here on first use; create exactly one client.
+        with _supabase_lock:
+            if _supabase_client is None:
+                Config.validate()
+                _supabase_client = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
     return _supabase_client
@@ -0,0 +1,93 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .config import Config
+from .db import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+class JobLogWriter:
+    """
+    Buffered progress log for the sessions a job works on (shared/job_logs.sql).
+
+    log() only appends to an in-memory buffer; a background thread sends the new
+    entries through the `append_job_logs` RPC every `flush_interval_sec` (or once
+    `max_pending` entries are buffered). The RPC inserts them into the append-only
+    `job_logs` table and appends them to the capped `sessions.logs` tail the UI reads,
+    so each flush costs one round trip no matter how long the log already is.
+
+    With `reset=True` the first flush replaces `sessions.logs` instead of appending
+    (a phase that starts a fresh log view). Call close() when done; it flushes the rest.
+    """
+
+    def __init__(self, session_ids: List[str], phase: str, reset: bool = False,
+                 flush_interval_sec: float = None, max_pending: int = 50):
+        self.session_ids = list(session_ids)
+        self.phase = phase
+        self.flush_interval_sec = flush_interval_sec or Config.JOB_LOG_FLUSH_INTERVAL_SEC
+        self.max_pending = max_pending
+        self.supabase = get_supabase_client()
+        self._reset = reset
+        self._pending: List[Dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name=f"job-log-{self.phase}", daemon=True)
+            self._thread.start()
+
+    def log(self, message: str):
+        with self._lock:
+            self._pending.append({"ts": datetime.now().isoformat(), "msg": message})
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+
+            try:
+                self.supabase.rpc("append_job_logs", {
+                    "p_session_ids": self.session_ids,
+                    "p_phase": self.phase,
+                    "p_entries": batch,
+                    "p_reset": self._reset,
+                    "p_tail": Config.JOB_LOG_TAIL
+                }).execute()
+                self._reset = False
+            except Exception as e:
+                logger.warning(f"Failed to flush {len(batch)} job log entries: {e}")
+                # Re-queue ahead of anything logged meanwhile to keep the order
+                with self._lock:
+                    self._pending = batch + self._pending
+
+    def close(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval_sec)
+            self._wake.clear()
+            self.flush()
@@ -0,0 +1,52 @@
+-- Append-only job progress log
+-- JobLogWriter(shared/job_log.py)가 모아둔 로그를 한 번의 RPC로 추가한다.
+-- sessions.logs 배열 전체를 매번 다시 쓰지 않고, 새 항목만 전송한다.
+
+CREATE TABLE IF NOT EXISTS job_logs (
+  log_id bigserial PRIMARY KEY,
+  session_id uuid NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+  phase text NOT NULL,
+  ts timestamptz NOT NULL,
+  msg text NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS job_logs_session_idx ON job_logs(session_id, log_id);
+
+-- p_entries: [{"ts": "2025-01-01T12:00:00", "msg": "..."}, ...]
+-- Full history goes to job_logs; sessions.logs keeps only the last p_tail entries for the UI
+-- (realtime UPDATE events carry the whole row, so the mirror stays small).
+-- p_reset replaces the mirror instead of appending (a phase starting a fresh log view).
+CREATE OR REPLACE FUNCTION append_job_logs(
+  p_session_ids UUID[],
+  p_phase TEXT,
+  p_entries JSONB,
+  p_reset BOOLEAN DEFAULT false,
+  p_tail INT DEFAULT 200
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO job_logs (session_id, phase, ts, msg)
+  SELECT s.session_id, p_phase, (e->>'ts')::timestamptz, e->>'msg'
+  FROM unnest(p_session_ids) AS s(session_id)
+  CROSS JOIN jsonb_array_elements(p_entries) WITH ORDINALITY AS t(e, ord)
+  ORDER BY s.session_id, t.ord;
+
+  UPDATE sessions
+  SET logs = (
+    SELECT COALESCE(jsonb_agg(tail.e ORDER BY tail.ord), '[]'::jsonb)
+    FROM (
+      SELECT e, ord
+      FROM jsonb_array_elements(
+        CASE WHEN p_reset THEN p_entries ELSE COALESCE(logs, '[]'::jsonb) || p_entries END
+      ) WITH ORDINALITY AS x(e, ord)
+      ORDER BY ord DESC
+      LIMIT p_tail
+    ) tail
+  )
+  WHERE session_id = ANY(p_session_ids);
+
+  RETURN jsonb_array_length(p_entries);
+END;
+$$;
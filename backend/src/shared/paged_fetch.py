@@ -0,0 +1,78 @@
+import concurrent.futures
+import logging
+from typing import Dict, Iterator, List, Sequence
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# IDs go in the URL (in.(...)); 200 uuids keep it well under proxy limits
+ID_PAGE_SIZE = 200
+# PostgREST caps responses at max-rows (1000 by default); larger selects are read in ranges
+RANGE_PAGE_SIZE = 1000
+
+
+def fetch_by_ids(supabase, table: str, columns: str, key: str, ids: Sequence[str],
+                 page_size: int = ID_PAGE_SIZE, concurrency: int = None) -> Iterator[List[Dict]]:
+    """
+    Selects `columns` of the rows whose `key` is in `ids`, ID_PAGE_SIZE ids per request and
+    up to FETCH_CONCURRENCY requests in flight. Yields each page's rows as soon as it arrives
+    (completion order), so callers can consume results while later pages are still loading.
+    FETCH_CONCURRENCY defaults to 1: every request shares one HTTP/2 connection, where
+    concurrent large responses trip flow control (the reason Phase 3 search stays sequential
+    over REST); callers with large reads try the pg pool first.
+    """
+    ids = list(ids)
+    pages = [ids[i : i+page_size] for i in range(0, len(ids), page_size)]
+    if not pages:
+        return
+
+    def fetch(page: List[str]) -> List[Dict]:
+        return supabase.table(table).select(columns).in_(key, page).execute().data or []
+
+    workers = min(concurrency or Config.FETCH_CONCURRENCY, len(pages))
+    if workers <= 1:
+        for page in pages:
+            yield fetch(page)
+        return
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"fetch-{table}") as executor:
+        for future in concurrent.futures.as_completed([executor.submit(fetch, p) for p in pages]):
+            yield future.result()
+
+
+def fetch_all_in(supabase, table: str, columns: str, key: str, values: Sequence[str],
+                 order: Sequence[str], page_size: int = RANGE_PAGE_SIZE, concurrency: int = None) -> List[Dict]:
+    """
+    Selects `columns` of every row whose `key` is in `values` (a short list, e.g. session ids),
+    RANGE_PAGE_SIZE rows per request so results past PostgREST's max-rows are not silently
+    cut off. The first page also returns the exact row count; the remaining ranges are then
+    read up to FETCH_CONCURRENCY at a time (sequentially by default, see fetch_by_ids). `order`
+    must make the row order total (end with a unique column) so the ranges neither overlap nor
+    skip rows.
+    """
+    def query(count: str = None):
+        q = supabase.table(table).select(columns, count=count) if count else supabase.table(table).select(columns)
+        q = q.in_(key, list(values))
+        for col in order:
+            q = q.order(col)
+        return q
+
+    first = query(count="exact").range(0, page_size - 1).execute()
+    rows = list(first.data or [])
+    total = first.count if first.count is not None else len(rows)
+    offsets = list(range(page_size, total, page_size))
+    if not offsets:
+        return rows
+
+    def fetch(offset: int) -> List[Dict]:
+        return query().range(offset, offset + page_size - 1).execute().data or []
+
+    workers = min(concurrency or Config.FETCH_CONCURRENCY, len(offsets))
+    if workers <= 1:
+        for offset in offsets:
+            rows.extend(fetch(offset))
+        return rows
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"fetch-{table}") as executor:
+        for page in executor.map(fetch, offsets):
+            rows.extend(page)
+    return rows
@@ -0,0 +1,130 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_unavailable = False
+_phase: Optional[str] = None
+
+
+def set_pool_phase(phase: str):
+    """Selects the PG_POOL_SIZES entry used when the pool is first created (see main.py)."""
+    global _phase
+    _phase = phase
+
+
+def vector_literal(vec: Sequence[float]) -> str:
+    """pgvector text input, e.g. '[0.1,0.2]' (cast with ::halfvec(768) in SQL)."""
+    return "[" + ",".join(str(float(v)) for v in vec) + "]"
+
+
+class PgPool:
+    """
+    Thread-safe direct Postgres access for the heavy paths (bulk inserts, search RPCs,
+    large selects). Unlike the shared Supabase REST client, each thread gets its own
+    connection, so concurrent calls don't trip HTTP/2 flow control.
+    """
+
+    def __init__(self, dsn: str, minconn: int, maxconn: int):
+        from psycopg2.pool import ThreadedConnectionPool
+
+        self.maxconn = maxconn
+        self._pool = ThreadedConnectionPool(minconn, maxconn, dsn)
+        # getconn() raises instead of blocking when all connections are out
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    @contextmanager
+    def connection(self):
+        import psycopg2
+
+        with self._slots:
+            conn = self._pool.getconn()
+            broken = False
+            try:
+                yield conn
+                conn.commit()
+            except psycopg2.Error as e:
+                broken = conn.closed or isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                self._pool.putconn(conn, close=broken)
+
+    def query(self, sql: str, params=None) -> List[Dict]:
+        """Runs a statement and returns rows as dicts (empty for statements without results)."""
+        from psycopg2.extras import RealDictCursor
+
+        with self.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(sql, params)
+                return [dict(r) for r in cur.fetchall()] if cur.description else []
+
+    def insert_rows(self, table: str, rows: List[Dict], on_conflict: str = None,
+                    update: bool = False, casts: Dict[str, str] = None, page_size: int = 500, conn=None) -> int:
+        """
+        Bulk INSERT via execute_values. Columns come from the first row.
+        on_conflict: comma-separated key columns; update=False -> DO NOTHING, True -> DO UPDATE.
+        casts: column -> SQL type for values that need one (e.g. {"embedding": "halfvec(768)"}).
+        conn: a connection from connection(); the insert joins that transaction instead of
+        committing on its own.
+        """
+        from psycopg2.extras import execute_values, Json
+
+        if not rows:
+            return 0
+        columns = list(rows[0].keys())
+        casts = casts or {}
+        template = "(" + ", ".join(f"%s::{casts[c]}" if c in casts else "%s" for c in columns) + ")"
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+        if on_conflict:
+            keys = [k.strip() for k in on_conflict.split(",")]
+            if update:
+                assignments = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c not in keys)
+                sql += f" ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {assignments}"
+            else:
+                sql += f" ON CONFLICT ({', '.join(keys)}) DO NOTHING"
+
+        def value(v):
+            return Json(v) if isinstance(v, dict) else v
+
+        if conn is None:
+            with self.connection() as conn:
+                return self.insert_rows(table, rows, on_conflict, update, casts, page_size, conn=conn)
+        with conn.cursor() as cur:
+            execute_values(cur, sql, [tuple(value(r.get(c)) for c in columns) for r in rows],
+                           template=template, page_size=page_size)
+        return len(rows)
+
+
+def get_pg_pool() -> Optional[PgPool]:
+    """
+    Returns the process-wide pool, or None when DATABASE_URL is not set or Postgres is not
+    reachable directly (callers then use the Supabase REST client). A failed connect is
+    not retried for the rest of the process.
+    """
+    global _pool, _pool_unavailable
+    if _pool is None and not _pool_unavailable:
+        with _pool_lock:
+            if _pool is None and not _pool_unavailable:
+                if not Config.DATABASE_URL:
+                    _pool_unavailable = True
+                    return None
+                maxconn = Config.PG_POOL_SIZES.get(_phase or "", Config.PG_POOL_DEFAULT_SIZE)
+                try:
+                    _pool = PgPool(Config.DATABASE_URL, 1, maxconn)
+                    logger.info(f"Direct Postgres pool ready (phase {_phase or '-'}, max {maxconn} connections).")
+                except Exception as e:
+                    _pool_unavailable = True
+                    logger.warning(f"Direct Postgres unavailable, using Supabase REST: {e}")
+    return _pool
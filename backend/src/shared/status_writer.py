@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from .config import Config
+from .db import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkStatusWriter:
+    """
+    Coalesces audio_chunks status updates in memory and writes them in bulk.
+
+    Workers call update() as often as they like; only the latest state per chunk
+    is kept and flushed through the `apply_audio_chunk_status` RPC every
+    `flush_interval_sec` (or when `max_pending` chunks are buffered). The RPC also
+    refreshes `sessions.progress`, so the UI reads one row per session.
+
+    Call flush() before changing session state and close() when done. close() retries
+    the final flush and raises if updates are still unwritten, so the job fails instead
+    of leaving chunks stuck in a stale state.
+    """
+
+    def __init__(self, flush_interval_sec: float = None, max_pending: int = 100):
+        self.flush_interval_sec = flush_interval_sec or Config.STATUS_FLUSH_INTERVAL_SEC
+        self.max_pending = max_pending
+        self.supabase = get_supabase_client()
+        self._pending: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.close()
+        except Exception as e:
+            if exc_type is None:
+                raise
+            # Don't mask the error that is already unwinding the block
+            logger.error(f"Chunk status writer failed to close: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="chunk-status-writer", daemon=True)
+            self._thread.start()
+
+    def update(self, chunk_id: str, status: str, error_message: str = None):
+        with self._lock:
+            self._pending[chunk_id] = {
+                "chunk_id": chunk_id,
+                "status": status,
+                "error_message": error_message
+            }
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+
+    def flush(self) -> bool:
+        """Writes the buffered updates; returns False if they were re-queued after a failure."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return True
+                batch, self._pending = self._pending, {}
+
+            try:
+                self.supabase.rpc("apply_audio_chunk_status", {"p_updates": list(batch.values())}).execute()
+            except Exception as e:
+                logger.warning(f"Failed to flush {len(batch)} chunk status updates: {e}")
+                # Re-queue, but never overwrite a newer state recorded meanwhile
+                with self._lock:
+                    for chunk_id, row in batch.items():
+                        self._pending.setdefault(chunk_id, row)
+                return False
+            return True
+
+    def close(self, attempts: int = 3):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(2 ** attempt)
+            if self.flush():
+                return
+        with self._lock:
+            unwritten = len(self._pending)
+        raise RuntimeError(f"Failed to write {unwritten} chunk status updates after {attempts} attempts")
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval_sec)
+            self._wake.clear()
+            self.flush()
@@ -1,11 +1,12 @@
-from google.cloud import storage
 import logging
 
+from .clients import get_storage_client
+
 logger = logging.getLogger(__name__)
 
 class StorageClient:
     def __init__(self):
-        self.client = storage.Client()
+        self.client = get_storage_client()
         
     def download_file(self, gcs_uri: str, destination_path: str):
         """Downloads a file from GCS to a local path."""
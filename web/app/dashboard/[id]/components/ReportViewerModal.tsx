@@ -18,6 +18,9 @@ type ReportData = {
     professor_mentioned: ReportItem[]
     likely: ReportItem[]
     trap_warnings: ReportItem[]
+    // Set when some sessions' analysis failed and they are missing from the report
+    incomplete_sessions?: string[]
+    note?: string
 }
 
 type ReportItem = {
@@ -95,6 +98,16 @@ export default function ReportViewerModal({ isOpen, onClose, sessionId, title }:
                         </div>
                     ) : report ? (
                         <div className="space-y-8 max-w-3xl mx-auto">
+
+                            {report.incomplete_sessions && report.incomplete_sessions.length > 0 && (
+                                <div className="flex items-start gap-2 rounded-lg border border-yellow-200 bg-yellow-50 p-4 text-sm text-yellow-800">
+                                    <AlertTriangle className="h-5 w-5 shrink-0" />
+                                    <span>
+                                        강의 {report.incomplete_sessions.length}개의 분석에 실패해 이 리포트에 포함되지 않았습니다.
+                                        리포트를 다시 생성하면 포함됩니다.
+                                    </span>
+                                </div>
+                            )}
                             
                             {/* Section 1: Professor Mentioned (High Priority) */}
                             <section>
@@ -26,6 +26,11 @@ type SourceItem = {
     logs?: { ts: string, msg: string }[] // Debug logs
 }
 
+const EMPTY_STATS: ProcessingStats = { total: 0, pending: 0, processing: 0, completed: 0, failed: 0 }
+
+// sessions.progress is maintained by the backend's bulk chunk status writer
+const toStats = (progress?: Partial<ProcessingStats> | null): ProcessingStats => ({ ...EMPTY_STATS, ...(progress || {}) })
+
 export default function SourcePanel({ subjectId }: { subjectId: string }) {
   const [items, setItems] = useState<SourceItem[]>([])
   const [isUploading, setIsUploading] = useState(false)
@@ -46,30 +51,13 @@ export default function SourcePanel({ subjectId }: { subjectId: string }) {
             .eq('subject_id', subjectId)
             .order('created_at', { ascending: false })
             
-        // 2. Fetch Audios (sessions) with aggregated stats manually (join is tricky for stats)
-        // Let's fetch sessions first
+        // 2. Fetch Audios (sessions). Chunk progress is aggregated server-side into sessions.progress
         const { data: sessions } = await supabase
             .from('sessions')
             .select('*')
             .eq('subject_id', subjectId)
             .order('created_at', { ascending: false })
 
-        // 3. Fetch all chunks for these sessions for stats
-        const sessionIds = sessions?.map(s => s.session_id) || []
-        let chunksMap: Record<string, any[]> = {}
-        
-        if (sessionIds.length > 0) {
-            const { data: chunks } = await supabase
-                .from('audio_chunks')
-                .select('session_id, status')
-                .in('session_id', sessionIds)
-            
-            chunks?.forEach(c => {
-                if (!chunksMap[c.session_id]) chunksMap[c.session_id] = []
-                chunksMap[c.session_id].push(c)
-            })
-        }
-
         // Merge into items
         const combined: SourceItem[] = []
         
@@ -84,22 +72,13 @@ export default function SourcePanel({ subjectId }: { subjectId: string }) {
         })
 
         sessions?.forEach(s => {
-            const cList = chunksMap[s.session_id] || []
-            const stats = {
-                total: cList.length,
-                pending: cList.filter(c => c.status === 'pending').length,
-                processing: cList.filter(c => c.status === 'processing').length,
-                completed: cList.filter(c => c.status === 'completed').length,
-                failed: cList.filter(c => c.status === 'failed').length,
-            }
-
             combined.push({
                 id: s.session_id,
                 type: 'audio',
                 title: s.gcs_audio_url.split('/').pop() || 'Audio', // approximate title
                 status: s.status,
                 createdAt: s.created_at,
-                stats,
+                stats: toStats(s.progress),
                 logs: s.logs // Debug logs
             })
         })
@@ -117,8 +96,6 @@ export default function SourcePanel({ subjectId }: { subjectId: string }) {
             (payload) => handleSourceChange(payload))
         .on('postgres_changes', { event: '*', schema: 'public', table: 'sessions', filter: `subject_id=eq.${subjectId}` }, 
             (payload) => handleSessionChange(payload))
-        .on('postgres_changes', { event: '*', schema: 'public', table: 'audio_chunks' }, 
-            (payload) => handleChunkChange(payload)) 
         .subscribe((status) => {
             if (status === 'SUBSCRIBED') {
                 console.log('Ready to receive realtime updates');
@@ -172,44 +149,19 @@ export default function SourcePanel({ subjectId }: { subjectId: string }) {
               title: newRow.gcs_audio_url.split('/').pop() || 'Audio',
               status: newRow.status,
               createdAt: newRow.created_at,
-              stats: { total: 0, pending: 0, processing: 0, completed: 0, failed: 0 },
+              stats: toStats(newRow.progress),
               logs: newRow.logs
           }, ...prev])
       } else if (payload.eventType === 'UPDATE') {
           setItems(prev => prev.map(item => {
               if (item.id === newRow.session_id) {
-                  return { ...item, status: newRow.status, logs: newRow.logs }
+                  return { ...item, status: newRow.status, stats: toStats(newRow.progress), logs: newRow.logs }
               }
               return item
           }))
       }
   }
 
-  const handleChunkChange = (payload: RealtimePostgresChangesPayload<any>) => {
-      // payload.new has session_id. Find if it is in our items.
-      const row = payload.new || payload.old
-      const sessionId = row.session_id
-      
-      setItems(prev => {
-          const targetIndex = prev.findIndex(p => p.id === sessionId)
-          if (targetIndex === -1) return prev // Not our session
-
-          // Fetch stats for this session
-          fetchSessionStats(sessionId).then(newStats => {
-              setItems(current => current.map(item => {
-                  // Update stats AND derived status if needed
-                  if (item.id === sessionId) {
-                     // If stats show activity, ensure item status reflects it (optional UI enhancement)
-                     return { ...item, stats: newStats }
-                  }
-                  return item
-              }))
-          })
-          
-          return prev
-      })
-  }
-
   const handleDelete = async (id: string, type: 'pdf' | 'audio') => {
       if (!confirm("정말 이 항목을 삭제하시겠습니까?")) return
       
@@ -224,19 +176,6 @@ export default function SourcePanel({ subjectId }: { subjectId: string }) {
       }
   }
   
-  const fetchSessionStats = async (sessionId: string) => {
-      const { data } = await supabase.from('audio_chunks').select('status').eq('session_id', sessionId)
-      if (!data) return { total: 0, pending: 0, processing: 0, completed: 0, failed: 0 }
-      return {
-          total: data.length,
-          pending: data.filter(c => c.status === 'pending').length,
-          processing: data.filter(c => c.status === 'processing').length,
-          completed: data.filter(c => c.status === 'completed').length,
-          failed: data.filter(c => c.status === 'failed').length,
-      }
-  }
-
-
   // Actions
   const handleFileSelect = async (e: React.ChangeEvent<HTMLInputElement>) => {
     const files = e.target.files